@@ -0,0 +1,311 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from discovery import APP_REGISTRY, DiscoveryRule, register_rules
+from profiling import PROFILER
+
+# Report sections of Sway selectable with --only; each names a category of parse_sway_config
+SWAY_SECTIONS = {
+    "design": "Design and Appearance",
+    "keybindings": "Keybindings",
+    "conflicts": "Keybinding Conflicts",
+    "workspaces": "Workspace Management",
+    "autostart": "Application Autostart",
+    "bar": "Bar Configuration",
+    "variables": "Variables",
+    "other": "Other",
+}
+
+
+class AppParser:
+    """
+    A parser plugin: how to find, parse and report one application.
+
+    Attributes:
+        name: The application name used on the command line ("kitty").
+        title: The name shown in the report ("Kitty").
+        rules: DiscoveryRules of the application's files, registered with the discovery engine.
+        collect: collect(run) parses the application and returns its result; it runs on a
+            worker thread once the applications in `requires` have finished.
+        requires: Names of the applications whose results collect() reads from run.results.
+        sections: Report sections the application provides (for --only).
+        prepare: Optional prepare(run) for the work that needs no other application
+            (discovery, reading and tokenizing files). It starts right away, alongside
+            the applications in `requires`, and its result is in run.prepared[name]
+            when collect() runs.
+    """
+
+    __slots__ = ("name", "title", "rules", "collect", "requires", "sections", "prepare")
+
+    def __init__(self, name, title, rules, collect, requires=(), sections=None, prepare=None):
+        self.name = name
+        self.title = title
+        self.rules = tuple(rules)
+        self.collect = collect
+        self.requires = tuple(requires)
+        self.sections = list(sections) if sections is not None else [name]
+        self.prepare = prepare
+
+    def __repr__(self):
+        return f"AppParser({self.name!r})"
+
+
+# Registered applications, in report order
+APP_PARSERS = {}
+
+
+def register_app(app):
+    """Adds an application parser to the registry and its files to the discovery engine."""
+    APP_PARSERS[app.name] = app
+    if app.rules:
+        register_rules(app.name, app.rules)
+    return app
+
+
+class AppRun:
+    """
+    The state the application parsers of one run share.
+
+    Attributes:
+        file_collector: The FileCollector every parser records its files in.
+        apps: The applications the report was asked for.
+        sections: The report sections selected.
+        options: The parsed command line options.
+        parse_cache: The ParseCache of the Sway parser, or None.
+        probe: The FileProbe shared by the parsers, or None.
+        ipc: A sway_ipc.SwayIPC connection to read the running Sway config from, or None.
+        io_pool: The executor the parsers read files on, or None to read them serially.
+        prepared: Application name -> result of its prepare().
+        results: Application name -> result of its collect(), filled in as parsers finish.
+    """
+
+    def __init__(self, file_collector, apps, sections, options=None, parse_cache=None, probe=None):
+        self.file_collector = file_collector
+        self.apps = list(apps)
+        self.sections = list(sections)
+        self.options = options
+        self.parse_cache = parse_cache
+        self.probe = probe
+        self.ipc = None
+        self.io_pool = None
+        self.prepared = {}
+        self.results = {}
+
+    def option(self, name, default=None):
+        return getattr(self.options, name, default)
+
+    def reports(self, app_name):
+        """Returns True if the report shows anything of the application: a section of its own, or its files."""
+        if any(section in self.sections for section in APP_PARSERS[app_name].sections):
+            return True
+        return "files" in self.sections and app_name in self.apps
+
+
+def with_prerequisites(app_names):
+    """Returns the applications plus everything they require, in registry order."""
+    needed = set()
+    pending = list(app_names)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(APP_PARSERS[name].requires)
+    return [name for name in APP_PARSERS if name in needed]
+
+
+def dependency_order(app_names):
+    """
+    Orders applications so each comes after the applications it requires (registry order otherwise).
+
+    Raises:
+        ValueError: If the applications require each other in a cycle.
+    """
+    waiting = {name: set(APP_PARSERS[name].requires) for name in app_names}
+    ordered = []
+    while waiting:
+        ready = [name for name, requires in waiting.items() if requires <= set(ordered)]
+        if not ready:
+            raise ValueError(f"Application dependency cycle: {', '.join(sorted(waiting))}")
+        for name in ready:
+            del waiting[name]
+        ordered.extend(ready)
+    return ordered
+
+
+def all_sections():
+    """Returns every report section: those of the registered applications, in registry order, then the files."""
+    return [section for app in APP_PARSERS.values() for section in app.sections] + ["files"]
+
+
+def app_report_sections(results, sections):
+    """
+    Returns the report sections of the applications other than Sway and Waybar.
+
+    Each of them has one section, named after it; those that are not selected or
+    have no config are left out.
+
+    Args:
+        results: Application name -> result of its collect(), as returned by run_apps().
+        sections: The selected report sections.
+
+    Returns:
+        A list of (title, settings) pairs for reporter.generate_report's app_sections.
+    """
+    return [(APP_PARSERS[name].title, settings) for name, settings in results.items()
+            if name not in ("sway", "waybar") and name in sections and settings]
+
+
+# Threads reading files for the parsers; the reads block on I/O, not on the GIL
+IO_WORKERS = 8
+
+
+def run_apps(run, app_names, workers=None, pipeline=False):
+    """
+    Runs the parsers of the applications (and of their prerequisites).
+
+    By default every parser runs on the calling thread, one after another in
+    dependency order. The parsers are CPU-bound and hold the GIL, so on local
+    disks this is as fast as the pipeline (benchmarks/bench_apps.py) without its
+    thread and event loop overhead.
+
+    With pipeline, the run is orchestrated by an asyncio event loop. Every
+    application's prepare() starts at once, and its collect() starts as soon as its
+    prepare() and every application it requires have finished: Waybar reads and
+    tokenizes its config and style sheets while Sway parses, and only waits for Sway
+    where the Sway variables are resolved. The blocking parser calls run on a thread
+    pool and the parsers read their files on run.io_pool, which pays off when reads
+    block (network or cold storage).
+
+    Args:
+        run: The AppRun the parsers share; their results are stored in run.results.
+        app_names: The applications to run.
+        workers: With pipeline, the maximum number of parser calls running at once
+            (default: all that are ready).
+        pipeline: Run the parsers on the asyncio pipeline.
+
+    Returns:
+        run.results, in registry order.
+    """
+    names = with_prerequisites(app_names)
+    order = dependency_order(names)
+    if not pipeline:
+        for name in order:
+            app = APP_PARSERS[name]
+            if app.prepare is not None:
+                run.prepared[name] = app.prepare(run)
+            run.results[name] = app.collect(run)
+    else:
+        stages = sum(2 if APP_PARSERS[name].prepare is not None else 1 for name in names)
+        with ThreadPoolExecutor(max_workers=workers or stages or 1) as pool, \
+                ThreadPoolExecutor(max_workers=IO_WORKERS) as io_pool:
+            run.io_pool = io_pool
+            try:
+                asyncio.run(_run_apps(run, order, pool))
+            finally:
+                run.io_pool = None
+    run.results = {name: run.results[name] for name in names}
+    return run.results
+
+
+async def _run_apps(run, order, pool):
+    loop = asyncio.get_running_loop()
+    tasks = {}
+
+    async def run_app(app):
+        if app.prepare is not None:
+            run.prepared[app.name] = await loop.run_in_executor(pool, app.prepare, run)
+        for name in app.requires:
+            await tasks[name]
+        run.results[app.name] = await loop.run_in_executor(pool, app.collect, run)
+
+    # Prerequisites come first in `order`, so every task a coroutine awaits exists
+    for name in order:
+        tasks[name] = asyncio.ensure_future(run_app(APP_PARSERS[name]))
+    await asyncio.gather(*tasks.values())
+
+
+def _collect_sway(run):
+    """Returns (sway_features, sway_variables); only the variables when Sway is parsed for Waybar."""
+    from pipeline import collect_sway, collect_sway_ipc
+    variables_only = not run.reports("sway")
+    if run.ipc is not None:
+        try:
+            return collect_sway_ipc(run.file_collector, run.ipc, run.parse_cache, run.probe, variables_only)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not query Sway over IPC at {run.ipc.socket_path}: {e}; reading the config files")
+    return collect_sway(run.file_collector, run.parse_cache, run.probe, run.option("jobs", 1),
+                        run.option("process_pool", False), variables_only=variables_only)
+
+
+def _prepare_waybar(run):
+    """Finds the Waybar files and, when the modules are reported, reads and tokenizes them."""
+    from pipeline import load_waybar_configs, prepare_waybar_styles
+    with PROFILER.phase("discovery"):
+        waybar_config_paths = run.file_collector.find_waybar_configs()
+        if "modules" not in run.sections:
+            # The files overview still lists the style sheets (colors-waybar.css is recorded by collect)
+            run.file_collector.find_waybar_styles()
+            return None
+    styles = prepare_waybar_styles(run.file_collector, run.io_pool)
+    return waybar_config_paths, load_waybar_configs(waybar_config_paths, run.io_pool), styles
+
+
+def _collect_waybar(run):
+    """Returns the Waybar modules keyed by bar position, or None when only the files are reported."""
+    from pipeline import collect_waybar_modules, resolve_waybar_styles
+    from variable_resolver import VariableResolver
+    from waybar_parser import configured_module_ids
+    from waybar_style_parser import record_style_sources
+    prepared = run.prepared["waybar"]
+    if prepared is None:
+        # Recorded after Sway, as resolve_waybar_styles does, so the wal files keep their order
+        with PROFILER.phase("discovery"):
+            colors_waybar_path = run.file_collector.find_colors_waybar_css()
+            for style_path in run.file_collector.files_of_type("waybar_style", active=True):
+                record_style_sources(style_path, colors_waybar_path, run.file_collector)
+        return None
+    waybar_config_paths, loaded, styles = prepared
+    _, sway_variables = run.results["sway"]
+    sway_resolver = VariableResolver(sway_variables)
+    debug_mode = run.option("waybar_styles_debug", False)
+    # The style debug report lists every module the style sheets style, configured or not
+    module_ids = None if debug_mode else configured_module_ids(loaded.values())
+    waybar_style_colors = resolve_waybar_styles(styles, run.file_collector, sway_resolver, debug_mode, module_ids)
+    return collect_waybar_modules(waybar_config_paths, sway_resolver, waybar_style_colors, loaded)
+
+
+# Sway and Waybar report through their own sections of reporter.generate_report;
+# their discovery rules are the built-in ones of discovery.APP_REGISTRY
+register_app(AppParser("sway", "Sway", APP_REGISTRY["sway"], _collect_sway, sections=SWAY_SECTIONS))
+# Waybar modules resolve $variables, so Waybar's collect runs after Sway; its files are
+# read and tokenized while Sway parses
+register_app(AppParser("waybar", "Waybar", APP_REGISTRY["waybar"], _collect_waybar, requires=["sway"],
+                       sections=["modules"], prepare=_prepare_waybar))
+
+
+def _dotfile_app(name, title, syntax, candidates):
+    """Registers an application whose config is read by dotfile_parsers.parse_dotfile."""
+    def collect(run):
+        from dotfile_parsers import parse_dotfile
+        with PROFILER.phase(name):
+            found = run.file_collector.discover(name)
+            return parse_dotfile(found[0], syntax, run.file_collector) if found else []
+
+    return register_app(AppParser(name, title, [DiscoveryRule(name, "app_config", candidates, keep_all=False)],
+                                  collect))
+
+
+_dotfile_app("kitty", "Kitty", "kitty", ["{config}/kitty/kitty.conf"])
+_dotfile_app("alacritty", "Alacritty", "toml", [
+    "{config}/alacritty/alacritty.toml",
+    "{config}/alacritty.toml",
+    "~/.alacritty.toml",
+])
+_dotfile_app("foot", "Foot", "ini", ["{config}/foot/foot.ini", "/etc/xdg/foot/foot.ini"])
+_dotfile_app("rofi", "Rofi", "rasi", ["{config}/rofi/config.rasi"])
+_dotfile_app("wofi", "Wofi", "ini", ["{config}/wofi/config"])
+_dotfile_app("mako", "Mako", "ini", ["{config}/mako/config", "~/.mako/config"])
+_dotfile_app("swaylock", "Swaylock", "ini", [
+    "~/.swaylock/config",
+    "{config}/swaylock/config",
+    "/etc/swaylock/config",
+])
@@ -0,0 +1,68 @@
+"""
+Measures what the other application parsers add to a full run, serially and on the asyncio pipeline.
+
+Runs main() on a generated home for Sway and Waybar alone and for every registered
+application, once serially (the default: the main thread, one parser at a time), once
+with --pipeline --app-workers 1 (the pipeline, one parser call at a time) and once
+with --pipeline. The serial run is the default because the pipeline only wins when
+file reads block; on local disks it adds its overhead to CPU-bound parsers.
+
+Usage: python benchmarks/bench_apps.py [--sway-lines 10000] [--app-settings 2000] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import write_app_configs, write_home
+from app_registry import APP_PARSERS
+import main as main_module
+
+
+def run_main(args):
+    argv = sys.argv
+    sys.argv = ["main.py", "--no-cache"] + args
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            main_module.main()
+    finally:
+        sys.argv = argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sway-lines", type=int, default=10000)
+    parser.add_argument("--app-settings", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    home = os.environ.get("HOME")
+    with tempfile.TemporaryDirectory() as root:
+        write_home(root, args.sway_lines, files=0)
+        write_app_configs(root, args.app_settings)
+        os.environ["HOME"] = root
+        try:
+            print(f"{len(APP_PARSERS)} applications, {args.app_settings} settings per other application, "
+                  f"best of {args.repeat}")
+            # The parsers are imported on first use; keep that out of the first timing
+            run_main(["--pipeline", "report"])
+            for label, apps in (("sway + waybar", ["sway", "waybar"]), ("all applications", [])):
+                for mode, options in (("serial", []), ("1 worker", ["--pipeline", "--app-workers", "1"]),
+                                      ("pipeline", ["--pipeline"])):
+                    best = min(timeit.repeat(lambda: run_main(options + ["report"] + apps), number=1,
+                                             repeat=args.repeat))
+                    print(f"  {label:18s} {mode:9s} {best * 1000:9.2f} ms")
+        finally:
+            if home is None:
+                del os.environ["HOME"]
+            else:
+                os.environ["HOME"] = home
+
+
+if __name__ == "__main__":
+    main()
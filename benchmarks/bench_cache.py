@@ -0,0 +1,72 @@
+"""
+Measures what the Sway parse cache saves on synthetic source trees of growing size.
+
+For each tree, times parse_sway_config without a cache, with a warm cache read
+from and written back to disk (a `main.py --cache` run: load, parse, save) and
+with a warm in-memory cache (the --serve daemon after a change elsewhere), and
+checks that all three give the same features.
+
+Usage: python benchmarks/bench_cache.py [--trees 20x50 200x80 400x200] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_collector import FileCollector
+from generate import write_sway_tree
+from parse_cache import ParseCache
+from sway_parser import parse_sway_config
+
+
+def best_of(function, repeat):
+    """Returns (best wall time in seconds, result of the last call)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trees", nargs="+", default=["20x50", "200x80", "400x200"], metavar="FILESxLINES")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"best of {args.repeat}; cache file size in KiB")
+    print(f"  {'tree':>12s} {'no cache':>10s} {'disk':>10s} {'memory':>10s} {'KiB':>8s}")
+    for tree in args.trees:
+        files, lines = (int(part) for part in tree.split("x"))
+        with tempfile.TemporaryDirectory() as root:
+            config_path = write_sway_tree(os.path.join(root, "sway"), files, lines)
+            cache_path = os.path.join(root, "cache", "sway_parse_cache.pickle")
+
+            def disk():
+                cache = ParseCache(cache_path).load()
+                features = parse_sway_config(config_path, FileCollector(), cache)
+                cache.save()
+                return features
+
+            memory_cache = ParseCache(cache_path)
+            parse_sway_config(config_path, FileCollector(), memory_cache)
+            disk()
+            uncached, reference = best_of(lambda: parse_sway_config(config_path, FileCollector()), args.repeat)
+            from_disk, features = best_of(disk, args.repeat)
+            assert features == reference, "the features parsed with the disk cache differ"
+            in_memory, features = best_of(lambda: parse_sway_config(config_path, FileCollector(), memory_cache),
+                                          args.repeat)
+            assert features == reference, "the features parsed with the in-memory cache differ"
+            size = os.path.getsize(cache_path) / 1024
+        print(f"  {tree:>12s} {uncached * 1000:7.2f} ms {from_disk * 1000:7.2f} ms {in_memory * 1000:7.2f} ms "
+              f"{size:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Times Sway line colorization: the former three-pass colorizer, the lexer per line and the batch API.
+
+Usage: python benchmarks/bench_colorize.py [--lines 12000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colorize_sway import colorize_sway_config_line, colorize_sway_config_lines
+
+_LEGACY_PATTERNS = [
+    (re.compile(r'\b(set|bindsym|exec_always|exec|source|bar|gaps|client\.|workspace)\b'), "\033[96m"),
+    (re.compile(r'\$[a-zA-Z0-9_]+'), "\033[93m"),
+    (re.compile(r'\b(Mod4|Shift|Control|Alt|Up|Down|Left|Right|Return|Escape|Tab|Delete|Insert|Home|End|Page_Up|Page_Down|F[1-9]|F1[0-2])\b'), "\033[92m"),
+]
+
+
+def legacy_colorize(line):
+    """The three finditer passes colorize_sway_config_line used before the combined lexer."""
+    all_matches = []
+    for pattern, color in _LEGACY_PATTERNS:
+        for match in pattern.finditer(line):
+            all_matches.append((match.start(), match.end(), color))
+    all_matches.sort(key=lambda x: x[0])
+    colored_parts = []
+    last_idx = 0
+    for start, end, color in all_matches:
+        if start < last_idx:
+            continue
+        colored_parts.append(line[last_idx:start])
+        colored_parts.append(color + line[start:end] + "\033[0m")
+        last_idx = end
+    colored_parts.append(line[last_idx:])
+    return "".join(colored_parts)
+
+
+def generate_lines(count, seed=0):
+    """Builds keybinding-heavy config lines; about a third repeat earlier ones."""
+    rng = random.Random(seed)
+    keys = ["Return", "Up", "Down", "Left", "Right", "Tab", "F1", "F5", "a", "b", "q"]
+    lines = []
+    for i in range(count):
+        if lines and rng.random() < 0.3:
+            lines.append(rng.choice(lines))
+        elif i % 4 == 0:
+            lines.append(f"set $var{i} #{rng.randrange(0xffffff):06x}")
+        else:
+            lines.append(f"bindsym $mod+Shift+{rng.choice(keys)} exec ~/bin/tool{i % 300} --flag $var{i % 50}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=12000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines)
+    assert colorize_sway_config_lines(lines) == [legacy_colorize(line) for line in lines]
+
+    def per_line():
+        colorize_sway_config_line.cache_clear()
+        return [colorize_sway_config_line(line) for line in lines]
+
+    legacy_time = min(timeit.repeat(lambda: [legacy_colorize(line) for line in lines], number=1, repeat=args.repeat))
+    line_time = min(timeit.repeat(per_line, number=1, repeat=args.repeat))
+    def batch():
+        colorize_sway_config_line.cache_clear()
+        return colorize_sway_config_lines(lines)
+
+    batch_time = min(timeit.repeat(batch, number=1, repeat=args.repeat))
+    print(f"{args.lines} lines, best of {args.repeat} (output verified identical)")
+    print(f"  three-pass colorizer:  {legacy_time * 1000:8.2f} ms")
+    print(f"  lexer per line (LRU):  {line_time * 1000:8.2f} ms")
+    print(f"  lexer batch (LRU):     {batch_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
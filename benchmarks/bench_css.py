@@ -0,0 +1,97 @@
+"""
+Compares the GTK CSS tokenizer/AST walk with the former regex extraction on a large Waybar theme,
+and times the per-module StyleIndex queries.
+
+The tokenizer is timed on its own, against the regex extraction it replaces, and so are
+the palette scan and the cascade StyleIndex builds on top, which the regex never did.
+The style sheet is then parsed with cold selector caches, for every module it styles and
+for --modules of them, as the report does for the modules its Waybar configs use.
+
+Usage: python benchmarks/bench_css.py [--rules 3000] [--modules 20]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_collector import FileCollector
+import gtk_css
+import waybar_style_parser
+from generate import waybar_style
+from palette import load_palette
+from waybar_style_parser import StyleIndex, build_style_index, parse_waybar_style
+
+
+def regex_extract(content):
+    """The per-rule regex extraction parse_waybar_style used before the tokenizer (colors left unresolved)."""
+    module_colors = {}
+    for module_match in re.finditer(r'#([a-zA-Z0-9_/-]+)\s*\{([^}]+)\}', content):
+        styles = module_match.group(2)
+        fg = re.findall(r'((?<!background-)color:\s*(#[a-fA-F0-9]{6}|@color[0-9]+|@([a-zA-Z0-9_-]+));)', styles)
+        bg = re.findall(r'(background-color:\s*(#[a-fA-F0-9]{6}|@color[0-9]+|@([a-zA-Z0-9_-]+));)', styles)
+        module_colors[module_match.group(1)] = {
+            "foreground": fg[-1][1] if fg else None,
+            "background": bg[-1][1] if bg else None,
+        }
+    return module_colors
+
+
+def cold(function):
+    """Wraps function to run with the selector caches cleared first, as in a fresh process."""
+    def run():
+        for cached in (gtk_css.parse_selector, gtk_css._parse_compound, gtk_css.selector_specificity,
+                       waybar_style_parser._selector_subject):
+            cached.cache_clear()
+        return function()
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, default=3000)
+    parser.add_argument("--modules", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    text = waybar_style(args.rules)
+    with tempfile.NamedTemporaryFile("w", suffix=".css", delete=False) as f:
+        f.write(text)
+        style_path = f.name
+    try:
+        regex_time = min(timeit.repeat(lambda: regex_extract(text), number=1, repeat=args.repeat))
+        tokenizer_time = min(timeit.repeat(lambda: gtk_css.parse_css(text), number=1, repeat=args.repeat))
+        palette_time = min(timeit.repeat(lambda: load_palette([style_path]), number=1, repeat=args.repeat))
+        stylesheet, palette = gtk_css.parse_css(text), load_palette([style_path])
+        cascade_time = min(timeit.repeat(cold(lambda: StyleIndex(stylesheet, palette, {}).as_dict()),
+                                         number=1, repeat=args.repeat))
+        ast_time = min(timeit.repeat(cold(lambda: parse_waybar_style(style_path, {}, None, FileCollector())),
+                                     number=1, repeat=args.repeat))
+        index = build_style_index(style_path, {}, None, FileCollector())
+        module_ids = index.module_ids()[:args.modules]
+        subset = parse_waybar_style(style_path, {}, None, FileCollector(), module_ids=module_ids)
+        full = index.as_dict()
+        assert all(subset[module_id] == full[module_id] for module_id in module_ids), \
+            "the configured modules resolve differently from the full index"
+        subset_time = min(timeit.repeat(
+            cold(lambda: parse_waybar_style(style_path, {}, None, FileCollector(), module_ids=module_ids)),
+            number=1, repeat=args.repeat))
+        queries = [(module_id, state) for module_id in index.module_ids() for state in [""] + index.states(module_id)]
+        query_time = min(timeit.repeat(lambda: [index.colors(*query) for query in queries], number=1, repeat=args.repeat))
+    finally:
+        os.unlink(style_path)
+    print(f"{args.rules} rules ({len(text) // 1024} KiB), best of {args.repeat}")
+    print(f"  regex extraction:  {regex_time * 1000:8.2f} ms")
+    print(f"  tokenizer (AST):   {tokenizer_time * 1000:8.2f} ms")
+    print(f"  palette scan:      {palette_time * 1000:8.2f} ms")
+    print(f"  StyleIndex:        {cascade_time * 1000:8.2f} ms")
+    print(f"  parse_waybar_style:{ast_time * 1000:8.2f} ms")
+    print(f"  ... {len(module_ids)} configured modules: {subset_time * 1000:8.2f} ms")
+    print(f"  {len(queries)} StyleIndex queries: {query_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measures how `fleet` scales with its worker processes.
+
+Generates --roots small homes (a Sway config, Waybar config and style, pywal
+colors and the other applications' configs), checks that every worker count gives
+the same summary, then times run_fleet() at each --workers count. The speedup is
+bounded by the CPUs of the machine (printed with the results).
+
+Usage: python benchmarks/bench_fleet.py [--roots 32] [--sway-lines 2000] [--workers 1 2 4] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import write_app_configs, write_home
+from fleet import run_fleet
+
+
+def comparable(fleet):
+    """The summary without the timings, which differ from run to run."""
+    stats = fleet.stats()
+    del stats["seconds"]
+    return stats, [{key: value for key, value in summary.items() if key != "seconds"} for summary in fleet.roots]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--roots", type=int, default=32)
+    parser.add_argument("--sway-lines", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        roots = []
+        for seed in range(args.roots):
+            root = os.path.join(directory, f"home{seed}")
+            write_home(root, args.sway_lines, files=10, lines_per_file=20, modules=50, rules=200, seed=seed)
+            write_app_configs(root, 100, seed)
+            roots.append(root)
+
+        reference = comparable(run_fleet(roots, workers=1))
+        print(f"{args.roots} roots x {args.sway_lines} Sway lines, {os.cpu_count()} CPUs, best of {args.repeat}")
+        for workers in args.workers:
+            assert comparable(run_fleet(roots, workers=workers)) == reference, \
+                f"the summary with {workers} workers differs from the serial one"
+            best = min(timeit.repeat(lambda: run_fleet(roots, workers=workers), number=1, repeat=args.repeat))
+            print(f"  {workers:2d} workers {best * 1000:9.2f} ms  {args.roots / best:7.1f} roots/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compares the Sway report read over IPC with the one read from the config files.
+
+Serves a generated source tree from a stand-in Sway: a Unix socket server that
+speaks the i3-ipc framing and answers GET_CONFIG (with the included configs),
+GET_BAR_CONFIG, GET_BINDING_MODES and GET_OUTPUTS. Checks that both paths report
+the same sections, apart from the running-state lines only IPC has, and that all
+requests share one connection, then times main() on each path.
+
+Usage: python benchmarks/bench_ipc.py [--files 200] [--lines 80] [--repeat 5]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import write_sway_tree
+import main as main_module
+import sway_ipc
+
+
+class StandInSway:
+    """A thread serving canned i3-ipc replies on a Unix socket, one connection at a time."""
+
+    def __init__(self, socket_path, replies):
+        self.socket_path = socket_path
+        self.replies = replies
+        self.connections = 0
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(socket_path)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with conn:
+                while True:
+                    try:
+                        message_type, payload = sway_ipc.read_message(conn)
+                    except (ConnectionError, OSError):
+                        break
+                    reply = self.replies[message_type]
+                    if callable(reply):
+                        reply = reply(payload.decode())
+                    conn.sendall(sway_ipc.pack_message(message_type, json.dumps(reply)))
+
+    def close(self):
+        self._server.close()
+
+
+def tree_replies(config_path):
+    """Builds the replies of a Sway running the generated tree at config_path."""
+    with open(config_path) as f:
+        config = f.read()
+    included = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(config_path), "config.d", "*.conf"))):
+        with open(path) as f:
+            included.append({"path": path, "raw_contents": f.read()})
+    bars = {"bar-0": {"id": "bar-0", "mode": "dock", "position": "top", "status_command": "i3status"}}
+    return {
+        sway_ipc.GET_CONFIG: {"config": config, "included_configs": included},
+        sway_ipc.GET_BAR_CONFIG: lambda bar_id: bars[bar_id] if bar_id else list(bars),
+        sway_ipc.GET_BINDING_MODES: ["default", "resize"],
+        sway_ipc.GET_OUTPUTS: [{"name": "eDP-1", "active": True, "scale": 1.0,
+                                "current_mode": {"width": 1920, "height": 1080, "refresh": 60000}}],
+    }
+
+
+def run_main(args):
+    argv = sys.argv
+    sys.argv = ["main.py"] + args
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            main_module.main()
+    finally:
+        sys.argv = argv
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    home = os.environ.get("HOME")
+    with tempfile.TemporaryDirectory() as root:
+        config_path = write_sway_tree(os.path.join(root, ".config", "sway"), args.files, args.lines)
+        socket_path = os.path.join(root, "sway-ipc.sock")
+        server = StandInSway(socket_path, tree_replies(config_path))
+        os.environ["HOME"] = root
+        try:
+            report_args = ["report", "sway", "--only", "keybindings", "bar", "other"]
+            ipc_args = ["--no-cache", "--ipc", socket_path] + report_args
+            from_files = run_main(["--no-cache"] + report_args)
+            connections = server.connections
+            from_ipc = run_main(ipc_args)
+            running = [line for line in from_ipc.splitlines() if "(running)" in line]
+            assert [line for line in from_ipc.splitlines() if "(running)" not in line] == from_files.splitlines(), \
+                "the IPC report differs from the file report"
+            assert server.connections == connections + 1, "the IPC requests did not share one connection"
+
+            print(f"{args.files} files x {args.lines} lines, best of {args.repeat}; "
+                  f"{len(running)} running-state lines over one connection")
+            # Fill the parse cache for both paths
+            run_main(["--cache"] + report_args)
+            run_main(["--cache"] + ipc_args[1:])
+            for label, options in (("files, no cache", ["--no-cache"] + report_args),
+                                   ("files, warm cache", ["--cache"] + report_args), ("ipc, no cache", ipc_args),
+                                   ("ipc, warm cache", ["--cache"] + ipc_args[1:])):
+                best = min(timeit.repeat(lambda: run_main(options), number=1, repeat=args.repeat))
+                print(f"  {label:18s} {best * 1000:9.2f} ms")
+        finally:
+            server.close()
+            if home is None:
+                del os.environ["HOME"]
+            else:
+                os.environ["HOME"] = home
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Compares the string-aware JSONC stripper with the former regex-stripping approach on a large Waybar config.
+
+Usage: python benchmarks/bench_jsonc.py [--modules 500]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import waybar_config
+from jsonc import loads_jsonc
+
+
+def regex_loads(text):
+    """The approach parse_waybar_config used before the tokenizer."""
+    text = re.sub(r'//.*', '', text)
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)
+    text = re.sub(r',\s*([\}\]])', r'\1', text)
+    return json.loads(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    text = waybar_config(args.modules)
+    assert loads_jsonc(text) == regex_loads(text), "jsonc and the regex approach disagree"
+    for label, loads in (("regex passes", regex_loads), ("jsonc", loads_jsonc)):
+        best = min(timeit.repeat(lambda: loads(text), number=1, repeat=args.repeat))
+        print(f"  {label:14s} {best * 1000:8.2f} ms ({len(text) // 1024} KiB, {args.modules} modules)")
+
+
+if __name__ == "__main__":
+    main()
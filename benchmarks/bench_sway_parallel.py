@@ -0,0 +1,53 @@
+"""
+Compares serial and parallel parse_sway_config on a synthetic 200-file source tree.
+
+Usage: python benchmarks/bench_sway_parallel.py [--files 200] [--lines 80] [--jobs 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_collector import FileCollector
+from generate import write_sway_tree
+from sway_parser import parse_sway_config
+
+
+def time_parse(config_path, repeat, **kwargs):
+    best = None
+    features = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        features = parse_sway_config(config_path, FileCollector(), **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, features
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=80)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        config_path = write_sway_tree(root, args.files, args.lines)
+        serial_time, serial = time_parse(config_path, args.repeat)
+        thread_time, threaded = time_parse(config_path, args.repeat, jobs=args.jobs)
+        process_time, processed = time_parse(config_path, args.repeat, jobs=args.jobs, use_processes=True)
+
+    assert threaded == serial, "thread pool result differs from the serial path"
+    assert processed == serial, "process pool result differs from the serial path"
+    print(f"{args.files} files x {args.lines} lines, best of {args.repeat}")
+    print(f"  serial:              {serial_time * 1000:8.1f} ms")
+    print(f"  threads (jobs={args.jobs}):   {thread_time * 1000:8.1f} ms")
+    print(f"  processes (jobs={args.jobs}): {process_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
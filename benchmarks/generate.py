@@ -0,0 +1,227 @@
+"""
+Deterministic generators of large, realistic inputs for the parsers.
+
+Every generator takes a seed, so the same arguments always produce the same
+bytes and benchmark runs stay comparable.
+
+Usage: python benchmarks/generate.py OUTPUT_DIR [--sway-lines 10000] [--files 200] [--modules 500] [--rules 3000]
+[--app-settings 0] writes a fake home directory (~/.config/sway, ~/.config/waybar, ~/.cache/wal and, with
+--app-settings, the kitty/foot/alacritty/rofi/wofi/mako/swaylock configs) under OUTPUT_DIR.
+"""
+import argparse
+import json
+import os
+import random
+
+_KEYS = ["Return", "Up", "Down", "Left", "Right", "Tab", "Escape", "F1", "F5", "F12", "a", "b", "q", "1", "2"]
+_APPS = ["firefox", "kitty", "thunar", "pavucontrol", "rofi -show drun", "grim -g \"$(slurp)\"", "swaylock -f"]
+
+
+def sway_lines(count, seed=0, prefix=""):
+    """
+    Builds `count` Sway config lines with the mix of a large real config: variables,
+    keybindings (many with exec), workspace rules, autostart, colors, comments and
+    a bar block.
+    """
+    rng = random.Random(seed)
+    lines = ["set $mod Mod4", "set $term kitty", "set $menu wofi --show drun"]
+    bar_at = count // 2
+    i = 0
+    while len(lines) < count:
+        i += 1
+        if len(lines) == bar_at:
+            lines += ["bar {", "    position top", "    status_command waybar", "    font pango:monospace 10", "}"]
+            continue
+        kind = rng.randrange(10)
+        if kind == 0:
+            lines.append(f"set ${prefix}var{i} #{rng.randrange(0xffffff):06x}")
+        elif kind <= 3:
+            lines.append(f"bindsym $mod+{rng.choice(['', 'Shift+', 'Control+'])}{rng.choice(_KEYS)} exec {rng.choice(_APPS)}")
+        elif kind == 4:
+            lines.append(f"bindsym $mod+{rng.choice(_KEYS)} workspace number {rng.randrange(1, 11)}")
+        elif kind == 5:
+            lines.append(f"exec_always ~/.local/bin/{prefix}tool{i % 40} --flag")
+        elif kind == 6:
+            lines.append(f"client.focused $var{rng.randrange(1, i + 1)} #{rng.randrange(0xffffff):06x} #ffffff")
+        elif kind == 7:
+            lines.append(f"for_window [app_id=\"{prefix}app{i}\"] floating enable")
+        elif kind == 8:
+            lines.append(f"gaps inner {rng.randrange(20)}")
+        else:
+            lines.append(f"# comment {i}")
+    return lines[:count]
+
+
+def write_sway_config(path, lines, seed=0):
+    """Writes a single Sway config of `lines` lines and returns its path."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("\n".join(sway_lines(lines, seed)) + "\n")
+    return path
+
+
+def write_sway_tree(root, files, lines, seed=0):
+    """
+    Writes a config that includes `files` modules under config.d/ through a glob,
+    some of which also include their neighbour, and returns the root config path.
+    """
+    rng = random.Random(seed)
+    config_d = os.path.join(root, "config.d")
+    os.makedirs(config_d, exist_ok=True)
+    with open(os.path.join(root, "config"), "w") as f:
+        f.write("set $mod Mod4\n")
+        f.write(f"include {config_d}/*.conf\n")
+    for i in range(files):
+        with open(os.path.join(config_d, f"{i:03d}.conf"), "w") as f:
+            f.write("\n".join(sway_lines(lines, rng.randrange(1 << 30), prefix=f"m{i}_")) + "\n")
+            if i % 10 == 0 and i + 1 < files:
+                f.write(f"include {config_d}/{i + 1:03d}.conf\n")
+    return os.path.join(root, "config")
+
+
+def waybar_config(modules, seed=0):
+    """Builds a Waybar JSONC config with `modules` custom modules, comments and trailing commas."""
+    rng = random.Random(seed)
+    names = [f"custom/mod{i}" for i in range(modules)]
+    lines = ["// generated bar", "{", '    "layer": "top",', '    "position": "top",']
+    for position, chunk in (("modules-left", names[0::3]), ("modules-center", names[1::3]), ("modules-right", names[2::3])):
+        lines.append(f'    "{position}": [{", ".join(json.dumps(n) for n in chunk)},],')
+    for name in names:
+        lines.append(f"    /* {name} */")
+        lines.append(f'    "{name}": {{')
+        lines.append(f'        "format": "{{icon}} {rng.randrange(1000)}", // inline comment')
+        lines.append(f'        "exec": "~/.local/bin/{name.split("/")[1]}.sh",')
+        lines.append(f'        "interval": {rng.randrange(1, 60)},')
+        lines.append('    },')
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def waybar_style(rules, seed=0, modules=500):
+    """Builds a style sheet with `rules` rules mixing ids, selector lists, states and comments."""
+    rng = random.Random(seed)
+    out = ["/* generated theme */", "* { font-family: monospace; font-size: 12px; }",
+           "window#waybar { background-color: @background; color: @foreground; }"]
+    for i in range(rules):
+        module = f"custom-mod{i % modules}"
+        kind = rng.randrange(4)
+        if kind == 0:
+            selector = f"#{module}"
+        elif kind == 1:
+            selector = f"#{module}, #mod{i}"
+        elif kind == 2:
+            selector = f"#{module}.warning"
+        else:
+            selector = f".modules-left #{module}:hover"
+        out.append(f"/* rule {i} */")
+        out.append(f"{selector} {{\n    color: #{rng.randrange(0xffffff):06x};\n"
+                   f"    background-color: @color{rng.randrange(16)};\n    padding: 0 {rng.randrange(10)}px;\n"
+                   f"    border-bottom: 2px solid #{rng.randrange(0xffffff):06x};\n}}")
+    return "\n".join(out) + "\n"
+
+
+def wal_colors(seed=0):
+    """Builds a pywal colors.json document."""
+    rng = random.Random(seed)
+    colors = {f"color{i}": f"#{rng.randrange(0xffffff):06x}" for i in range(16)}
+    return {"wallpaper": "/tmp/wallpaper.png",
+            "special": {"background": colors["color0"], "foreground": colors["color7"], "cursor": colors["color7"]},
+            "colors": colors}
+
+
+def write_app_configs(home, settings, seed=0):
+    """
+    Writes kitty, foot, alacritty, rofi, wofi, mako and swaylock configs of about
+    `settings` settings each under home/.config and returns their paths by application.
+    """
+    rng = random.Random(seed)
+    config = os.path.join(home, ".config")
+
+    def color():
+        return f"#{rng.randrange(0xffffff):06x}"
+
+    files = {
+        "kitty": ("kitty/kitty.conf", ["font_family monospace"] +
+                  [f"color{i} {color()}" if i % 2 else f"map ctrl+shift+{_KEYS[i % len(_KEYS)]} action{i}"
+                   for i in range(settings)]),
+        "foot": ("foot/foot.ini", ["font=monospace:size=10", "[colors]"] +
+                 [f"regular{i}={color()[1:]}" for i in range(settings)]),
+        "alacritty": ("alacritty/alacritty.toml", ["[font]", "size = 10", "[colors.normal]"] +
+                      [f'color{i} = "{color()}"' for i in range(settings)]),
+        "rofi": ("rofi/config.rasi", ["configuration {", '    modi: "drun,run";', "}", "* {"] +
+                 [f"    color{i}: {color()};" for i in range(settings)] + ["}"]),
+        "wofi": ("wofi/config", [f"option{i}={rng.randrange(100)}" for i in range(settings)]),
+        "mako": ("mako/config", ["font=monospace 10"] + [f"[app-name=app{i}]\nbackground-color={color()}"
+                                                         for i in range(settings // 2)]),
+        "swaylock": ("swaylock/config", ["daemonize"] + [f"ring-color{i}={color()[1:]}" for i in range(settings)]),
+    }
+    paths = {}
+    for app, (relative_path, lines) in files.items():
+        path = paths[app] = os.path.join(config, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("# generated\n" + "\n".join(lines) + "\n")
+    return paths
+
+
+def write_home(home, sway_lines_count=10000, files=200, lines_per_file=50, modules=500, rules=3000, seed=0):
+    """
+    Writes a complete fake home directory for end-to-end runs and returns a
+    dictionary of the generated paths.
+    """
+    sway_dir = os.path.join(home, ".config", "sway")
+    waybar_dir = os.path.join(home, ".config", "waybar")
+    wal_dir = os.path.join(home, ".cache", "wal")
+    for directory in (sway_dir, waybar_dir, wal_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    tree_config = write_sway_tree(os.path.join(home, "sway_tree"), files, lines_per_file, seed)
+    main_lines = sway_lines(sway_lines_count, seed)
+    main_lines.insert(3, f"include {os.path.join(wal_dir, 'colors-sway')}")
+    sway_config = os.path.join(sway_dir, "config")
+    with open(sway_config, "w") as f:
+        f.write("\n".join(main_lines) + "\n")
+
+    palette = wal_colors(seed)
+    with open(os.path.join(wal_dir, "colors.json"), "w") as f:
+        json.dump(palette, f, indent=4)
+    with open(os.path.join(wal_dir, "colors-sway"), "w") as f:
+        for name, value in list(palette["special"].items()) + list(palette["colors"].items()):
+            f.write(f"set ${name} {value}\n")
+    with open(os.path.join(wal_dir, "colors-waybar.css"), "w") as f:
+        for name, value in list(palette["special"].items()) + list(palette["colors"].items()):
+            f.write(f"@define-color {name} {value};\n")
+
+    waybar_config_path = os.path.join(waybar_dir, "config.jsonc")
+    with open(waybar_config_path, "w") as f:
+        f.write(waybar_config(modules, seed))
+    style_path = os.path.join(waybar_dir, "style.css")
+    with open(style_path, "w") as f:
+        f.write('@import "../../.cache/wal/colors-waybar.css";\n' + waybar_style(rules, seed, modules))
+
+    return {"sway_config": sway_config, "sway_tree": tree_config, "waybar_config": waybar_config_path,
+            "waybar_style": style_path, "colors_waybar": os.path.join(wal_dir, "colors-waybar.css")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output_dir")
+    parser.add_argument("--sway-lines", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines-per-file", type=int, default=50)
+    parser.add_argument("--modules", type=int, default=500)
+    parser.add_argument("--rules", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app-settings", type=int, default=0,
+                        help="Settings per application config of the other applications (0: none written).")
+    args = parser.parse_args()
+
+    paths = write_home(args.output_dir, args.sway_lines, args.files, args.lines_per_file, args.modules, args.rules, args.seed)
+    if args.app_settings:
+        paths.update(write_app_configs(args.output_dir, args.app_settings, args.seed))
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
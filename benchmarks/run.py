@@ -0,0 +1,218 @@
+"""
+Times each parser on generated inputs and compares the results with a stored baseline.
+
+Each phase (parse_sway_config on one large config and on a source tree, parse_waybar_style,
+parse_waybar_config, the Sway colorizer, generate_report, the whole main() run and the
+`report sway` / `report waybar` runs) is timed separately, best of --repeat runs. The
+startup_* phases start main.py in a fresh interpreter and time it until the report starts,
+so they include the imports a single-app query no longer pays for.
+
+--save-baseline writes the timings to the baseline file; without it the run is compared
+with the baseline and exits 1 if any phase got slower than --threshold (a fraction: 0.25
+allows 25% over the baseline).
+
+Usage: python benchmarks/run.py [--save-baseline] [--baseline benchmarks/baseline.json] [--threshold 0.25] [--only PHASE ...]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colorize_sway import colorize_sway_config_line, colorize_sway_config_lines
+from file_collector import FileCollector
+from generate import sway_lines, write_home
+from reporter import generate_report
+from sway_parser import parse_sway_config
+from variable_resolver import VariableResolver
+from waybar_parser import parse_waybar_config
+from waybar_style_parser import parse_waybar_style
+import main as main_module
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+PHASES = ["sway_config", "sway_tree", "waybar_style", "waybar_config", "colorize_sway", "generate_report", "main",
+          "main_sway", "main_waybar", "startup_full", "startup_sway", "startup_waybar"]
+# Command line of each main() phase, after "main.py --no-cache"
+MAIN_RUNS = {
+    "main": [],
+    "main_sway": ["report", "sway"],
+    "main_waybar": ["report", "waybar"],
+    "startup_full": [],
+    "startup_sway": ["report", "sway"],
+    "startup_waybar": ["report", "waybar"],
+}
+
+
+def best_of(function, repeat):
+    """Returns (best wall time in seconds, result of the last call)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def first_output(args):
+    """
+    Starts main.py in a new interpreter and returns the seconds until the report began.
+
+    Parser warnings printed before the report are skipped, so the time always covers
+    the phases the report needs.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN_PATH, "--no-cache"] + args,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    for line in process.stdout:
+        if b"--- Start Report ---" in line:
+            break
+    elapsed = time.perf_counter() - start
+    process.stdout.read()
+    process.wait()
+    return elapsed
+
+
+def run_phases(paths, phases, repeat):
+    """
+    Times the requested phases against the generated home directory.
+
+    Phases that depend on another one's output (waybar_config needs the style colors,
+    generate_report needs both parsers) compute it untimed when it was not requested.
+    """
+    timings = {}
+
+    def timed(name, function):
+        if name in phases:
+            timings[name], result = best_of(function, repeat)
+            return result
+        return function()
+
+    def quiet(function):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+
+    features = timed("sway_config", lambda: parse_sway_config(paths["sway_config"], FileCollector()))
+    if "sway_tree" in phases:
+        timed("sway_tree", lambda: parse_sway_config(paths["sway_tree"], FileCollector()))
+    resolver = VariableResolver(features.get("Variables", {}))
+    style_colors = timed("waybar_style", lambda: quiet(lambda: parse_waybar_style(
+        paths["waybar_style"], resolver, paths["colors_waybar"], FileCollector())))
+    modules = timed("waybar_config", lambda: parse_waybar_config(paths["waybar_config"], resolver, style_colors))
+
+    if "colorize_sway" in phases:
+        lines = sway_lines(10000, seed=1)
+
+        def colorize():
+            colorize_sway_config_line.cache_clear()
+            return colorize_sway_config_lines(lines)
+        timed("colorize_sway", colorize)
+    if "generate_report" in phases:
+        timed("generate_report", lambda: quiet(lambda: generate_report(features, modules, FileCollector())))
+    for name, args in MAIN_RUNS.items():
+        if name not in phases:
+            continue
+        if name.startswith("startup_"):
+            timings[name] = min(first_output(args) for _ in range(repeat))
+            continue
+
+        def run_main():
+            argv = sys.argv
+            sys.argv = ["main.py", "--no-cache"] + args
+            try:
+                quiet(main_module.main)
+            finally:
+                sys.argv = argv
+        timed(name, run_main)
+    return timings
+
+
+def compare(timings, baseline, threshold):
+    """
+    Prints each phase against the baseline.
+
+    Returns:
+        The names of the phases slower than the baseline by more than threshold.
+    """
+    regressions = []
+    for name, seconds in timings.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"  {name:16s} {seconds * 1000:9.2f} ms  (no baseline)")
+            continue
+        change = seconds / previous - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:16s} {seconds * 1000:9.2f} ms  baseline {previous * 1000:9.2f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's timings as the baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown per phase as a fraction of the baseline (default: 0.25).")
+    parser.add_argument("--only", nargs="+", choices=PHASES, default=PHASES, help="Phases to run.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the timings as JSON.")
+    args = parser.parse_args()
+
+    workload = {"sway_lines": 10000, "files": 200, "lines_per_file": 50, "modules": 500, "rules": 3000, "seed": 0}
+    home = os.environ.get("HOME")
+    with tempfile.TemporaryDirectory() as root:
+        paths = write_home(root, workload["sway_lines"], workload["files"], workload["lines_per_file"],
+                           workload["modules"], workload["rules"], workload["seed"])
+        # FileCollector discovers configs under ~, so point it at the generated home
+        os.environ["HOME"] = root
+        try:
+            timings = run_phases(paths, args.only, args.repeat)
+        finally:
+            if home is None:
+                del os.environ["HOME"]
+            else:
+                os.environ["HOME"] = home
+
+    if args.json:
+        print(json.dumps(timings, indent=2))
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f).get("timings", {})
+        baseline.update(timings)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "workload": workload, "timings": baseline}, f, indent=2)
+        print(f"Saved baseline for {len(timings)} phases to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        compare(timings, {}, args.threshold)
+        return 0
+    with open(args.baseline, "r") as f:
+        stored = json.load(f)
+    if stored.get("workload") != workload:
+        print("Warning: The baseline was recorded for a different workload; timings are not comparable.")
+    print(f"Best of {args.repeat}, threshold {args.threshold:.0%}")
+    regressions = compare(timings, stored.get("timings", {}), args.threshold)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
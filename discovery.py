@@ -0,0 +1,226 @@
+import contextlib
+import os
+
+# Placeholders a candidate path may start with, expanded when a Discovery is created
+_PLACEHOLDERS = ("{config}", "{cache}", "{cwd}", "~")
+
+
+class DiscoveryRule:
+    """
+    Where one kind of file may live and how the candidates found are recorded.
+
+    Attributes:
+        key: Name the rule is looked up by, such as "sway_config".
+        file_type: FileMetadata type given to the files found.
+        candidates: Paths in priority order; "{config}" is $XDG_CONFIG_HOME (or ~/.config),
+            "{cache}" is ~/.cache and "{cwd}" the working directory.
+        active: Which candidate is active: "primary" (only the first candidate, if it
+            exists), "first" (the first one that exists) or None (activity is left to
+            later phases, as for sourced files).
+        keep_all: Record every existing candidate; otherwise only the first one found.
+    """
+
+    __slots__ = ("key", "file_type", "candidates", "active", "keep_all")
+
+    def __init__(self, key, file_type, candidates, active="first", keep_all=True):
+        self.key = key
+        self.file_type = file_type
+        self.candidates = tuple(candidates)
+        self.active = active
+        self.keep_all = keep_all
+
+    def __repr__(self):
+        return f"DiscoveryRule({self.key!r}, {self.file_type!r})"
+
+
+# Candidate locations of every supported application. A new application (or a new
+# location) only needs an entry here; Discovery does the probing.
+APP_REGISTRY = {
+    "sway": (
+        DiscoveryRule("sway_config", "sway_config", [
+            "{config}/sway/config",
+            "~/.sway/config",
+            "{config}/i3/config",
+            "~/.i3/config",
+            "/etc/sway/config",
+            "/etc/i3/config",
+            "{cwd}/config_link/sway/config",  # Assuming a symlink for testing
+        ], active="primary"),
+        # Active only once the active Sway config is found to source it
+        DiscoveryRule("colors_sway", "wal_generated", ["{cache}/wal/colors-sway"], active=None),
+    ),
+    "waybar": (
+        DiscoveryRule("waybar_config", "waybar_config", [
+            "{config}/waybar/config.jsonc",
+            "{config}/waybar/config",
+            "{cwd}/config_link/waybar/config.jsonc",  # Assuming a symlink for testing
+            "{cwd}/config_link/waybar/config",
+        ]),
+        DiscoveryRule("waybar_style", "waybar_style", [
+            "{config}/waybar/style.css",
+            "{cwd}/config_link/waybar/style.css",
+        ], keep_all=False),
+        DiscoveryRule("colors_waybar", "wal_generated", [
+            "{cache}/wal/colors-waybar.css",
+            "{config}/waybar/colors-waybar.css",
+            "{cwd}/config_link/waybar/colors-waybar.css",
+            "{cwd}/colors-waybar.css",  # For local testing
+        ], active=None, keep_all=False),
+    ),
+}
+RULES = {rule.key: rule for rules in APP_REGISTRY.values() for rule in rules}
+
+
+def register_rules(app, rules):
+    """Adds (or replaces) the discovery rules of an application."""
+    APP_REGISTRY[app] = tuple(rules)
+    for rule in rules:
+        RULES[rule.key] = rule
+
+
+def root_environment(root):
+    """
+    Returns the environment that points ~ and the XDG config and cache directories
+    into root, for the parsers that expand them themselves (include paths with ~ or
+    $HOME, pywal's colors.json, script lookups).
+    """
+    return {"HOME": root, "XDG_CONFIG_HOME": os.path.join(root, ".config"),
+            "XDG_CACHE_HOME": os.path.join(root, ".cache")}
+
+
+@contextlib.contextmanager
+def rooted_environment(root):
+    """
+    Points the environment into root (see root_environment) until the block exits,
+    then restores it. With root None the environment is left as it is.
+    """
+    if root is None:
+        yield
+        return
+    environment = root_environment(root)
+    saved = {name: os.environ.get(name) for name in environment}
+    os.environ.update(environment)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class Discovery:
+    """
+    Finds the candidate files of the registry with one directory scan per directory.
+
+    Candidates are grouped by their parent directory, and each directory is listed
+    once with os.scandir the first time any of its candidates is asked about. The
+    existence check (which follows symlinks, like os.path.exists) and realpath of
+    every candidate are cached, so rules sharing a directory such as ~/.config/waybar
+    or ~/.cache/wal cost no further system calls.
+    """
+
+    def __init__(self, registry=None, root=None):
+        """
+        Args:
+            registry: Rules by application (default: every registered rule).
+            root: A home directory or dotfile tree to search instead of the current
+                user's: the placeholders point into it and absolute candidates such
+                as /etc/sway/config are looked up under it.
+        """
+        self.rules = RULES if registry is None else {rule.key: rule for rules in registry.values()
+                                                     for rule in rules}
+        self.root = root
+        if root is None:
+            config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+            self._roots = {"{config}": config_home, "{cache}": os.path.expanduser("~/.cache"), "{cwd}": os.getcwd(),
+                           "~": os.path.expanduser("~")}
+        else:
+            self._roots = {"{config}": os.path.join(root, ".config"), "{cache}": os.path.join(root, ".cache"),
+                           "{cwd}": root, "~": root}
+        self._listings = {}
+        self._exists = {}
+        self._realpaths = {}
+        # Instrumentation
+        self.directories_scanned = 0
+
+    def expand(self, candidate):
+        """Returns candidate with its leading placeholder replaced."""
+        for placeholder in _PLACEHOLDERS:
+            if candidate.startswith(placeholder):
+                return self._roots[placeholder] + candidate[len(placeholder):]
+        if self.root is not None and os.path.isabs(candidate):
+            return os.path.join(self.root, candidate.lstrip(os.sep))
+        return candidate
+
+    def _listing(self, directory):
+        """Returns the entries of directory by name (empty if it cannot be listed)."""
+        listing = self._listings.get(directory)
+        if listing is None:
+            listing = {}
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        listing[entry.name] = entry
+            except OSError:
+                pass
+            self.directories_scanned += 1
+            self._listings[directory] = listing
+        return listing
+
+    def exists(self, path):
+        """Equivalent of os.path.exists(path), answered from the listing of its directory."""
+        found = self._exists.get(path)
+        if found is None:
+            entry = self._listing(os.path.dirname(path)).get(os.path.basename(path))
+            found = False
+            if entry is not None:
+                try:
+                    # Follows symlinks, so a dangling link does not count as found
+                    entry.stat()
+                    found = True
+                except OSError:
+                    pass
+            self._exists[path] = found
+        return found
+
+    def candidate_paths(self):
+        """Returns every candidate path of every rule, expanded, whether it exists or not."""
+        return [self.expand(candidate) for rule in self.rules.values() for candidate in rule.candidates]
+
+    def realpath(self, path):
+        resolved = self._realpaths.get(path)
+        if resolved is None:
+            resolved = self._realpaths[path] = os.path.realpath(path)
+        return resolved
+
+    def find(self, key):
+        """
+        Probes the candidates of a rule.
+
+        Returns:
+            A list of (realpath, is_active) pairs for the candidates found, in priority
+            order, without duplicates. is_active is None for rules that leave it open.
+        """
+        rule = self.rules[key]
+        found = []
+        seen = set()
+        for i, candidate in enumerate(rule.candidates):
+            path = self.expand(candidate)
+            if not self.exists(path):
+                continue
+            resolved = self.realpath(path)
+            if resolved in seen:
+                continue
+            seen.add(resolved)
+            if rule.active == "primary":
+                is_active = i == 0
+            elif rule.active == "first":
+                is_active = not found
+            else:
+                is_active = None
+            found.append((resolved, is_active))
+            if not rule.keep_all:
+                break
+        return found
@@ -0,0 +1,156 @@
+import glob
+import os
+import re
+from profiling import PROFILER
+from records import FILES, AppSetting
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+_RASI_COMMENT_RE = re.compile(r'/\*.*?\*/|//.*$')
+_RASI_SETTING_RE = re.compile(r'([\w-]+)\s*:\s*(.*?);?$')
+_RASI_DIRECTIVE_RE = re.compile(r'@(theme|import)\s+"?([^"]*)"?\s*;?$')
+
+
+def parse_dotfile(config_path, syntax, file_collector):
+    """
+    Reads the settings of an application config and of the files it includes.
+
+    Args:
+        config_path: The path to the config file.
+        syntax: "kitty" (`key value` lines), "ini" (`[section]` and `key=value` lines, as
+            used by foot, mako, wofi and swaylock), "rasi" (rofi) or "toml" (alacritty).
+        file_collector: A FileCollector instance; included files are recorded as sourced.
+
+    Returns:
+        A list of AppSetting records in file order, included files expanded in place.
+    """
+    settings = []
+    _parse_file(config_path, syntax, file_collector, settings, {os.path.realpath(config_path)})
+    return settings
+
+
+def _read(file_path):
+    """Returns the text of a file, or None (with a warning) if it cannot be read."""
+    try:
+        with open(file_path, "r") as f:
+            text = f.read()
+    except FileNotFoundError:
+        print(f"Warning: Included file not found: {file_path}")
+        return None
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Warning: Could not read {file_path}: {e}")
+        return None
+    PROFILER.count("files read")
+    PROFILER.count("bytes read", len(text))
+    return text
+
+
+def _expand_include(arg, including_file, file_collector):
+    """Expands an include argument (relative to the including file, ~ and $VARS allowed) into paths."""
+    path = os.path.expandvars(os.path.expanduser(arg.strip().strip('"\'')))
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(including_file), path)
+    if not glob.has_magic(path):
+        return [path]
+    file_collector.add_include_pattern(path)
+    return sorted(glob.glob(path))
+
+
+def _parse_file(file_path, syntax, file_collector, settings, visited):
+    text = _read(file_path)
+    if text is None:
+        return
+    if syntax == "toml":
+        settings.extend(_toml_settings(file_path, text))
+        return
+
+    file_id = FILES.intern(file_path)
+    section = ""
+    blocks = []
+    offset = 0
+    for line_number, raw_line in enumerate(text.splitlines(keepends=True), 1):
+        line_offset = offset
+        offset += len(raw_line.encode())
+        line = raw_line.strip()
+        if syntax == "rasi" and "/" in line:
+            line = _RASI_COMMENT_RE.sub("", line).strip()
+        if not line or line.startswith("#") or (syntax == "ini" and line.startswith(";")):
+            continue
+
+        include = None
+        if syntax == "kitty":
+            parts = line.split(None, 1)
+            key, value = parts[0], parts[1] if len(parts) > 1 else ""
+            if key in ("include", "globinclude"):
+                include = value
+        elif syntax == "ini":
+            if line.startswith("[") and line.endswith("]"):
+                section = line[1:-1].strip()
+                continue
+            key, _, value = line.partition("=")
+            key, value = key.strip(), value.strip()
+            if key == "include":
+                include = value
+            # foot's settings outside any section belong to [main]
+            elif section and section != "main":
+                key = f"{section}.{key}"
+        else:
+            directive = _RASI_DIRECTIVE_RE.match(line)
+            if directive:
+                key, value = "@" + directive.group(1), directive.group(2)
+            elif line.endswith("{"):
+                blocks.append(line[:-1].strip())
+                continue
+            elif line.startswith("}"):
+                if blocks:
+                    blocks.pop()
+                continue
+            else:
+                setting = _RASI_SETTING_RE.match(line)
+                if not setting:
+                    continue
+                key, value = setting.group(1), setting.group(2).strip()
+                # Settings of the configuration block are the plain rofi options
+                prefix = ".".join(block for block in blocks if block != "configuration")
+                if prefix:
+                    key = f"{prefix}.{key}"
+
+        if include is not None:
+            for included_path in _expand_include(include, file_path, file_collector):
+                file_collector.add_sourced_relationship(file_path, included_path)
+                included_realpath = os.path.realpath(included_path)
+                if included_realpath in visited:
+                    continue  # Already read once (or an include cycle)
+                visited.add(included_realpath)
+                _parse_file(included_path, syntax, file_collector, settings, visited)
+            continue
+        settings.append(AppSetting(key, value, file_id, line_number, line_offset))
+
+
+def _toml_settings(file_path, text):
+    """Flattens a TOML document into AppSettings with dotted keys (TOML gives no line numbers)."""
+    if tomllib is None:
+        print(f"Warning: Could not parse {file_path}: reading TOML needs Python 3.11 or newer")
+        return []
+    try:
+        document = tomllib.loads(text)
+    except tomllib.TOMLDecodeError as e:
+        print(f"Warning: Could not parse {file_path}: {e}")
+        return []
+    file_id = FILES.intern(file_path)
+    settings = []
+    stack = [("", document)]
+    while stack:
+        prefix, table = stack.pop()
+        nested = []
+        for key, value in table.items():
+            key = f"{prefix}.{key}" if prefix else key
+            if isinstance(value, dict):
+                nested.append((key, value))
+            else:
+                settings.append(AppSetting(key, str(value), file_id))
+        stack.extend(reversed(nested))
+    return settings
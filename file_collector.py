@@ -1,6 +1,6 @@
-import os
-import re
+import threading
 from collections import defaultdict
+from discovery import APP_REGISTRY, Discovery
 
 class FileMetadata:
     def __init__(self, path, file_type="other", is_active=False):
@@ -20,27 +20,68 @@ class FileMetadata:
         return f"FileMetadata(path='{self.path}', type='{self.type}', active={self.is_active}, sourced_by={len(self.sourced_by)}, sources={len(self.sources)})"
 
 class FileCollector:
-    def __init__(self):
+    """
+    Collects the files a run touches, with their type, activity and source relationships.
+
+    Besides `files` (path -> FileMetadata), the files are indexed by type and by
+    active type, so lookups such as "the active Sway configs" do not rescan every
+    file. Type and activity changes go through _update() to keep the indexes in step.
+    Config files are found by the registry-driven Discovery engine.
+
+    The app parsers of a run share one collector from several threads, so every
+    change is made under a lock.
+    """
+
+    def __init__(self, discovery=None):
         self.files = {} # Stores FileMetadata objects, keyed by path
+        self.source_cycles = [] # Lists of paths forming a source/include cycle
+        self.include_patterns = set() # Glob patterns of includes, whose new matches the files would gain
+        self.discovery = discovery if discovery is not None else Discovery()
+        self._by_type = defaultdict(dict) # type -> {path: FileMetadata}
+        self._active_by_type = defaultdict(dict) # type -> {path: FileMetadata} of active files
+        self._lock = threading.RLock()
+
+    def _update(self, metadata, file_type=None, is_active=None):
+        """Changes the type and/or active status of a file, keeping the indexes in step."""
+        if file_type is not None and file_type != metadata.type:
+            self._by_type[metadata.type].pop(metadata.path, None)
+            self._active_by_type[metadata.type].pop(metadata.path, None)
+            metadata.type = file_type
+            self._by_type[file_type][metadata.path] = metadata
+            if metadata.is_active:
+                self._active_by_type[file_type][metadata.path] = metadata
+        if is_active is not None and is_active != metadata.is_active:
+            metadata.is_active = is_active
+            if is_active:
+                self._active_by_type[metadata.type][metadata.path] = metadata
+            else:
+                self._active_by_type[metadata.type].pop(metadata.path, None)
 
     def _get_or_create_file_metadata(self, file_path, file_type="other", is_active=False):
-        if file_path not in self.files:
-            self.files[file_path] = FileMetadata(file_path, file_type, is_active)
-        else:
-            # Update type and active status if more specific information is provided
-            if file_type != "other" and self.files[file_path].type == "other":
-                self.files[file_path].type = file_type
-            if is_active:
-                self.files[file_path].is_active = True
-        return self.files[file_path]
+        with self._lock:
+            metadata = self.files.get(file_path)
+            if metadata is None:
+                metadata = self.files[file_path] = FileMetadata(file_path, file_type, is_active)
+                self._by_type[file_type][file_path] = metadata
+                if is_active:
+                    self._active_by_type[file_type][file_path] = metadata
+            else:
+                # Update type and active status if more specific information is provided
+                if file_type != "other" and metadata.type == "other":
+                    self._update(metadata, file_type=file_type)
+                if is_active:
+                    self._update(metadata, is_active=True)
+            return metadata
 
     def add_active_config(self, file_path, file_type="active_config"):
-        metadata = self._get_or_create_file_metadata(file_path, file_type, is_active=True)
-        metadata.type = file_type # Ensure type is set correctly for active configs
+        with self._lock:
+            metadata = self._get_or_create_file_metadata(file_path, file_type, is_active=True)
+            self._update(metadata, file_type=file_type) # Ensure type is set correctly for active configs
 
     def add_inactive_config(self, file_path, file_type="inactive_config"):
-        metadata = self._get_or_create_file_metadata(file_path, file_type, is_active=False)
-        metadata.type = file_type # Ensure type is set correctly for inactive configs
+        with self._lock:
+            metadata = self._get_or_create_file_metadata(file_path, file_type, is_active=False)
+            self._update(metadata, file_type=file_type) # Ensure type is set correctly for inactive configs
 
     def add_script(self, file_path):
         self._get_or_create_file_metadata(file_path, "script")
@@ -52,97 +93,84 @@ class FileCollector:
         self._get_or_create_file_metadata(file_path, "wal_generated")
 
     def add_sourced_relationship(self, source_file_path, sourced_file_path):
-        source_metadata = self._get_or_create_file_metadata(source_file_path)
-        sourced_metadata = self._get_or_create_file_metadata(sourced_file_path)
+        with self._lock:
+            source_metadata = self._get_or_create_file_metadata(source_file_path)
+            sourced_metadata = self._get_or_create_file_metadata(sourced_file_path)
 
-        source_metadata.add_source(sourced_file_path)
-        sourced_metadata.add_sourced_by(source_file_path)
+            source_metadata.add_source(sourced_file_path)
+            sourced_metadata.add_sourced_by(source_file_path)
         
-        # If a sourced file was initially 'other', and it's sourced by an active config,
-        # it's likely an active part of the configuration.
-        if source_metadata.is_active and sourced_metadata.type == "other":
-            sourced_metadata.type = "sourced_config"
-            sourced_metadata.is_active = True # Mark as active if sourced by an active config
+            # If a sourced file was initially 'other', and it's sourced by an active config,
+            # it's likely an active part of the configuration.
+            if source_metadata.is_active and sourced_metadata.type == "other":
+                # Mark as active if sourced by an active config
+                self._update(sourced_metadata, file_type="sourced_config", is_active=True)
+
+    def add_include_pattern(self, pattern):
+        with self._lock:
+            self.include_patterns.add(pattern)
+
+    def add_source_cycle(self, cycle):
+        with self._lock:
+            if cycle not in self.source_cycles:
+                self.source_cycles.append(cycle)
 
     def get_files(self):
         return {k: sorted(list(v)) for k, v in self.files.items()}
 
+    def files_of_type(self, file_type, active=False):
+        """Returns the paths of the files of a type (only the active ones with active=True)."""
+        with self._lock:
+            return list((self._active_by_type if active else self._by_type).get(file_type, ()))
+
+    def discover(self, key, record=True):
+        """
+        Records the files found for a discovery rule (see discovery.APP_REGISTRY).
+
+        Args:
+            key: The rule key.
+            record: Record the files found; without it the candidates are only probed,
+                for a stage that runs ahead and leaves recording to a later one.
+
+        Returns:
+            The real paths found, in priority order.
+        """
+        rule = self.discovery.rules[key]
+        # Probing needs no lock: the Discovery caches only ever gain the same answers
+        candidates = self.discovery.find(key)
+        if not record:
+            return [path for path, _ in candidates]
+        with self._lock:
+            found = []
+            for path, is_active in candidates:
+                if is_active is None:
+                    # Whether it is used is decided later, e.g. when an active config sources it
+                    self._get_or_create_file_metadata(path, rule.file_type)
+                elif is_active:
+                    self.add_active_config(path, rule.file_type)
+                else:
+                    self.add_inactive_config(path, rule.file_type)
+                found.append(path)
+            return found
+
+    def discover_app(self, app):
+        """Runs every discovery rule of an application. Returns {rule key: paths found}."""
+        return {rule.key: self.discover(rule.key) for rule in APP_REGISTRY[app]}
+
     def find_sway_configs(self):
-        # Prioritize ~/.config/sway/config as the primary active config
-        user_config_path = os.path.expanduser("~/.config/sway/config")
-        active_sway_config_found = False
-
-        if os.path.exists(user_config_path):
-            resolved_path = os.path.realpath(user_config_path)
-            self.add_active_config(resolved_path, file_type="sway_config")
-            active_sway_config_found = True
-        
-        # Other potential Sway config paths (will be marked inactive if they exist)
-        potential_sway_configs = [
-            "/etc/sway/config",
-            os.path.join(os.getcwd(), "config_link/sway/config") # Assuming a symlink for testing
-        ]
-
-        for path in potential_sway_configs:
-            if os.path.exists(path):
-                resolved_path = os.path.realpath(path)
-                # Only mark as inactive if it's not the primary active config
-                if resolved_path != os.path.realpath(user_config_path):
-                    self.add_inactive_config(resolved_path, file_type="sway_config")
-        
-        # Also check for ~/.cache/wal/colors-sway
-        wal_colors_sway = os.path.expanduser("~/.cache/wal/colors-sway")
-        if os.path.exists(wal_colors_sway):
-            self.add_wal_generated_file(wal_colors_sway)
-            # Its active status will be determined if it's sourced by the active sway config.
-        
-        return [f.path for f in self.files.values() if f.type == "sway_config" and f.is_active]
+        self.discover("sway_config")
+        # colors-sway is marked active if the active sway config sources it
+        self.discover("colors_sway")
+        return self.files_of_type("sway_config", active=True)
 
     def find_waybar_configs(self):
-        potential_waybar_configs = [
-            os.path.expanduser("~/.config/waybar/config.jsonc"),
-            os.path.join(os.getcwd(), "config_link/waybar/config.jsonc") # Assuming a symlink for testing
-        ]
-
-        found_active = False
-        for path in potential_waybar_configs:
-            if os.path.exists(path):
-                resolved_path = os.path.realpath(path)
-                if not found_active:
-                    self.add_active_config(resolved_path, file_type="waybar_config")
-                    found_active = True
-                else:
-                    self.add_inactive_config(resolved_path, file_type="waybar_config")
-        
-        return [f.path for f in self.files.values() if f.type == "waybar_config" and f.is_active]
+        self.discover("waybar_config")
+        return self.files_of_type("waybar_config", active=True)
 
     def find_waybar_styles(self):
-        potential_waybar_styles = [
-            os.path.expanduser("~/.config/waybar/style.css"),
-            os.path.join(os.getcwd(), "config_link/waybar/style.css") # Assuming a symlink for testing
-        ]
-
-        for path in potential_waybar_styles:
-            if os.path.exists(path):
-                resolved_path = os.path.realpath(path)
-                self.add_design_file(resolved_path) # Add to design files
-                # Mark as active if it's the primary style.css
-                self.files[resolved_path].is_active = True
-                self.files[resolved_path].type = "waybar_style"
-                break # Only take the first found style.css
-        
-        return [f.path for f in self.files.values() if f.type == "waybar_style" and f.is_active]
-
-    def find_colors_waybar_css(self):
-        colors_waybar_path = None
-        potential_colors_waybar = [
-            os.path.expanduser("~/.cache/wal/colors-waybar.css"),
-            os.path.join(os.getcwd(), "colors-waybar.css") # For local testing
-        ]
-
-        for path in potential_colors_waybar:
-            if os.path.exists(path):
-                colors_waybar_path = os.path.realpath(path)
-                self.add_wal_generated_file(colors_waybar_path) # Mark as wal_generated
-                break
-        return colors_waybar_path
\ No newline at end of file
+        self.discover("waybar_style")
+        return self.files_of_type("waybar_style", active=True)
+
+    def find_colors_waybar_css(self, record=True):
+        found = self.discover("colors_waybar", record)
+        return found[0] if found else None
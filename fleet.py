@@ -0,0 +1,211 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+def analyze_root(root):
+    """
+    Parses every registered application of one home directory or dotfile tree.
+
+    Runs in a worker process: the parsers run serially, the environment points
+    into the root while they do, and their warnings are counted instead of printed.
+
+    Returns:
+        A tuple of (summary dictionary, bindings). The bindings are the keybindings
+        in effect as "chord: command" strings ("chord [mode]: command" outside the
+        default mode), for the fleet-wide counts only.
+    """
+    from app_registry import APP_PARSERS, AppRun, all_sections, run_apps
+    from discovery import Discovery, rooted_environment
+    from file_collector import FileCollector
+
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        return {"root": root, "error": "Not a directory"}, []
+    output = io.StringIO()
+    start = time.perf_counter()
+    bindings = []
+    try:
+        with rooted_environment(root), contextlib.redirect_stdout(output):
+            file_collector = FileCollector(Discovery(root=root))
+            run = AppRun(file_collector, list(APP_PARSERS), all_sections())
+            results = run_apps(run, list(APP_PARSERS))
+        summary, bindings = _summarize_root(root, results, file_collector)
+    except Exception as e:  # One broken tree must not stop the fleet
+        summary = {"root": root, "error": f"{type(e).__name__}: {e}"}
+    summary["warnings"] = sum(1 for line in output.getvalue().splitlines() if line.startswith(("Warning", "Error")))
+    summary["seconds"] = round(time.perf_counter() - start, 4)
+    return summary, bindings
+
+
+def _summarize_root(root, results, file_collector):
+    sway_features, _ = results["sway"]
+    index = sway_features.get("Keybinding Index")
+    bindings = []
+    for binding in index or ():
+        mode = f" [{binding.mode}]" if binding.mode != "default" else ""
+        bindings.append(f"{binding.chord}{mode}: {binding.command}")
+    waybar_modules = results.get("waybar") or {}
+    sway_configs = file_collector.files_of_type("sway_config", active=True)
+    summary = {
+        "root": root,
+        "sway_config": sway_configs[0] if sway_configs else None,
+        "files": len(file_collector.files),
+        "variables": len(sway_features.get("Variables", ())),
+        "keybindings": len(index) if index is not None else 0,
+        "keybinding_conflicts": len(index.conflicts()) if index is not None else 0,
+        "autostart": len(sway_features.get("Application Autostart", ())),
+        "bars": len(sway_features["Blocks"].of_kind("bar")) if "Blocks" in sway_features else 0,
+        "waybar_modules": sorted({module.name for modules in waybar_modules.values() for module in modules}),
+        "apps": [name for name, result in results.items() if name not in ("sway", "waybar") and result],
+    }
+    return summary, bindings
+
+
+class FleetSummary:
+    """
+    The per-root summaries of a fleet run and the fleet-wide counts.
+
+    Results are added as they arrive: their bindings go straight into the counters
+    and only the small summary dictionary is kept, in the slot of its root.
+    """
+
+    def __init__(self, count=0):
+        self.roots = [None] * count
+        self.modules = Counter()
+        self.bindings = Counter()
+        self.apps = Counter()
+
+    def add(self, index, summary, bindings):
+        """Adds the result of the root at index (in the order the roots were given)."""
+        self.roots[index] = summary
+        self.modules.update(summary.get("waybar_modules", ()))
+        self.apps.update(summary.get("apps", ()))
+        self.bindings.update(bindings)
+
+    def stats(self, top=20):
+        """Returns the fleet-wide statistics, with the `top` most common modules and bindings."""
+        roots = self.roots
+        return {
+            "roots": len(roots),
+            "with_sway_config": sum(1 for summary in roots if summary.get("sway_config")),
+            "with_waybar_modules": sum(1 for summary in roots if summary.get("waybar_modules")),
+            "errors": sum(1 for summary in roots if "error" in summary),
+            "keybindings": sum(summary.get("keybindings", 0) for summary in roots),
+            "keybinding_conflicts": sum(summary.get("keybinding_conflicts", 0) for summary in roots),
+            "apps": dict(_most_common(self.apps)),
+            "most_common_modules": _most_common(self.modules, top),
+            "most_common_bindings": _most_common(self.bindings, top),
+            "seconds": round(sum(summary.get("seconds", 0) for summary in roots), 4),
+        }
+
+
+def _most_common(counter, top=None):
+    """
+    Counter.most_common with ties broken by name: the counters fill in the order
+    the workers finish, which differs from run to run.
+    """
+    return sorted(counter.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+
+def run_fleet(roots, workers=None, max_tasks_per_child=100):
+    """
+    Analyzes many roots on a process pool.
+
+    Memory stays bounded however many roots there are: at most a few tasks per
+    worker are in flight, each result is aggregated as soon as it arrives, and each
+    worker process (with the paths it interned in records.FILES) is replaced after
+    max_tasks_per_child roots (on Python 3.11 and later; older pools keep their
+    workers). The roots are analyzed in worker processes even with one worker, so
+    nothing of them accumulates in this process.
+
+    Args:
+        roots: The home directories or dotfile trees.
+        workers: Worker processes (default: one per CPU).
+        max_tasks_per_child: Roots a worker analyzes before it is replaced.
+
+    Returns:
+        A FleetSummary, with the roots in the order given.
+    """
+    roots = list(roots)
+    workers = workers or os.cpu_count() or 1
+    fleet = FleetSummary(len(roots))
+    options = {"max_tasks_per_child": max_tasks_per_child} if sys.version_info >= (3, 11) else {}
+    with ProcessPoolExecutor(max_workers=workers, **options) as pool:
+        pending = {}
+        next_root = 0
+        while next_root < len(roots) or pending:
+            while next_root < len(roots) and len(pending) < workers * 4:
+                pending[pool.submit(analyze_root, roots[next_root])] = next_root
+                next_root += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                summary, bindings = future.result()
+                fleet.add(pending.pop(future), summary, bindings)
+    return fleet
+
+
+def write_json(fleet, out, top=20):
+    json.dump({"fleet": fleet.stats(top), "roots": fleet.roots}, out, indent=2)
+    out.write("\n")
+
+
+def write_csv(fleet, out, top=20):
+    """
+    Writes the summary as root,metric,value rows: the per-root counts, then the
+    fleet-wide ones under the root "*" (lists become one row per item).
+    """
+    writer = csv.writer(out)
+    writer.writerow(["root", "metric", "value"])
+    for summary in fleet.roots:
+        for metric, value in summary.items():
+            if metric == "root":
+                continue
+            if isinstance(value, list):
+                for item in value:
+                    writer.writerow([summary["root"], metric, item])
+            else:
+                writer.writerow([summary["root"], metric, value])
+    for metric, value in fleet.stats(top).items():
+        if isinstance(value, dict):
+            value = list(value.items())
+        if isinstance(value, list):
+            for name, count in value:
+                writer.writerow(["*", f"{metric}:{name}", count])
+        else:
+            writer.writerow(["*", metric, value])
+
+
+def read_roots(roots, roots_from=None):
+    """Returns the roots given on the command line plus those listed one per line in roots_from ("-" for stdin)."""
+    roots = list(roots)
+    if roots_from:
+        with (contextlib.nullcontext(sys.stdin) if roots_from == "-" else open(roots_from)) as f:
+            roots.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return roots
+
+
+def fleet_command(args):
+    """
+    Runs the `fleet` subcommand.
+
+    Returns:
+        The exit status: 0, or 2 if no roots were given.
+    """
+    roots = read_roots(args.roots, args.roots_from)
+    if not roots:
+        print("Error: No roots given (pass directories or --roots-from FILE).", file=sys.stderr)
+        return 2
+    fleet = run_fleet(roots, args.workers)
+    write = write_csv if args.format == "csv" else write_json
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write(fleet, out, args.top)
+    else:
+        write(fleet, sys.stdout, args.top)
+    return 0
@@ -0,0 +1,86 @@
+import os
+import stat
+
+
+class FileProbe:
+    """
+    Memoized filesystem checks shared by the parsers during one run.
+
+    Every unique path is stat'ed at most once; existence, regular-file and
+    executable checks are all answered from that single stat result. Bare command
+    names are resolved through an index of $PATH built once with os.scandir.
+    """
+
+    def __init__(self, path_env=None):
+        self._stats = {}
+        self._path_env = os.environ.get("PATH", "") if path_env is None else path_env
+        self._path_index = None
+        self._euid = os.geteuid()
+        self._groups = set(os.getgroups()) | {os.getegid()}
+        # Instrumentation
+        self.stat_calls = 0
+        self.naive_syscalls = 0
+        self.path_dirs_scanned = 0
+
+    def stat(self, path):
+        """Returns the os.stat result of path (following symlinks), or None if it does not exist."""
+        try:
+            return self._stats[path]
+        except KeyError:
+            pass
+        self.stat_calls += 1
+        try:
+            result = os.stat(path)
+        except (OSError, ValueError):
+            result = None
+        self._stats[path] = result
+        return result
+
+    def exists(self, path):
+        self.naive_syscalls += 1
+        return self.stat(path) is not None
+
+    def is_executable_file(self, path):
+        """Equivalent of os.path.isfile(path) and os.access(path, os.X_OK) from one cached stat."""
+        # The unmemoized check costs exists + isfile + access.
+        self.naive_syscalls += 3
+        st = self.stat(path)
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return False
+        if self._euid == 0:
+            return bool(st.st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
+        if st.st_uid == self._euid:
+            return bool(st.st_mode & stat.S_IXUSR)
+        if st.st_gid in self._groups:
+            return bool(st.st_mode & stat.S_IXGRP)
+        return bool(st.st_mode & stat.S_IXOTH)
+
+    def _build_path_index(self):
+        index = {}
+        for directory in self._path_env.split(os.pathsep):
+            if not directory:
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    self.path_dirs_scanned += 1
+                    for entry in entries:
+                        index.setdefault(entry.name, []).append(entry.path)
+            except OSError:
+                continue
+        return index
+
+    def which(self, command):
+        """Resolves a bare command name to the first executable of that name on $PATH."""
+        if self._path_index is None:
+            self._path_index = self._build_path_index()
+        for candidate in self._path_index.get(command, ()):
+            if self.is_executable_file(candidate):
+                return candidate
+        return None
+
+    def stats(self):
+        """Returns a one-line summary of the probe counters."""
+        saved = self.naive_syscalls - self.stat_calls
+        indexed = len(self._path_index) if self._path_index is not None else 0
+        return (f"Filesystem probes: {self.naive_syscalls} checks answered with {self.stat_calls} stat calls "
+                f"({saved} syscalls saved); PATH index: {indexed} names in {self.path_dirs_scanned} directories")
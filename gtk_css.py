@@ -0,0 +1,279 @@
+import functools
+import re
+
+# Single-pass tokenizer for GTK CSS. The 'rule' alternative is a fast path that
+# takes a whole "selectors { declarations }" block (and the comments before it)
+# in one match when it holds no comments, strings or nested braces; anything
+# else falls back to the finer tokens.
+_COMMENT = r'/\*[^*]*\*+(?:[^/*][^*]*\*+)*/'
+_TOKEN_RE = re.compile(r"""
+    (?P<rule>(?:\s*""" + _COMMENT + r""")*(?P<prelude>[^{};"'/@]+)\{(?P<body>[^{}"'/]*)\})
+  | (?P<comment>""" + _COMMENT + r""")
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<open>\{)
+  | (?P<close>\})
+  | (?P<semi>;)
+  | (?P<text>[^{};"'/]+|/)
+""", re.X | re.S)
+_COMMENT_RE = re.compile(_COMMENT)
+_DECLARATION_RE = re.compile(r'([^:;]+):([^;]*)')
+
+# Splits a selector into compounds on descendant/child/sibling combinators.
+_COMBINATOR_RE = re.compile(r'\s*[>+~]\s*|\s+')
+# One simple selector inside a compound: #id, .class, :pseudo(args), ::pseudo-element or a type.
+_SIMPLE_SELECTOR_RE = re.compile(r'(::?|[#.])([\w-]+)(\([^)]*\))?|([\w-]+|\*)')
+
+
+class CssDeclaration:
+    """A 'property: value' pair with its offset in the source text."""
+
+    __slots__ = ("property", "value", "important", "offset")
+
+    def __init__(self, property, value, important, offset):
+        self.property = property
+        self.value = value
+        self.important = important
+        self.offset = offset
+
+    def __repr__(self):
+        return f"CssDeclaration({self.property!r}, {self.value!r}, offset={self.offset})"
+
+
+class CssRule:
+    """
+    A style rule: its selector text, its offset and the text of its block.
+
+    The selector list and the declarations are parsed on first access, so consumers
+    that only look for a few selectors or properties can scan `prelude` and `body`
+    directly. Comments inside the block are blanked out, so offsets into `body` map
+    onto the source text.
+    """
+
+    __slots__ = ("prelude", "offset", "body", "body_offset", "_selectors", "_declarations")
+
+    def __init__(self, prelude, offset, body, body_offset):
+        self.prelude = prelude
+        self.offset = offset
+        self.body = body
+        self.body_offset = body_offset
+        self._selectors = None
+        self._declarations = None
+
+    @property
+    def selectors(self):
+        if self._selectors is None:
+            self._selectors = _split_selectors(self.prelude)
+        return self._selectors
+
+    @property
+    def declarations(self):
+        if self._declarations is None:
+            self._declarations = _parse_declarations(self.body, self.body_offset)
+        return self._declarations
+
+    def __repr__(self):
+        return f"CssRule({', '.join(self.selectors)!r}, offset={self.offset})"
+
+
+class CssAtRule:
+    """A statement at-rule such as @define-color or @import."""
+
+    __slots__ = ("name", "prelude", "offset")
+
+    def __init__(self, name, prelude, offset):
+        self.name = name
+        self.prelude = prelude
+        self.offset = offset
+
+    def __repr__(self):
+        return f"CssAtRule({self.name!r}, {self.prelude!r}, offset={self.offset})"
+
+
+class Stylesheet:
+    """The rule AST of a style sheet, in source order."""
+
+    __slots__ = ("rules", "at_rules")
+
+    def __init__(self, rules, at_rules):
+        self.rules = rules
+        self.at_rules = at_rules
+
+
+def _split_selectors(prelude):
+    """Splits a selector list on top-level commas and normalizes whitespace."""
+    if "(" not in prelude:
+        if "," not in prelude:
+            return (" ".join(prelude.split()),) if prelude and not prelude.isspace() else ()
+        parts = prelude.split(",")
+    else:
+        parts, depth, start = [], 0, 0
+        for i, char in enumerate(prelude):
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif char == "," and depth == 0:
+                parts.append(prelude[start:i])
+                start = i + 1
+        parts.append(prelude[start:])
+    return tuple(" ".join(part.split()) for part in parts if part and not part.isspace())
+
+
+def _parse_declarations(body, offset):
+    """Parses the declarations of a block body that starts at offset in the source."""
+    declarations = []
+    for match in _DECLARATION_RE.finditer(body):
+        prop = match.group(1)
+        value = match.group(2).strip()
+        important = value.endswith("!important")
+        if important:
+            value = value[:-len("!important")].rstrip()
+        stripped = prop.strip()
+        if stripped:
+            declarations.append(CssDeclaration(stripped.lower(), value, important,
+                                               offset + match.start(1) + len(prop) - len(prop.lstrip())))
+    return declarations
+
+
+def _blank_comments(text):
+    return _COMMENT_RE.sub(lambda match: " " * len(match.group()), text)
+
+
+def parse_css(text):
+    """
+    Parses GTK CSS text into a Stylesheet.
+
+    Comments are dropped, statement at-rules (@define-color, @import) are kept in
+    at_rules and block at-rules such as @keyframes are skipped, since GTK CSS does
+    not nest style rules.
+
+    Returns:
+        A Stylesheet with the style rules in source order.
+    """
+    rules = []
+    at_rules = []
+    skip_depth = 0
+    current_rule = None
+    pending = []
+    pending_start = None
+
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "rule" and not pending and current_rule is None and not skip_depth:
+            # The common case: a whole comment-free rule in one token
+            # (its prelude cannot start an at-rule: the token excludes "@")
+            prelude, body = match.group("prelude", "body")
+            stripped = prelude.lstrip()
+            rules.append(CssRule(stripped.rstrip(), match.start("prelude") + len(prelude) - len(stripped),
+                                 body, match.start("body")))
+            continue
+        if kind == "comment":
+            continue
+        if current_rule is not None:
+            # Inside a block opened by the slow path; wait for its closing brace
+            if kind == "open":
+                skip_depth += 1
+            elif kind == "close":
+                if skip_depth:
+                    skip_depth -= 1
+                else:
+                    current_rule.body = _blank_comments(text[current_rule.body_offset:match.start()])
+                    rules.append(current_rule)
+                    current_rule = None
+            continue
+        if skip_depth:
+            # Inside a block at-rule; a 'rule' token is balanced
+            if kind == "open":
+                skip_depth += 1
+            elif kind == "close":
+                skip_depth -= 1
+            continue
+
+        if kind == "rule":
+            prelude = match.group("prelude")
+            start = match.start("prelude")
+            if pending:
+                prelude = "".join(pending) + _blank_comments(text[match.start():start]) + prelude
+                start = pending_start
+                pending = []
+                pending_start = None
+            stripped = prelude.strip()
+            if stripped.startswith("@"):
+                continue
+            rules.append(CssRule(stripped, start + len(prelude) - len(prelude.lstrip()),
+                                 match.group("body"), match.start("body")))
+        elif kind == "text" or kind == "string":
+            if pending_start is None:
+                chunk = match.group()
+                if chunk.isspace():
+                    continue
+                pending_start = match.start() + len(chunk) - len(chunk.lstrip())
+            pending.append(match.group())
+        elif kind == "open":
+            prelude = "".join(pending).strip()
+            start = pending_start if pending_start is not None else match.start()
+            pending = []
+            pending_start = None
+            if prelude.startswith("@"):
+                skip_depth = 1
+            else:
+                current_rule = CssRule(prelude, start, "", match.end())
+        else:
+            statement = "".join(pending).strip()
+            start = pending_start
+            pending = []
+            pending_start = None
+            if kind == "semi" and statement.startswith("@"):
+                name, _, prelude = statement[1:].partition(" ")
+                at_rules.append(CssAtRule(name, prelude.strip(), start))
+
+    if current_rule is not None:
+        current_rule.body = _blank_comments(text[current_rule.body_offset:])
+        rules.append(current_rule)
+    return Stylesheet(rules, at_rules)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_selector(selector):
+    """
+    Splits a selector into its compounds.
+
+    Returns:
+        A tuple of (element, ids, classes, pseudo_classes) tuples, one per compound,
+        from the outermost ancestor to the subject.
+    """
+    return tuple(_parse_compound(compound) for compound in _COMBINATOR_RE.split(selector.strip()) if compound)
+
+
+# Compounds repeat across selectors (".modules-left", "window", "#clock"), so they are cached on their own
+@functools.lru_cache(maxsize=4096)
+def _parse_compound(compound):
+    element = None
+    ids, classes, pseudo_classes = [], [], []
+    for prefix, name, args, type_name in _SIMPLE_SELECTOR_RE.findall(compound):
+        if type_name:
+            element = type_name
+        elif prefix == "#":
+            ids.append(name)
+        elif prefix == ".":
+            classes.append(name)
+        elif prefix == ":":
+            pseudo_classes.append(name + args)
+    return element, tuple(ids), tuple(classes), tuple(pseudo_classes)
+
+
+@functools.lru_cache(maxsize=4096)
+def selector_specificity(selector):
+    """
+    Computes the specificity of a selector.
+
+    Returns:
+        An (ids, classes and pseudo-classes, elements) tuple that orders like CSS specificity.
+    """
+    ids = classes = elements = 0
+    for element, compound_ids, compound_classes, pseudo_classes in parse_selector(selector):
+        ids += len(compound_ids)
+        classes += len(compound_classes) + len(pseudo_classes)
+        if element is not None and element != "*":
+            elements += 1
+    return ids, classes, elements
@@ -0,0 +1,115 @@
+import json
+import re
+
+# Comments and trailing commas are found with plain searches, and each candidate is
+# checked against the string literals of its own line (JSON strings cannot span
+# lines). String contents never go through Python code, and a document with nothing
+# to strip is returned as-is.
+_COMMENT_START_RE = re.compile(r'/[/*]')
+_TRAILING_COMMA_RE = re.compile(r',(?=\s*[\]}])')
+# A trailing comma with a quote after it on its line, the only kind that can sit inside a string
+_QUOTED_TRAILING_COMMA_RE = re.compile(r',\s*[\]}][^"\n]*"')
+# The longest prefix of a line that does not end inside a string literal
+_OUTSIDE_STRINGS_RE = re.compile(r'[^"\n]*(?:"[^"\\\n]*(?:\\.[^"\\\n]*)*"[^"\n]*)*')
+_NOT_NEWLINE_RE = re.compile(r'[^\n]')
+
+
+def _in_string(text, line_start, position):
+    """Whether position lies inside a string literal opened between line_start and it."""
+    quotes = text.count('"', line_start, position)
+    if not quotes:
+        return False
+    if text.find("\\", line_start, position) < 0:
+        return quotes % 2 == 1
+    return _OUTSIDE_STRINGS_RE.match(text, line_start, position).end() != position
+
+
+def _blank_comments(text):
+    pieces = []
+    copied = 0
+    position = 0
+    while True:
+        match = _COMMENT_START_RE.search(text, position)
+        if match is None:
+            break
+        start = match.start()
+        if text[start + 1] == "/":
+            end = text.find("\n", start)
+            if end < 0:
+                end = len(text)
+            # Without a quote after it on its line, a '//' cannot be inside a string
+            if text.find('"', start, end) >= 0:
+                line_start = text.rfind("\n", 0, start) + 1
+                if _in_string(text, max(line_start, copied), start):
+                    position = start + 2
+                    continue
+            blank = " " * (end - start)
+        else:
+            line_start = text.rfind("\n", 0, start) + 1
+            if _in_string(text, max(line_start, copied), start):
+                position = start + 2
+                continue
+            end = text.find("*/", start + 2)
+            if end < 0:
+                raise json.JSONDecodeError("Unterminated comment", text, start)
+            end += 2
+            if text.find("\n", start, end) < 0:
+                blank = " " * (end - start)
+            else:
+                # Keep the newlines so line/column positions stay valid
+                blank = _NOT_NEWLINE_RE.sub(" ", text[start:end])
+        pieces.append(text[copied:start])
+        pieces.append(blank)
+        copied = position = end
+    if not pieces:
+        return text
+    pieces.append(text[copied:])
+    return "".join(pieces)
+
+
+def _blank_trailing_commas(text):
+    if not _QUOTED_TRAILING_COMMA_RE.search(text):
+        return _TRAILING_COMMA_RE.sub(" ", text)
+    pieces = []
+    copied = 0
+    for match in _TRAILING_COMMA_RE.finditer(text):
+        start = match.start()
+        if not _in_string(text, text.rfind("\n", 0, start) + 1, start):
+            pieces.append(text[copied:start])
+            pieces.append(" ")
+            copied = start + 1
+    if not pieces:
+        return text
+    pieces.append(text[copied:])
+    return "".join(pieces)
+
+
+def strip_jsonc(text):
+    """
+    Blanks out comments and trailing commas in a JSONC document.
+
+    String literals are left untouched, so '//' inside URLs or format strings
+    survives. Removed characters are replaced by spaces (newlines are kept), so
+    the result has the same length and line/column positions as the input; a
+    document without comments or trailing commas is returned unchanged.
+
+    Raises:
+        json.JSONDecodeError: If a block comment is not terminated.
+    """
+    # Comments go first: the trailing comma search looks past them to the closing bracket
+    return _blank_trailing_commas(_blank_comments(text))
+
+
+def loads_jsonc(text):
+    """
+    Parses a JSONC document.
+
+    Raises:
+        json.JSONDecodeError: On malformed input; lineno and colno refer to the original text.
+    """
+    return json.loads(strip_jsonc(text))
+
+
+def load_jsonc(fp):
+    """Parses a JSONC document from a file object."""
+    return loads_jsonc(fp.read())
@@ -0,0 +1,169 @@
+from records import Keybinding
+
+# Modifier names Sway accepts, by their case-folded spelling, mapped to one canonical name
+_MODIFIERS = {
+    "shift": "Shift",
+    "lock": "Lock",
+    "caps": "Lock",
+    "control": "Control",
+    "ctrl": "Control",
+    "mod1": "Mod1",
+    "alt": "Mod1",
+    "mod2": "Mod2",
+    "mod3": "Mod3",
+    "mod4": "Mod4",
+    "super": "Mod4",
+    "mod5": "Mod5",
+}
+# Canonical modifier order of a normalized chord ("Mod4+Shift+q", however it is written)
+_MODIFIER_ORDER = {name: i for i, name in enumerate(("Mod4", "Mod1", "Mod2", "Mod3", "Mod5", "Control", "Shift",
+                                                     "Lock"))}
+# Flags that make a binding distinct from the same chord without them, as in Sway's
+# binding comparison; the others (--no-warn, --to-code, --no-repeat) do not
+_KEY_FLAGS = {"--release", "--locked", "--inhibited", "--whole-window", "--border", "--exclude-titlebar"}
+
+
+def normalize_chord(chord):
+    """
+    Splits a resolved chord ("$mod" already replaced) into its canonical parts.
+
+    Returns:
+        A tuple of (modifiers in canonical order, case-folded keysyms sorted).
+    """
+    modifiers = set()
+    keys = []
+    for part in chord.split("+"):
+        modifier = _MODIFIERS.get(part.lower())
+        if modifier is not None:
+            modifiers.add(modifier)
+        elif part:
+            keys.append(part.casefold())
+    return tuple(sorted(modifiers, key=_MODIFIER_ORDER.__getitem__)), tuple(sorted(keys))
+
+
+def binding_key(chord, mode="default", flags=()):
+    """Returns the hashable identity of a binding: (mode, modifiers, keysyms, flags)."""
+    modifiers, keys = normalize_chord(chord)
+    flags = {flag if flag.startswith("--") else "--" + flag for flag in flags}
+    flags = tuple(sorted(flag for flag in flags if flag in _KEY_FLAGS or flag.startswith("--input-device=")))
+    return mode, modifiers, keys, flags
+
+
+def parse_bindsym(line, resolver):
+    """
+    Splits a `bindsym [--flags] chord command` line.
+
+    Args:
+        line: The bindsym line as written.
+        resolver: A VariableResolver, used to resolve the chord ("$mod+q").
+
+    Returns:
+        A tuple of (chord, flags, command), or None if the line binds nothing.
+    """
+    words = line.split(None, 1)
+    rest = words[1] if len(words) > 1 else ""
+    flags = []
+    while rest.startswith("--"):
+        words = rest.split(None, 1)
+        flags.append(words[0])
+        rest = words[1] if len(words) > 1 else ""
+    words = rest.split(None, 1)
+    if not words:
+        return None
+    return resolver.resolve(words[0]), flags, words[1] if len(words) > 1 else ""
+
+
+class KeybindingIndex:
+    """
+    Every binding of a Sway config by its normalized identity.
+
+    Bindings are added in the order Sway applies them, so a binding replaces an
+    earlier one with the same chord, flags and mode, as it does in Sway; each
+    replacement is kept in `overrides` as a (replaced, replacing) pair. Adding and
+    looking up a binding are dictionary operations, so indexing a keymap is linear
+    in its size.
+    """
+
+    __slots__ = ("_bindings", "overrides")
+
+    def __init__(self):
+        self._bindings = {}
+        self.overrides = []
+
+    def add(self, binding):
+        """Adds a Keybinding; returns the binding it replaces, or None."""
+        previous = self._bindings.get(binding.key)
+        self._bindings[binding.key] = binding
+        if previous is not None:
+            self.overrides.append((previous, binding))
+        return previous
+
+    def lookup(self, chord, mode="default", flags=()):
+        """
+        Returns the binding in effect for a chord, or None.
+
+        Args:
+            chord: The chord with variables resolved, in any modifier order and case ("shift+mod4+Q").
+            mode: The binding mode.
+            flags: Flags such as "--release" or "--locked" the binding was made with.
+        """
+        return self._bindings.get(binding_key(chord, mode, flags))
+
+    def modes(self):
+        """Returns the modes that have bindings, "default" first."""
+        modes = {binding.mode: None for binding in self._bindings.values()}
+        return sorted(modes, key=lambda mode: (mode != "default", mode))
+
+    def in_mode(self, mode="default"):
+        """Returns the bindings in effect in a mode, in the order they were made."""
+        return [binding for binding in self._bindings.values() if binding.mode == mode]
+
+    def conflicts(self):
+        """Returns the (replaced, replacing) pairs that bind a chord to a different command."""
+        return [(old, new) for old, new in self.overrides if old.command != new.command]
+
+    def duplicates(self):
+        """Returns the (replaced, replacing) pairs that repeat a binding with the same command."""
+        return [(old, new) for old, new in self.overrides if old.command == new.command]
+
+    def __iter__(self):
+        return iter(self._bindings.values())
+
+    def __len__(self):
+        return len(self._bindings)
+
+    def __eq__(self, other):
+        return (isinstance(other, KeybindingIndex) and list(self._bindings.items()) == list(other._bindings.items())
+                and self.overrides == other.overrides)
+
+
+def index_keybindings(directives, blocks, resolver):
+    """
+    Builds the KeybindingIndex of a parsed Sway config in one pass.
+
+    Args:
+        directives: The "Keybindings" SwayDirectives of parse_sway_config, in the order Sway applies them.
+        blocks: The SwayBlockIndex of the config; bindings inside a `mode` block belong to that mode.
+        resolver: A VariableResolver for the parsed variables.
+
+    Returns:
+        A KeybindingIndex.
+    """
+    modes = {}
+    for block in blocks.of_kind("mode"):
+        # `mode --pango_markup "name" {` names the mode by its last argument
+        names = [arg for arg in block.args if not arg.startswith("--")]
+        mode = resolver.resolve(names[-1]).strip('"\'') if names else "default"
+        for directive in block.directives():
+            modes[(directive.file_id, directive.line_number)] = mode
+
+    index = KeybindingIndex()
+    for directive in directives:
+        parsed = parse_bindsym(directive.text, resolver)
+        if parsed is None:
+            continue
+        chord, flags, command = parsed
+        mode = modes.get((directive.file_id, directive.line_number), "default")
+        index.add(Keybinding(binding_key(chord, mode, flags), command, directive.text, directive.file_id,
+                             directive.line_number, directive.offset))
+    return index
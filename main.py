@@ -1,57 +1,270 @@
 import argparse
-from file_collector import FileCollector
-from sway_parser import parse_sway_config
-from waybar_parser import parse_waybar_config
-from waybar_style_parser import parse_waybar_style
-from reporter import generate_report
+import os
+import sys
+from app_registry import APP_PARSERS, SWAY_SECTIONS, all_sections
+from profiling import PROFILER
 
-def main():
-    parser = argparse.ArgumentParser(description="Analyze Sway and Waybar configurations.")
+# Report sections selectable with --only: those of every registered application, then the files
+APP_SECTIONS = {name: app.sections + ["files"] for name, app in APP_PARSERS.items()}
+SECTIONS = all_sections()
+
+def select_sections(apps, only=None):
+    """
+    Works out which report sections to print.
+
+    Args:
+        apps: The applications given to `report` (an empty list means all of them).
+        only: Sections to restrict the report to, or None.
+
+    Returns:
+        The selected section names, in report order.
+    """
+    selected = set()
+    for app in apps or APP_SECTIONS:
+        selected.update(APP_SECTIONS[app])
+    if only:
+        selected &= set(only)
+    return [section for section in SECTIONS if section in selected]
+
+def _add_report_options(parser):
+    """Adds the options shared by the top-level parser and the `report` subcommand."""
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, metavar="SECTION",
+                        help=f"Print only these report sections ({', '.join(SECTIONS)}); only the phases they "
+                             "need are run.")
     parser.add_argument("--waybar-styles-debug", action="store_true",
                         help="Enable debug output for Waybar style parsing.")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=False,
+                        help="Keep a persistent Sway parse cache between runs (default: off; it only pays off on "
+                             "large Sway trees). With --serve, the cache is kept in memory either way and this "
+                             "also saves it to disk.")
+    parser.add_argument("--cache-hash", action="store_true",
+                        help="Validate cached Sway files by content hash instead of inode/mtime/size.")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="With --cache, print Sway parse cache hit/miss counts after the run.")
+    parser.add_argument("--probe-stats", action="store_true",
+                        help="Print filesystem probe counters (stat calls, syscalls saved) after the run.")
+    parser.add_argument("--jobs", type=int,
+                        help="Workers used to read and parse sourced Sway files in parallel (default: 1, serial).")
+    parser.add_argument("--process-pool", action="store_true",
+                        help="Use a process pool instead of threads for --jobs (for very large source trees).")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run the application parsers on an asyncio pipeline and read their files on a thread "
+                             "pool, instead of one after another (helps when file reads block, e.g. on network "
+                             "storage).")
+    parser.add_argument("--app-workers", type=int,
+                        help="With --pipeline, application parsers run at once (default: every application whose "
+                             "prerequisites are done).")
+    parser.add_argument("--ipc", nargs="?", const="", metavar="SOCKET",
+                        help="Read the Sway config the running compositor loaded, and its bars, binding modes and "
+                             "outputs, over its IPC socket (default: $SWAYSOCK) instead of the config files.")
+    parser.add_argument("--root", metavar="DIR",
+                        help="Analyze the home directory or dotfile tree DIR instead of the current user's: ~, "
+                             "$XDG_CONFIG_HOME and system paths such as /etc/sway are looked up under it.")
+    parser.add_argument("--locations", action="store_true",
+                        help="Show the path:line of each Sway directive and Waybar module (jump-to-source output).")
+    parser.add_argument("--profile", nargs="?", const="table", choices=["table", "json"],
+                        help="Print wall/CPU time and counters (files and bytes read, stat calls, regex evaluations, "
+                             "lines per category) for each phase to stderr, as a table (default) or JSON. The "
+                             "application parsers then run serially (--pipeline is ignored).")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="With --profile, also record the tracemalloc peak memory of each phase (slower).")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analyze Sway, Waybar and other desktop application configurations.",
+                                     epilog="Without a subcommand, the full report of every application is printed.")
+    _add_report_options(parser)
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a daemon that watches the configs and serves reports over a Unix socket.")
+    parser.add_argument("--query", action="store_true",
+                        help="Print the report cached by a running --serve daemon.")
+    parser.add_argument("--socket", default=None,
+                        help="Unix socket path used by --serve and --query.")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds between file checks when inotify is unavailable (--serve).")
+    parser.set_defaults(command=None, apps=[], jobs=1)
+
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    # Options left out after the subcommand keep the values given before it
+    report_parser = subparsers.add_parser("report", argument_default=argparse.SUPPRESS,
+                                          help="Print the report of the given applications (default: all).")
+    # Checked in main(): argparse rejects an empty nargs="*" list that has choices
+    report_parser.add_argument("apps", nargs="*", default=[], metavar="APP",
+                               help=f"Applications to report on ({', '.join(APP_SECTIONS)}).")
+    _add_report_options(report_parser)
+
+    binding_parser = subparsers.add_parser("binding", help="Print what a Sway key chord does in a binding mode.")
+    binding_parser.add_argument("chord", help='The chord, in any modifier order and case ("$mod+Shift+q").')
+    binding_parser.add_argument("--mode", default="default", help="The binding mode (default: default).")
+    binding_parser.add_argument("--release", action="store_true", help="Look up the --release binding.")
+    binding_parser.add_argument("--locked", action="store_true", help="Look up the --locked binding.")
+
+    fleet_parser = subparsers.add_parser("fleet", help="Analyze many home directories on a process pool and print "
+                                                       "one summary of them (per root and fleet-wide).")
+    fleet_parser.add_argument("roots", nargs="*", metavar="ROOT", help="Home directories or dotfile trees.")
+    fleet_parser.add_argument("--roots-from", metavar="FILE",
+                              help="Read further roots from FILE, one per line (- for stdin).")
+    fleet_parser.add_argument("--format", choices=["json", "csv"], default="json",
+                              help="Summary format (default: json; csv is one root,metric,value row per count).")
+    fleet_parser.add_argument("--output", metavar="FILE", help="Write the summary to FILE instead of stdout.")
+    fleet_parser.add_argument("--workers", type=int,
+                              help="Worker processes (default: one per CPU).")
+    fleet_parser.add_argument("--top", type=int, default=20,
+                              help="Most common modules and bindings listed in the fleet-wide stats (default: 20).")
+    return parser
+
+def _root_directory(args):
+    """Returns the absolute --root directory, or None; exits with an error if it is not a directory."""
+    if not args.root:
+        return None
+    root = os.path.abspath(args.root)
+    if not os.path.isdir(root):
+        print(f"Error: --root {args.root} is not a directory.", file=sys.stderr)
+        sys.exit(2)
+    return root
+
+def _open_ipc(args):
+    """Returns the SwayIPC client of --ipc, or None; exits with an error if there is no socket to use."""
+    if args.ipc is None:
+        return None
+    from sway_ipc import SwayIPC
+    try:
+        return SwayIPC(args.ipc or None)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+def query_binding(args):
+    """
+    Prints the Sway binding in effect for args.chord and the bindings it replaced.
+
+    Returns:
+        The exit status: 0 if the chord is bound, 1 otherwise.
+    """
+    from app_registry import AppRun, run_apps
+    from discovery import Discovery, rooted_environment
+    from file_collector import FileCollector
+    from parse_cache import ParseCache
+    from variable_resolver import VariableResolver
+
+    root = _root_directory(args)
+    run = AppRun(FileCollector(Discovery(root=root) if root else None), ["sway"], ["keybindings"], args)
+    run.parse_cache = parse_cache = ParseCache(use_hash=args.cache_hash).load() if args.cache else None
+    run.ipc = _open_ipc(args)
+    try:
+        with rooted_environment(root):
+            sway_features, sway_variables = run_apps(run, ["sway"])["sway"]
+    finally:
+        if run.ipc is not None:
+            run.ipc.close()
+    if parse_cache is not None:
+        parse_cache.save()
+    index = sway_features.get("Keybinding Index")
+    if index is None:
+        print("Error: No Sway configuration found.", file=sys.stderr)
+        return 1
+    chord = VariableResolver(sway_variables).resolve(args.chord)
+    flags = [flag for flag, given in (("--release", args.release), ("--locked", args.locked)) if given]
+    binding = index.lookup(chord, args.mode, flags)
+    if binding is None:
+        print(f"{chord} is not bound in mode {args.mode}.")
+        return 1
+    print(f"{binding.chord} in mode {binding.mode}: {binding.command} ({binding.location()})")
+    for old, new in index.overrides:
+        if new.key == binding.key:
+            print(f"  replaces: {old.command} ({old.location()})")
+    return 0
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
+    for app in args.apps:
+        if app not in APP_SECTIONS:
+            parser.error(f"unknown application '{app}' (choose from {', '.join(APP_SECTIONS)})")
+
+    if (args.root or args.ipc is not None) and (args.query or args.serve or args.command == "fleet"):
+        parser.error("--root and --ipc apply to reports and `binding`, not to --serve, --query or `fleet`")
+    if args.query:
+        from watch_daemon import query_report
+        sys.exit(query_report(args.socket))
+    if args.serve:
+        from watch_daemon import serve
+        serve(args.socket, args.poll_interval, use_hash=args.cache_hash, persist=args.cache)
+        return
+    if args.command == "binding":
+        sys.exit(query_binding(args))
+    if args.command == "fleet":
+        from fleet import fleet_command
+        sys.exit(fleet_command(args))
+
+    sections = select_sections(args.apps, args.only)
+    if not sections:
+        print("Error: The selected applications have none of the sections given to --only.", file=sys.stderr)
+        sys.exit(2)
+    # Run the applications that show a selected section (or their files, with "files")
+    apps = [name for name in args.apps or APP_PARSERS
+            if any(section in sections for section in APP_SECTIONS[name])]
+
+    pipeline = args.pipeline
+    if args.profile:
+        PROFILER.start(trace_memory=args.profile_memory)
+        if pipeline:
+            # The gauges and CPU time are process-wide, so concurrent phases would share them
+            print("Warning: --profile runs the application parsers serially; --pipeline is ignored.", file=sys.stderr)
+            pipeline = False
+
+    from app_registry import AppRun, app_report_sections, run_apps, with_prerequisites
+    from discovery import Discovery, rooted_environment
+    from file_collector import FileCollector
+    root = _root_directory(args)
+    file_collector = FileCollector(Discovery(root=root) if root else None)
+    run = AppRun(file_collector, apps, sections, args)
+    # Gauges are registered up front: the app parsers read them from worker threads
+    PROFILER.watch("directories scanned", lambda: file_collector.discovery.directories_scanned)
+    if "sway" in with_prerequisites(apps):
+        from fs_probe import FileProbe
+        from parse_cache import ParseCache
+        run.parse_cache = parse_cache = ParseCache(use_hash=args.cache_hash).load() if args.cache else None
+        run.probe = probe = FileProbe()
+        PROFILER.watch("stat calls", lambda: probe.stat_calls)
+        if parse_cache is not None:
+            PROFILER.watch("parse cache hits", lambda: parse_cache.hits)
+            PROFILER.watch("parse cache misses", lambda: parse_cache.misses)
+        run.ipc = ipc = _open_ipc(args)
+        if ipc is not None:
+            PROFILER.watch("ipc requests", lambda: ipc.requests)
+
+    # The parse cache keeps the current user's location: it was opened before the
+    # environment points into --root, and is saved after it is restored
+    try:
+        with rooted_environment(root):
+            results = run_apps(run, apps, args.app_workers, pipeline=pipeline)
+    finally:
+        if run.ipc is not None:
+            run.ipc.close()
+
+    if run.parse_cache is not None:
+        run.parse_cache.save()
+        if args.cache_stats:
+            print(run.parse_cache.stats(), file=sys.stderr)
+    if run.probe is not None and args.probe_stats:
+        print(run.probe.stats(), file=sys.stderr)
+
+    sway_categories = [SWAY_SECTIONS[section] for section in sections if section in SWAY_SECTIONS]
+    sway_features = None
+    if sway_categories:
+        sway_features = {category: items for category, items in results["sway"][0].items()
+                         if category in sway_categories}
+    waybar_modules = results.get("waybar")
+    app_sections = app_report_sections(results, sections)
+
+    from reporter import generate_report
+    with PROFILER.phase("report"):
+        generate_report(sway_features, waybar_modules, file_collector, show_locations=args.locations,
+                        show_files="files" in sections, app_sections=app_sections)
 
-    # Initialize FileCollector
-    file_collector = FileCollector()
-
-    # Collect Sway configurations
-    sway_config_paths = file_collector.find_sway_configs()
-    sway_variables = {}
-    sway_features = {}
-    for config_path in sway_config_paths:
-        current_features = parse_sway_config(config_path, file_collector)
-        sway_features.update(current_features)
-        sway_variables.update(current_features.get("Variables", {}))
-    
-    # Collect Waybar configurations
-    waybar_config_paths = file_collector.find_waybar_configs()
-    waybar_style_paths = file_collector.find_waybar_styles()
-    colors_waybar_path = file_collector.find_colors_waybar_css()
-
-    waybar_style_colors = {}
-    # Iterate through active Waybar style paths
-    for style_path in waybar_style_paths:
-        # Pass the debug flag to waybar_style_parser
-        style_colors = parse_waybar_style(style_path, sway_variables, colors_waybar_path, file_collector, args.waybar_styles_debug)
-        waybar_style_colors.update(style_colors)
-
-    # Conditional reporting based on debug flag
-    if args.waybar_styles_debug:
-        print("--- Waybar Style Debug Report ---")
-        # The debug prints are already handled within parse_waybar_style
-        # We just need to ensure the main report is not generated.
-        return # Exit early after debug output
-    
-    waybar_modules = {}
-    for config_path in waybar_config_paths:
-        modules = parse_waybar_config(config_path, sway_variables, waybar_style_colors)
-        for position, module_list in modules.items():
-            if position not in waybar_modules:
-                waybar_modules[position] = []
-            waybar_modules[position].extend(module_list)
-
-    # Generate final report if not in debug mode
-    generate_report(sway_features, waybar_modules, file_collector)
+    if args.profile:
+        PROFILER.stop()
+        print(PROFILER.format_json() if args.profile == "json" else PROFILER.format_table(), file=sys.stderr)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,327 @@
+import colorsys
+import os
+import re
+from profiling import PROFILER
+
+# Tokens of a GTK color expression: hex literals, @references, function calls,
+# numbers (optionally percentages), commas, closing parentheses and bare names.
+_TOKEN_RE = re.compile(r'\s*(?:(#[0-9a-fA-F]+\b)|@([\w-]+)|([a-zA-Z][\w-]*)\s*\(|([-+]?(?:\d+\.?\d*|\.\d+)%?)|(,)|(\))|([a-zA-Z][\w-]*))')
+_HEX_LITERAL_RE = re.compile(r'#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})')
+# Statement at-rules the palette needs, found without building the full rule AST of
+# each style sheet just for its colors (see _at_rules for the comments).
+_AT_RULE_RE = re.compile(r'@(define-color|import)\s+([^;{}]*);')
+_IMPORT_RE = re.compile(r'''^(?:url\(\s*)?["']?([^"')]+)["']?\s*\)?''')
+
+_NAMED_COLORS = {
+    "transparent": (0.0, 0.0, 0.0, 0.0),
+    "black": (0.0, 0.0, 0.0, 1.0),
+    "white": (1.0, 1.0, 1.0, 1.0),
+}
+
+
+class ColorSyntaxError(ValueError):
+    """Raised for a color expression the palette cannot evaluate."""
+
+
+def _clamp(value):
+    return min(1.0, max(0.0, value))
+
+
+def parse_hex(hex_color):
+    """
+    Parses #rgb, #rgba, #rrggbb or #rrggbbaa.
+
+    Returns:
+        An (r, g, b, a) tuple of floats in [0, 1], or None if the literal is malformed.
+    """
+    digits = hex_color.lstrip("#")
+    if len(digits) in (3, 4):
+        digits = "".join(c * 2 for c in digits)
+    if len(digits) == 6:
+        digits += "ff"
+    if len(digits) != 8:
+        return None
+    try:
+        return tuple(int(digits[i:i + 2], 16) / 255 for i in (0, 2, 4, 6))
+    except ValueError:
+        return None
+
+
+def format_color(rgba):
+    """Formats an (r, g, b, a) tuple as #rrggbb, or #rrggbbaa when it is not opaque."""
+    channels = [round(_clamp(c) * 255) for c in rgba]
+    if channels[3] == 255:
+        channels.pop()
+    return "#" + "".join(f"{c:02x}" for c in channels)
+
+
+def _shade(rgba, factor):
+    # GTK scales lightness and saturation in HLS space
+    h, l, s = colorsys.rgb_to_hls(*rgba[:3])
+    r, g, b = colorsys.hls_to_rgb(h, _clamp(l * factor), _clamp(s * factor))
+    return (r, g, b, rgba[3])
+
+
+class _ExpressionParser:
+    """Recursive-descent evaluator for one GTK color expression."""
+
+    def __init__(self, text, lookup):
+        self.tokens = [m for m in _TOKEN_RE.finditer(text)]
+        if sum(len(m.group()) for m in self.tokens) != len(text.rstrip()):
+            raise ColorSyntaxError(f"Unexpected characters in {text!r}")
+        self.pos = 0
+        self.lookup = lookup
+
+    def _next(self):
+        if self.pos >= len(self.tokens):
+            raise ColorSyntaxError("Unexpected end of color expression")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _expect(self, group):
+        token = self._next()
+        if token.group(group) is None:
+            raise ColorSyntaxError(f"Unexpected {token.group().strip()!r}")
+        return token
+
+    def _number(self):
+        text = self._expect(4).group(4)
+        if text.endswith("%"):
+            return float(text[:-1]) / 100
+        return float(text)
+
+    def _channel(self):
+        text = self._expect(4).group(4)
+        if text.endswith("%"):
+            return float(text[:-1]) / 100
+        return float(text) / 255
+
+    def color(self):
+        token = self._next()
+        hex_literal, reference, function, _number, _comma, _close, name = token.groups()
+        if hex_literal:
+            rgba = parse_hex(hex_literal)
+            if rgba is None:
+                raise ColorSyntaxError(f"Malformed hex color {hex_literal!r}")
+            return rgba
+        if reference:
+            return self.lookup(reference)
+        if name:
+            if name.lower() not in _NAMED_COLORS:
+                raise ColorSyntaxError(f"Unknown color name {name!r}")
+            return _NAMED_COLORS[name.lower()]
+        if function:
+            return self._call(function.lower())
+        raise ColorSyntaxError(f"Unexpected {token.group().strip()!r}")
+
+    def _call(self, function):
+        if function in ("rgb", "rgba"):
+            r = self._channel()
+            self._expect(5)
+            g = self._channel()
+            self._expect(5)
+            b = self._channel()
+            a = 1.0
+            if self.tokens[self.pos:self.pos + 1] and self.tokens[self.pos].group(5):
+                self.pos += 1
+                a = self._number()
+            result = (_clamp(r), _clamp(g), _clamp(b), _clamp(a))
+        elif function == "alpha":
+            color = self.color()
+            self._expect(5)
+            result = color[:3] + (_clamp(color[3] * self._number()),)
+        elif function == "shade":
+            color = self.color()
+            self._expect(5)
+            result = _shade(color, self._number())
+        elif function in ("lighter", "darker"):
+            result = _shade(self.color(), 1.3 if function == "lighter" else 0.7)
+        elif function == "mix":
+            first = self.color()
+            self._expect(5)
+            second = self.color()
+            self._expect(5)
+            factor = _clamp(self._number())
+            result = tuple(a + (b - a) * factor for a, b in zip(first, second))
+        else:
+            raise ColorSyntaxError(f"Unsupported color function {function!r}")
+        self._expect(6)
+        return result
+
+    def parse(self):
+        result = self.color()
+        if self.pos != len(self.tokens):
+            raise ColorSyntaxError(f"Trailing {self.tokens[self.pos].group().strip()!r}")
+        return result
+
+
+class Palette:
+    """
+    The resolved @define-color palette of a Waybar theme.
+
+    Every definition is evaluated once up front, following @references through
+    the dependency graph, so each lookup is a dictionary access. Definitions that
+    take part in a reference cycle, or that reference unknown colors, are left out
+    of `table`; cycles are recorded in `cycles`.
+    """
+
+    def __init__(self, definitions):
+        """
+        Args:
+            definitions: A dictionary mapping color names (without '@') to
+                (expression, file_path), later definitions having replaced earlier ones.
+        """
+        self.definitions = definitions
+        self.table = {}
+        self.cycles = []
+        self._colors = {}
+        self._failed = set()
+        for name in definitions:
+            self._evaluate(name, [])
+
+    def _evaluate(self, name, stack):
+        if name in self._colors:
+            return self._colors[name]
+        if name in self._failed or name not in self.definitions:
+            return None
+        if name in stack:
+            self.cycles.append(stack[stack.index(name):] + [name])
+            return None
+
+        stack.append(name)
+        expression = self.definitions[name][0]
+        try:
+            rgba = self._evaluate_expression(expression, stack)
+        except ColorSyntaxError:
+            rgba = None
+        stack.pop()
+        if rgba is None:
+            self._failed.add(name)
+            return None
+        self._colors[name] = rgba
+        # Plain hex literals are kept as written, and aliases take their target's text
+        if _HEX_LITERAL_RE.fullmatch(expression):
+            self.table[name] = expression
+        elif expression.startswith("@") and expression[1:] in self.table:
+            self.table[name] = self.table[expression[1:]]
+        else:
+            self.table[name] = format_color(rgba)
+        return rgba
+
+    def _evaluate_expression(self, expression, stack):
+        def lookup(reference):
+            rgba = self._evaluate(reference, stack)
+            if rgba is None:
+                raise ColorSyntaxError(f"Unresolved color @{reference}")
+            return rgba
+        return _ExpressionParser(expression, lookup).parse()
+
+    def lookup(self, name):
+        """Returns the resolved color of '@name' (given without '@'), or None if it is not defined."""
+        return self.table.get(name)
+
+    def resolve(self, expression):
+        """
+        Evaluates a color expression against the palette.
+
+        Returns:
+            A hex color (hex literals are returned as written), or None if the
+            expression references an unknown color or is not a color.
+        """
+        expression = expression.strip()
+        if _HEX_LITERAL_RE.fullmatch(expression):
+            return expression
+        if expression.startswith("@") and _TOKEN_RE.fullmatch(expression):
+            return self.table.get(expression[1:])
+        try:
+            return format_color(self._evaluate_expression(expression, []))
+        except ColorSyntaxError:
+            return None
+
+
+def _at_rules(text):
+    """
+    Yields the (kind, prelude) of the @define-color and @import statements outside comments.
+
+    The statements are found with a plain search and the comments are only looked
+    at around them, so the comments of a large theme are not matched one by one.
+    """
+    position = 0
+    comment_start = text.find("/*")
+    while True:
+        match = _AT_RULE_RE.search(text, position)
+        if match is None:
+            return
+        start = match.start()
+        # Step over the comments that end before the statement
+        while 0 <= comment_start < start:
+            comment_end = text.find("*/", comment_start + 2)
+            if comment_end < 0:
+                comment_start = -1 # An unterminated comment is no comment
+                break
+            comment_end += 2
+            if comment_end > start:
+                break
+            comment_start = text.find("/*", comment_end)
+        if 0 <= comment_start < start:
+            # Inside a comment; look again after it
+            position = comment_end
+            comment_start = text.find("/*", position)
+            continue
+        yield match.groups()
+        position = match.end()
+        if 0 <= comment_start < position:
+            comment_start = text.find("/*", position)
+
+
+def _collect_definitions(css_path, definitions, visited):
+    real_path = os.path.realpath(css_path)
+    if real_path in visited:
+        return
+    visited.add(real_path)
+    try:
+        with open(css_path, "r") as f:
+            text = f.read()
+    except OSError:
+        return
+    PROFILER.count("files read")
+    PROFILER.count("bytes read", len(text))
+    PROFILER.count("regex evaluations")
+    for kind, prelude in _at_rules(text):
+        if kind == "define-color":
+            name, _, expression = prelude.strip().partition(" ")
+            if name and expression.strip():
+                definitions.pop(name, None)  # Keep the definition order of the last one
+                definitions[name] = (expression.strip(), css_path)
+        elif kind == "import":
+            match = _IMPORT_RE.match(prelude.strip())
+            if match:
+                imported = os.path.expanduser(match.group(1).strip())
+                imported = os.path.join(os.path.dirname(css_path), imported)
+                _collect_definitions(imported, definitions, visited)
+
+
+def load_palette(css_paths, base=None, skip=()):
+    """
+    Builds the palette of @define-color definitions in the given style sheets.
+
+    Imported style sheets (@import) are followed relative to the importing file.
+    Later definitions override earlier ones, as in GTK.
+
+    Args:
+        css_paths: Style sheet paths in load order; None entries are ignored.
+        base: Definitions ({name: (expression, file_path)}) loaded before any style
+            sheet, e.g. the pywal palette from colors.json.
+        skip: Style sheets not to read, directly or through @import, because base
+            already covers them.
+
+    Returns:
+        A Palette.
+    """
+    definitions = dict(base or {})
+    visited = {os.path.realpath(path) for path in skip if path}
+    for css_path in css_paths:
+        if css_path:
+            _collect_definitions(css_path, definitions, visited)
+    return Palette(definitions)
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import pickle
+
+# Bump whenever the record layout produced by sway_parser._scan_sway_file changes,
+# so stale entries from an older parser are never replayed.
+CACHE_FORMAT_VERSION = 5
+
+
+def default_cache_path():
+    """Returns the default location of the on-disk Sway parse cache."""
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(cache_home, "feature_ricing", "sway_parse_cache.pickle")
+
+
+class ParseCache:
+    """
+    Persistent cache of per-file Sway parse records.
+
+    The cache is one pickle: it loads and saves in about half the time of the
+    equivalent JSON, and it is only written when an entry changed.
+
+    Each entry is keyed by the file path and validated against the file identity
+    (inode, mtime, size) or, in content-hash mode, against a digest of the file
+    contents. Entries are only replayed when the identity still matches, so any
+    changed file in the source graph is re-scanned on the next run.
+    """
+
+    def __init__(self, cache_path=None, use_hash=False):
+        self.cache_path = cache_path or default_cache_path()
+        self.use_hash = use_hash
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = False
+
+    def load(self):
+        """Loads the cache file, silently starting empty if it is missing or stale."""
+        try:
+            with open(self.cache_path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return self
+        if not isinstance(data, dict):
+            return self
+        if data.get("version") == CACHE_FORMAT_VERSION and data.get("use_hash") == self.use_hash:
+            self.entries = data.get("entries", {})
+        return self
+
+    def save(self):
+        """Writes the entries touched during this run back to disk."""
+        if not self._dirty and self._seen == set(self.entries):
+            return
+        entries = {path: entry for path, entry in self.entries.items() if path in self._seen}
+        data = {"version": CACHE_FORMAT_VERSION, "use_hash": self.use_hash, "entries": entries}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write parse cache {self.cache_path}: {e}")
+
+    def file_key(self, file_path):
+        """
+        Computes the identity key of a file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        st = os.stat(file_path)
+        if self.use_hash:
+            with open(file_path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            return [st.st_size, digest]
+        return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+    def lookup(self, file_path):
+        """
+        Looks up the cached records of a file.
+
+        Returns:
+            A tuple of (key, records); records is None on a miss.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        key = self.file_key(file_path)
+        self._seen.add(file_path)
+        entry = self.entries.get(file_path)
+        if entry is not None and entry["key"] == key:
+            self.hits += 1
+            return key, entry["records"]
+        self.misses += 1
+        return key, None
+
+    def store(self, file_path, key, records):
+        """Stores freshly scanned records under the key returned by lookup."""
+        self.entries[file_path] = {"key": key, "records": records}
+        self._dirty = True
+
+    def get_records(self, file_path, scan):
+        """
+        Returns the parse records of a file, from the cache when its identity is unchanged.
+
+        Args:
+            file_path: The path of the file to parse.
+            scan: A callable taking the path and returning the file's records.
+
+        Returns:
+            The list of records for the file.
+        """
+        key, records = self.lookup(file_path)
+        if records is None:
+            records = scan(file_path)
+            self.store(file_path, key, records)
+        return records
+
+    def get_text_records(self, file_path, text, scan_text):
+        """
+        Returns the parse records of a file whose contents were read elsewhere (over
+        Sway IPC), from the cache when an entry of the path has the same content.
+
+        The entry is keyed by content size and digest, the key of content-hash mode,
+        so text and files read with --cache-hash share their entries. Otherwise the
+        entry is stored under "ipc:" + path, apart from the entry of the file on disk,
+        whose (inode, mtime, size) key would replace it on every other run.
+
+        Args:
+            file_path: The path the text was loaded from.
+            text: The file contents.
+            scan_text: A callable taking the text and returning its records.
+
+        Returns:
+            The list of records for the text.
+        """
+        data = text.encode()
+        key = [len(data), hashlib.sha1(data).hexdigest()]
+        entry_path = file_path if self.use_hash else "ipc:" + file_path
+        self._seen.add(entry_path)
+        entry = self.entries.get(entry_path)
+        if entry is not None and entry["key"] == key:
+            self.hits += 1
+            return entry["records"]
+        self.misses += 1
+        records = scan_text(text)
+        self.store(entry_path, key, records)
+        return records
+
+    def stats(self):
+        """Returns a one-line summary of cache hits and misses."""
+        return f"Sway parse cache: {self.hits} hits, {self.misses} misses ({self.cache_path})"
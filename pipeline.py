@@ -0,0 +1,258 @@
+import os
+
+from profiling import PROFILER
+
+def collect_sway(file_collector, parse_cache=None, probe=None, jobs=1, use_processes=False, variables_only=False):
+    """
+    Discovers and parses the active Sway configurations.
+
+    With variables_only, only as much is parsed as the Sway variables need (see parse_sway_config).
+
+    Returns:
+        A tuple of (sway_features, sway_variables).
+    """
+    from sway_parser import parse_sway_config
+    from wal_colors import load_wal_colors
+
+    with PROFILER.phase("discovery"):
+        sway_config_paths = file_collector.find_sway_configs()
+    sway_variables = {}
+    sway_features = {}
+    with PROFILER.phase("sway"):
+        # Loaded ahead so the parser resolves design lines and bindings against it
+        wal_colors = load_wal_colors()
+        for config_path in sway_config_paths:
+            current_features = parse_sway_config(config_path, file_collector, parse_cache, probe, jobs, use_processes,
+                                                 variables_only, wal_colors=wal_colors)
+            sway_features.update(current_features)
+            sway_variables.update(current_features.get("Variables", {}))
+        _merge_wal_variables(file_collector, sway_variables, wal_colors)
+    return sway_features, sway_variables
+
+def _merge_wal_variables(file_collector, sway_variables, wal_colors):
+    """
+    Overrides the palette variables with pywal's colors.json (see WalColors.merge_sway_variables)
+    and records colors.json among the wal generated files.
+    """
+    if wal_colors is not None:
+        file_collector.add_wal_generated_file(wal_colors.source)
+        sway_variables.update(wal_colors.merge_sway_variables(sway_variables))
+
+def collect_sway_ipc(file_collector, ipc, parse_cache=None, probe=None, variables_only=False):
+    """
+    Parses the Sway configuration the running compositor loaded, read over its IPC socket.
+
+    The config text of GET_CONFIG (and of the included files, when the compositor
+    returns them) is parsed like the files, so every report section is filled the
+    same way. Bars, binding modes and outputs as the compositor runs them are added
+    to "Bar Configuration" and "Other", located at the IPC socket. All requests go
+    over the one connection of ipc.
+
+    Args:
+        file_collector: A FileCollector instance.
+        ipc: A sway_ipc.SwayIPC client.
+        parse_cache: An optional ParseCache; the texts are looked up by content digest.
+        probe: An optional FileProbe for the exec script lookup.
+        variables_only: Parse only what the Sway variables need (see parse_sway_config).
+
+    Returns:
+        A tuple of (sway_features, sway_variables), as collect_sway.
+    """
+    from sway_parser import parse_sway_config, scan_sway_text
+    from wal_colors import load_wal_colors
+
+    with PROFILER.phase("sway ipc"):
+        reply = ipc.get_config()
+    with PROFILER.phase("discovery"):
+        sway_config_paths = file_collector.find_sway_configs()
+    # GET_CONFIG does not name the file; the config is reported under the active one
+    config_path = sway_config_paths[0] if sway_config_paths else ipc.socket_path
+    texts = {config_path: reply.get("config", "")}
+    for included in reply.get("included_configs") or ():
+        path = included.get("path")
+        if not path:
+            continue
+        if "raw_contents" in included:
+            texts[path] = included["raw_contents"]
+        elif os.path.isfile(path):
+            # Older compositors leave the contents out; the parser then reads the file
+            # itself (and reports it if it is missing), which may differ from what Sway loaded
+            print(f"Warning: Sway returned no contents for included config {path}; reading it from disk.")
+    with PROFILER.phase("sway"):
+        if parse_cache is not None:
+            preloaded = {path: parse_cache.get_text_records(path, text, scan_sway_text) for path, text in texts.items()}
+        else:
+            preloaded = {path: scan_sway_text(text) for path, text in texts.items()}
+        wal_colors = load_wal_colors()
+        sway_features = parse_sway_config(config_path, file_collector, parse_cache, probe,
+                                          variables_only=variables_only, preloaded=preloaded, wal_colors=wal_colors)
+        sway_variables = dict(sway_features["Variables"])
+        _merge_wal_variables(file_collector, sway_variables, wal_colors)
+    if not variables_only:
+        with PROFILER.phase("sway ipc"):
+            _add_running_state(sway_features, ipc)
+    return sway_features, sway_variables
+
+def _add_running_state(sway_features, ipc):
+    """Adds the bars, binding modes and outputs of the running compositor to the report sections."""
+    from records import FILES, SwayDirective
+
+    file_id = FILES.intern(ipc.socket_path)
+    for bar_id in ipc.get_bar_config():
+        bar = ipc.get_bar_config(bar_id)
+        text = f"bar {bar_id} (running): mode {bar.get('mode')}, position {bar.get('position')}"
+        if bar.get("status_command"):
+            text += f", status_command {bar['status_command']}"
+        sway_features["Bar Configuration"].append(SwayDirective(text, file_id))
+    modes = ipc.get_binding_modes()
+    if modes:
+        sway_features["Other"].append(SwayDirective(f"binding modes (running): {', '.join(modes)}", file_id))
+    for output in ipc.get_outputs():
+        mode = output.get("current_mode") or {}
+        if output.get("active") and mode:
+            state = f"{mode.get('width')}x{mode.get('height')}@{mode.get('refresh', 0) / 1000:g}Hz " \
+                    f"scale {output.get('scale')}"
+        else:
+            state = "disabled"
+        sway_features["Other"].append(SwayDirective(f"output {output.get('name')} (running): {state}", file_id))
+
+def read_texts(paths, pool=None):
+    """
+    Reads text files, on an executor when one is given so the blocking reads overlap.
+
+    Returns:
+        A dictionary mapping each path that could be read to its contents; callers
+        read the missing ones themselves, to report the error as they always have.
+    """
+    def read(path):
+        try:
+            with open(path, "r") as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    paths = [path for path in dict.fromkeys(paths) if path]
+    texts = pool.map(read, paths) if pool is not None else map(read, paths)
+    contents = {path: text for path, text in zip(paths, texts) if text is not None}
+    PROFILER.count("files read", len(contents))
+    PROFILER.count("bytes read", sum(len(text) for text in contents.values()))
+    return contents
+
+class WaybarStyles:
+    """The Waybar style sheets read and tokenized ahead, waiting for the Sway variables."""
+
+    __slots__ = ("style_paths", "colors_waybar_path", "palette", "stylesheets")
+
+    def __init__(self, style_paths, colors_waybar_path, palette, stylesheets):
+        self.style_paths = style_paths
+        self.colors_waybar_path = colors_waybar_path
+        self.palette = palette
+        self.stylesheets = stylesheets
+
+def prepare_waybar_styles(file_collector, pool=None):
+    """
+    Discovers the active Waybar style sheets, reads and tokenizes them and loads their
+    @define-color palette: everything that does not need the Sway variables.
+
+    Returns:
+        A WaybarStyles for resolve_waybar_styles.
+    """
+    from palette import load_palette
+    from wal_colors import load_wal_colors
+    from waybar_style_parser import load_stylesheet
+
+    with PROFILER.phase("discovery"):
+        waybar_style_paths = file_collector.find_waybar_styles()
+        # Recorded by resolve_waybar_styles, so the wal files keep the order of a serial run
+        colors_waybar_path = file_collector.find_colors_waybar_css(record=False)
+
+    with PROFILER.phase("waybar styles"):
+        texts = read_texts(waybar_style_paths, pool)
+        stylesheets = {path: load_stylesheet(path, texts.get(path)) for path in waybar_style_paths}
+        # The @define-color palette is resolved once and shared by every style sheet,
+        # seeded from pywal's colors.json instead of re-reading colors-waybar.css
+        wal_colors = load_wal_colors()
+        if wal_colors is not None:
+            skip = [colors_waybar_path] if colors_waybar_path and wal_colors.is_generated(colors_waybar_path) else []
+            palette = load_palette(list(waybar_style_paths), base=wal_colors.define_colors(), skip=skip)
+        else:
+            palette = load_palette([colors_waybar_path] + list(waybar_style_paths))
+        for cycle in palette.cycles:
+            print(f"Warning: Color definition cycle: {' -> '.join('@' + name for name in cycle)}")
+    return WaybarStyles(waybar_style_paths, colors_waybar_path, palette, stylesheets)
+
+def resolve_waybar_styles(styles, file_collector, sway_variables, debug_mode=False, module_ids=None):
+    """
+    Resolves the colors of the prepared Waybar style sheets against the Sway variables.
+
+    Args:
+        module_ids: The ids of the modules the Waybar configs use (see configured_module_ids);
+            rules for no other module are skipped. None resolves every module.
+
+    Returns:
+        A dictionary mapping module names to their colors.
+    """
+    from waybar_style_parser import parse_waybar_style
+
+    with PROFILER.phase("discovery"):
+        file_collector.find_colors_waybar_css()
+    waybar_style_colors = {}
+    with PROFILER.phase("waybar styles"):
+        # Iterate through active Waybar style paths
+        for style_path in styles.style_paths:
+            # Pass the debug flag to waybar_style_parser
+            style_colors = parse_waybar_style(style_path, sway_variables, styles.colors_waybar_path, file_collector,
+                                              debug_mode, palette=styles.palette,
+                                              stylesheet=styles.stylesheets.get(style_path), module_ids=module_ids)
+            waybar_style_colors.update(style_colors)
+    return waybar_style_colors
+
+def collect_waybar_styles(file_collector, sway_variables, debug_mode=False):
+    """
+    Discovers and parses the active Waybar style sheets.
+
+    Returns:
+        A dictionary mapping module names to their colors.
+    """
+    return resolve_waybar_styles(prepare_waybar_styles(file_collector), file_collector, sway_variables, debug_mode)
+
+def load_waybar_configs(waybar_config_paths, pool=None):
+    """
+    Reads and tokenizes the active Waybar configurations ahead of collect_waybar_modules.
+
+    Returns:
+        A dictionary mapping each config path to its load_waybar_config result.
+    """
+    from waybar_parser import load_waybar_config
+
+    with PROFILER.phase("waybar config"):
+        texts = read_texts(waybar_config_paths, pool)
+        return {path: load_waybar_config(path, texts.get(path)) for path in waybar_config_paths if path}
+
+def collect_waybar_modules(waybar_config_paths, sway_variables, waybar_style_colors, loaded=None):
+    """
+    Parses the active Waybar configurations.
+
+    Args:
+        loaded: The configurations loaded ahead by load_waybar_configs; the others are read here.
+
+    Returns:
+        A dictionary of modules keyed by bar position.
+    """
+    from waybar_parser import MODULE_POSITIONS, parse_waybar_config
+
+    loaded = loaded or {}
+    waybar_modules = {}
+    with PROFILER.phase("waybar config"):
+        for config_path in waybar_config_paths:
+            if config_path in loaded and loaded[config_path] is None:
+                # Not valid JSONC; the error was printed when it was loaded
+                modules = {position: [] for position in MODULE_POSITIONS}
+            else:
+                modules = parse_waybar_config(config_path, sway_variables, waybar_style_colors,
+                                              loaded.get(config_path))
+            for position, module_list in modules.items():
+                if position not in waybar_modules:
+                    waybar_modules[position] = []
+                waybar_modules[position].extend(module_list)
+    return waybar_modules
@@ -0,0 +1,186 @@
+import contextlib
+import json
+import threading
+import time
+
+
+class PhaseStats:
+    """
+    Accumulated measurements of one named phase of a run.
+
+    A phase entered several times (once per config file, say) adds up into the
+    same PhaseStats.
+
+    Attributes:
+        wall: Wall-clock seconds.
+        cpu: CPU seconds of the process (all threads; process pool workers are not included).
+        peak_memory: Highest tracemalloc peak in bytes, or None when memory is not traced.
+        counters: Counter name -> accumulated amount.
+    """
+
+    __slots__ = ("name", "wall", "cpu", "peak_memory", "counters")
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = None
+        self.counters = {}
+
+    def as_dict(self):
+        return {"wall": self.wall, "cpu": self.cpu, "peak_memory": self.peak_memory, "counters": dict(self.counters)}
+
+
+class Profiler:
+    """
+    Per-phase timing, counters and event hooks for one run.
+
+    The parsers report through the module-level PROFILER: `count()` adds to the
+    counters of the innermost active phase and is a no-op when profiling is off,
+    and `emit()` hands details (such as the resolved style colors) to whoever
+    subscribed to a channel. Counters that other objects already keep, such as
+    FileProbe.stat_calls, are registered with `watch()` and recorded as their change
+    over each phase.
+
+    Each thread has its own stack of active phases, but the gauges, the CPU time
+    and the memory peak are process-wide: phases that overlap in time all see the
+    same change, so main() runs the app parsers serially while profiling. A nested
+    phase resets the tracemalloc peak; the peak up to then is kept for the
+    enclosing phases.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.phases = {}
+        self._local = threading.local()
+        # [stats, gauges, peak] of every active phase of any thread, in the order they were entered
+        self._open = []
+        self._gauges = {}
+        self._listeners = {}
+        self._lock = threading.Lock()
+
+    def start(self, trace_memory=False):
+        """Starts recording phases; with trace_memory, also the tracemalloc peak of each phase."""
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory:
+            # tracemalloc pulls in pickle and linecache, so it is only imported when memory is traced
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def stop(self):
+        self.enabled = False
+        if self.trace_memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def watch(self, name, gauge):
+        """Records the change of gauge() (a callable returning a number) over each phase as counter `name`."""
+        self._gauges[name] = gauge
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def count(self, name, amount=1):
+        """Adds amount to a counter of the innermost active phase of this thread."""
+        if self._open:
+            stack = self._stack()
+            with self._lock:
+                # Scanning threads of a parallel Sway parse have no phase of their own and
+                # count into the phase entered last
+                frame = stack[-1] if stack else self._open[-1] if self._open else None
+                if frame is not None:
+                    counters = frame[0].counters
+                    counters[name] = counters.get(name, 0) + amount
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Measures the enclosed block as phase `name` (a no-op unless the profiler is started)."""
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats(name)
+        gauges = {key: gauge() for key, gauge in self._gauges.items()}
+        frame = [stats, gauges, 0]
+        stack = self._stack()
+        stack.append(frame)
+        with self._lock:
+            if self.trace_memory:
+                import tracemalloc
+                # Resetting the peak for this phase would lose it for the open ones
+                peak = tracemalloc.get_traced_memory()[1]
+                for other in self._open:
+                    other[2] = max(other[2], peak)
+                tracemalloc.reset_peak()
+            self._open.append(frame)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            stack.pop()
+            deltas = {key: gauge() - gauges[key] for key, gauge in self._gauges.items()}
+            with self._lock:
+                # By identity: frames of concurrent runs of one phase can compare equal
+                del self._open[next(i for i, other in enumerate(self._open) if other is frame)]
+                stats.wall += wall
+                stats.cpu += cpu
+                for key, delta in deltas.items():
+                    if delta:
+                        stats.counters[key] = stats.counters.get(key, 0) + delta
+                if self.trace_memory:
+                    peak = max(frame[2], tracemalloc.get_traced_memory()[1])
+                    stats.peak_memory = max(stats.peak_memory or 0, peak)
+
+    def subscribe(self, channel, callback):
+        """Calls callback(*details) for everything emitted on channel."""
+        self._listeners.setdefault(channel, []).append(callback)
+
+    def unsubscribe(self, channel, callback):
+        self._listeners.get(channel, []).remove(callback)
+
+    def listening(self, channel):
+        """Returns True if anything subscribed to channel, so emitters can skip building the details."""
+        return bool(self._listeners.get(channel))
+
+    def emit(self, channel, *details):
+        for callback in self._listeners.get(channel, ()):
+            callback(*details)
+
+    def as_dict(self):
+        """Returns the phases, in the order they first ran, as a JSON-serializable dictionary."""
+        return {name: stats.as_dict() for name, stats in self.phases.items()}
+
+    def format_json(self):
+        return json.dumps({"phases": self.as_dict()}, indent=2)
+
+    def format_table(self):
+        """Formats the phases as a table, followed by each phase's counters."""
+        lines = [f"{'phase':16s} {'wall ms':>10s} {'cpu ms':>10s} {'peak KiB':>10s}"]
+        for stats in self.phases.values():
+            peak = f"{stats.peak_memory / 1024:10.1f}" if stats.peak_memory is not None else f"{'-':>10s}"
+            lines.append(f"{stats.name:16s} {stats.wall * 1000:10.2f} {stats.cpu * 1000:10.2f} {peak}")
+        total_wall = sum(stats.wall for stats in self.phases.values())
+        total_cpu = sum(stats.cpu for stats in self.phases.values())
+        lines.append(f"{'total':16s} {total_wall * 1000:10.2f} {total_cpu * 1000:10.2f}")
+        for stats in self.phases.values():
+            if stats.counters:
+                lines.append(f"{stats.name}:")
+                for key, value in sorted(stats.counters.items()):
+                    lines.append(f"  {key:40s} {value:>12,}")
+        return "\n".join(lines)
+
+
+# Process-wide profiler the parsers report to
+PROFILER = Profiler()
@@ -0,0 +1,352 @@
+import re
+import threading
+
+# A hex color the report can draw a swatch for
+_HEX_COLOR_RE = re.compile(r'#[a-fA-F0-9]{3,8}\b')
+# foot and swaylock write colors as bare rrggbb or rrggbbaa
+_BARE_HEX_COLOR_RE = re.compile(r'[a-fA-F0-9]{6}(?:[a-fA-F0-9]{2})?')
+
+
+class FileTable:
+    """
+    Interns file paths as small integer ids.
+
+    Records store the id instead of the path, so every record of a file shares
+    one table entry and records stay small and cheap to compare.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._paths = []
+        self._lock = threading.Lock()
+
+    def intern(self, file_path):
+        """Returns the id of file_path, assigning the next id on first sight."""
+        file_id = self._ids.get(file_path)
+        if file_id is None:
+            # App parsers running on several threads may intern new files at once
+            with self._lock:
+                file_id = self._ids.get(file_path)
+                if file_id is None:
+                    file_id = self._ids[file_path] = len(self._paths)
+                    self._paths.append(file_path)
+        return file_id
+
+    def path(self, file_id):
+        return self._paths[file_id]
+
+    def __len__(self):
+        return len(self._paths)
+
+
+# Process-wide table shared by all records
+FILES = FileTable()
+
+
+class SourceLocation:
+    """Mixin for records that point back into a file: file id, 1-based line number and byte offset."""
+
+    __slots__ = ()
+
+    @property
+    def file_path(self):
+        return FILES.path(self.file_id)
+
+    def location(self):
+        """Returns "path:line", the form editors and terminals open at the right line."""
+        if self.line_number is None:
+            return self.file_path
+        return f"{self.file_path}:{self.line_number}"
+
+
+class SwayDirective(SourceLocation):
+    """One classified line of a Sway config."""
+
+    __slots__ = ("text", "file_id", "line_number", "offset")
+
+    def __init__(self, text, file_id, line_number=None, offset=None):
+        self.text = text
+        self.file_id = file_id
+        self.line_number = line_number
+        self.offset = offset
+
+    def with_text(self, text):
+        """Returns a copy of the directive with new text at the same location."""
+        return SwayDirective(text, self.file_id, self.line_number, self.offset)
+
+    def __eq__(self, other):
+        return (isinstance(other, SwayDirective) and self.text == other.text and self.file_id == other.file_id
+                and self.line_number == other.line_number and self.offset == other.offset)
+
+    def __hash__(self):
+        return hash((self.text, self.file_id, self.line_number))
+
+    def __repr__(self):
+        return f"SwayDirective({self.text!r}, {self.location()!r})"
+
+
+class SwayBlock(SourceLocation):
+    """
+    One `{ }` block of a Sway config, such as `bar`, `mode "resize"` or `input type:touchpad`.
+
+    Attributes:
+        kind: The first word of the block header ("bar", "mode", "input", "colors").
+        args: The remaining header words, unquoted ("resize", "type:touchpad").
+        children: SwayDirectives and nested SwayBlocks in file order.
+    """
+
+    __slots__ = ("kind", "args", "children", "file_id", "line_number", "offset")
+
+    def __init__(self, kind, args, children, file_id, line_number=None, offset=None):
+        self.kind = kind
+        self.args = args
+        self.children = children
+        self.file_id = file_id
+        self.line_number = line_number
+        self.offset = offset
+
+    @property
+    def key(self):
+        """What the block is looked up by: the bar id, mode name or input/output identifier."""
+        return " ".join(self.args)
+
+    def blocks(self, kind=None):
+        """Returns the nested blocks (of one kind) directly inside this block."""
+        return [child for child in self.children
+                if isinstance(child, SwayBlock) and (kind is None or child.kind == kind)]
+
+    def directives(self):
+        """Returns the directives directly inside this block."""
+        return [child for child in self.children if isinstance(child, SwayDirective)]
+
+    def __eq__(self, other):
+        return (isinstance(other, SwayBlock) and self.kind == other.kind and self.args == other.args
+                and self.children == other.children and self.file_id == other.file_id
+                and self.line_number == other.line_number)
+
+    def __hash__(self):
+        return hash((self.kind, self.args, self.file_id, self.line_number))
+
+    def __repr__(self):
+        return f"SwayBlock({self.kind!r}, {self.key!r}, {len(self.children)} children, {self.location()!r})"
+
+
+class SwayBlockIndex:
+    """
+    The top-level blocks of a Sway config, by kind and key.
+
+    A key can have several blocks, e.g. an `input` block repeated in an included file;
+    they are kept in the order Sway applies them.
+    """
+
+    __slots__ = ("_blocks",)
+
+    def __init__(self):
+        self._blocks = {}
+
+    def add(self, block):
+        self._blocks.setdefault(block.kind, {}).setdefault(block.key, []).append(block)
+
+    def get(self, kind, key=""):
+        """Returns the blocks of a kind with a key (the bar id, mode name, input identifier), or []."""
+        return self._blocks.get(kind, {}).get(key, [])
+
+    def keys(self, kind):
+        """Returns the keys of the blocks of a kind, e.g. every mode name."""
+        return list(self._blocks.get(kind, ()))
+
+    def of_kind(self, kind):
+        """Returns every block of a kind, in file order per key."""
+        return [block for blocks in self._blocks.get(kind, {}).values() for block in blocks]
+
+    def __iter__(self):
+        for by_key in self._blocks.values():
+            for blocks in by_key.values():
+                yield from blocks
+
+    def __len__(self):
+        return sum(len(blocks) for by_key in self._blocks.values() for blocks in by_key.values())
+
+    def __eq__(self, other):
+        return isinstance(other, SwayBlockIndex) and self._blocks == other._blocks
+
+
+class ColorRef:
+    """
+    A color attached to a Waybar module.
+
+    Attributes:
+        role: "F" for the foreground, "B" for the background.
+        value: The resolved color: a hex code, or the reference text if it could not be resolved.
+        origin: "config" for a color from config.jsonc, "style" for one from style.css.
+    """
+
+    __slots__ = ("role", "value", "origin")
+
+    def __init__(self, role, value, origin):
+        self.role = role
+        self.value = value
+        self.origin = origin
+
+    @property
+    def hex(self):
+        """The color as a hex code, or None if it is not one."""
+        match = _HEX_COLOR_RE.fullmatch(self.value)
+        return match.group() if match else None
+
+    def __eq__(self, other):
+        return isinstance(other, ColorRef) and (self.role, self.value, self.origin) == (other.role, other.value, other.origin)
+
+    def __hash__(self):
+        return hash((self.role, self.value, self.origin))
+
+    def __repr__(self):
+        return f"ColorRef({self.role}:{self.value}, {self.origin})"
+
+
+class WaybarModule(SourceLocation):
+    """
+    One module of a Waybar bar.
+
+    Attributes:
+        name: The configuration key shown for the module ("cpu", "battery#bat2").
+        configured: Whether config.jsonc has a configuration object for it.
+        styled: Whether style.css has rules for it.
+        colors: ColorRefs from the configuration first, then from the style sheet.
+    """
+
+    __slots__ = ("name", "configured", "styled", "colors", "file_id", "line_number", "offset")
+
+    def __init__(self, name, configured, styled, colors, file_id, line_number=None, offset=None):
+        self.name = name
+        self.configured = configured
+        self.styled = styled
+        self.colors = colors
+        self.file_id = file_id
+        self.line_number = line_number
+        self.offset = offset
+
+    def color(self, role):
+        """Returns the first color of a role ("F" or "B") that is a hex code, or None."""
+        for color in self.colors:
+            if color.role == role and color.hex:
+                return color.hex
+        return None
+
+    def status(self):
+        """Returns "no style detected", "style detected" or None when the module has colors."""
+        if self.colors:
+            return None
+        if self.styled and not self.configured:
+            return "style detected"
+        return "no style detected"
+
+    def display_name(self):
+        """The module name, starred when it is configured or styled (once, if the name already ends in "*")."""
+        if not (self.configured or self.styled):
+            return self.name
+        return self.name if self.name.endswith("*") else self.name + "*"
+
+    def __str__(self):
+        text = self.display_name()
+        if self.colors:
+            text += f" ({', '.join(f'{c.role}:{c.value}' for c in self.colors)})"
+        else:
+            text += f" ({self.status()})"
+        return text
+
+    def __eq__(self, other):
+        return (isinstance(other, WaybarModule) and self.name == other.name and self.configured == other.configured
+                and self.styled == other.styled and self.colors == other.colors and self.file_id == other.file_id
+                and self.line_number == other.line_number)
+
+    def __hash__(self):
+        return hash((self.name, self.file_id, self.line_number))
+
+    def __repr__(self):
+        return f"WaybarModule({str(self)!r}, {self.location()!r})"
+
+
+class AppSetting(SourceLocation):
+    """
+    One setting of an application config handled by a dotfile parser (kitty, foot, mako...).
+
+    Attributes:
+        key: The setting name, prefixed with its section ("colors.primary.background").
+        value: The value as written in the file.
+    """
+
+    __slots__ = ("key", "value", "file_id", "line_number", "offset")
+
+    def __init__(self, key, value, file_id, line_number=None, offset=None):
+        self.key = key
+        self.value = value
+        self.file_id = file_id
+        self.line_number = line_number
+        self.offset = offset
+
+    @property
+    def hex(self):
+        """The first hex color in the value (a bare rrggbb value counts as one), or None."""
+        if _BARE_HEX_COLOR_RE.fullmatch(self.value):
+            return "#" + self.value
+        match = _HEX_COLOR_RE.search(self.value)
+        return match.group() if match else None
+
+    def __str__(self):
+        return f"{self.key} = {self.value}" if self.value != "" else self.key
+
+    def __eq__(self, other):
+        return (isinstance(other, AppSetting) and self.key == other.key and self.value == other.value
+                and self.file_id == other.file_id and self.line_number == other.line_number)
+
+    def __hash__(self):
+        return hash((self.key, self.value, self.file_id, self.line_number))
+
+    def __repr__(self):
+        return f"AppSetting({str(self)!r}, {self.location()!r})"
+
+
+class Keybinding(SourceLocation):
+    """
+    One `bindsym` of a Sway config, normalized so equal chords compare equal.
+
+    Attributes:
+        key: The hashable identity Sway replaces bindings by: (mode, modifiers in canonical
+            order, case-folded keysyms, flags), see keybindings.binding_key.
+        command: The bound command, with $variables as written.
+        text: The bindsym line as written.
+    """
+
+    __slots__ = ("key", "command", "text", "file_id", "line_number", "offset")
+
+    def __init__(self, key, command, text, file_id, line_number=None, offset=None):
+        self.key = key
+        self.command = command
+        self.text = text
+        self.file_id = file_id
+        self.line_number = line_number
+        self.offset = offset
+
+    @property
+    def mode(self):
+        return self.key[0]
+
+    @property
+    def chord(self):
+        """The chord in canonical form ("Mod4+Shift+q")."""
+        return "+".join(self.key[1] + self.key[2])
+
+    @property
+    def flags(self):
+        return self.key[3]
+
+    def __eq__(self, other):
+        return (isinstance(other, Keybinding) and self.key == other.key and self.command == other.command
+                and self.file_id == other.file_id and self.line_number == other.line_number)
+
+    def __hash__(self):
+        return hash((self.key, self.file_id, self.line_number))
+
+    def __repr__(self):
+        return f"Keybinding({self.chord!r}, mode={self.mode!r}, {self.command!r}, {self.location()!r})"
@@ -1,7 +1,5 @@
-import re
-from collections import defaultdict
 import os
-from colorize_sway import colorize_sway_config_line as colorize_sway_line
+from colorize_sway import colorize_sway_config_lines
 
 # ANSI escape codes for colors and styles
 COLOR_RESET = "\x1b[0m"
@@ -26,8 +24,12 @@ STYLE_ITALIC = "\x1b[3m"
 STYLE_UNDERLINE = "\x1b[4m"
 
 def hex_to_rgb(hex_color):
-    """Converts a hex color string to an (R, G, B) tuple."""
+    """Converts a #rgb, #rgba, #rrggbb or #rrggbbaa color string to an (R, G, B) tuple (alpha is dropped)."""
     hex_color = hex_color.lstrip('#')
+    if len(hex_color) in (3, 4):
+        hex_color = "".join(c * 2 for c in hex_color)
+    if len(hex_color) == 8:
+        hex_color = hex_color[:6]
     if len(hex_color) != 6:
         return None
     try:
@@ -35,134 +37,115 @@ def hex_to_rgb(hex_color):
     except ValueError:
         return None
 
-def colorize_line(line, patterns_to_colors):
+def _color_box(label, hex_color):
+    rgb = hex_to_rgb(hex_color) if hex_color else None
+    if not rgb:
+        return ""
+    r, g, b = rgb
+    return f" {label}:\x1b[48;2;{r};{g};{b}m  \x1b[0m"
+
+def print_waybar_modules(waybar_modules, show_locations=False):
     """
-    Applies ANSI escape codes to colorize patterns in a line.
-    patterns_to_colors: A dictionary where keys are regex patterns and values are ANSI color codes.
+    Prints the Waybar modules section.
+
+    Args:
+        waybar_modules: A dictionary mapping bar positions to lists of WaybarModule records.
+        show_locations: Append the "path:line" each module is defined at.
     """
-    colored_line = line
-    # Sort patterns by length in descending order to prioritize longer matches
-    # This helps prevent partial matches of keywords that are substrings of other keywords
-    sorted_patterns = sorted(patterns_to_colors.items(), key=lambda item: len(item[0]), reverse=True)
-
-    for pattern_str, color_code in sorted_patterns:
-        # Use word boundaries to avoid partial word matches, unless the pattern itself is not a word
-        if re.match(r'^\w+$', pattern_str): # If pattern is a whole word
-            pattern = re.compile(r'\b(' + re.escape(pattern_str) + r')\b')
-        else: # If pattern contains non-word characters, match it as is
-            pattern = re.compile('(' + re.escape(pattern_str) + ')')
-        
-        # Replace matches with colored version, being careful not to re-colorize already colored parts
-        # This is a simplified approach; a full lexer would be more robust for complex cases.
-        def replacer(match):
-            # Only colorize if the match is not already part of an ANSI sequence
-            # This is a basic check and might not cover all edge cases
-            if color_code not in match.string[max(0, match.start()-10):match.end()+10]: # Check nearby for existing color
-                return color_code + match.group(1) + COLOR_RESET
-            return match.group(1)
-        
-        colored_line = pattern.sub(replacer, colored_line)
-    return colored_line
-
-
-
-
-
-def print_waybar_modules(waybar_modules):
-    """Prints the Waybar modules section."""
     print("--- Waybar Modules ---")
     if waybar_modules:
         for position, modules in waybar_modules.items():
             if modules:
                 print(f"  [{position}]")
                 for module in modules:
-                    display_name = module
-                    color_boxes = ""
-                    
-                    # Extract foreground color
-                    fg_hex = None
-                    fg_match = re.search(r'F:(#[a-fA-F0-9]{6})', module)
-                    if fg_match:
-                        fg_hex = fg_match.group(1)
-                        rgb = hex_to_rgb(fg_hex)
-                        if rgb:
-                            r, g, b = rgb
-                            color_boxes += f" F:\x1b[48;2;{r};{g};{b}m  \x1b[0m"
-                    
-                    # Extract background color
-                    bg_hex = None
-                    bg_match = re.search(r'B:(#[a-fA-F0-9]{6})', module)
-                    if bg_match:
-                        bg_hex = bg_match.group(1)
-                        rgb = hex_to_rgb(bg_hex)
-                        if rgb:
-                            r, g, b = rgb
-                            color_boxes += f" B:\x1b[48;2;{r};{g};{b}m  \x1b[0m"
-                    
-                    module_name_only_match = re.match(r'([a-zA-Z0-9_/-]+\*?)\s*(\(.*\))?', module)
-                    if module_name_only_match:
-                        base_module_name = module_name_only_match.group(1)
-                        # Check if there was a style status message
-                        style_status_match = re.search(r'\(no style detected\)', module) or re.search(r'\(style detected\)', module)
-                        
-                        final_display_name = base_module_name
-                        if style_status_match:
-                            final_display_name += f" {style_status_match.group(0)}"
-                        
-                        print(f"    - {final_display_name}{color_boxes}")
-                    else:
-                        # Fallback if the regex doesn't match, though it should for valid modules
-                        print(f"    - {display_name}{color_boxes}")
+                    final_display_name = module.display_name()
+                    status = module.status()
+                    if status:
+                        final_display_name += f" ({status})"
+                    color_boxes = _color_box("F", module.color("F")) + _color_box("B", module.color("B"))
+                    location = f" [{module.location()}]" if show_locations else ""
+                    print(f"    - {final_display_name}{color_boxes}{location}")
     else:
         print("  No Waybar modules found.")
     print("-" * 40)
 
-def generate_report(sway_features, waybar_modules, file_collector):
+def _source(file_path, directive=None, show_locations=False):
+    """Formats where a feature comes from: the file name, or "path:line" for jump-to-source output."""
+    if not show_locations:
+        return os.path.basename(file_path)
+    return directive.location() if directive is not None else file_path
+
+def generate_report(sway_features, waybar_modules, file_collector, show_locations=False, show_files=True,
+                    app_sections=()):
     """
     Generates a report of the enabled features.
 
     Args:
-        sway_features: A dictionary of categorized Sway features.
-        waybar_modules: A dictionary of categorized Waybar modules.
+        sway_features: A dictionary of categorized Sway features, or None to leave Sway out.
+        waybar_modules: A dictionary of categorized Waybar modules, or None to leave Waybar out.
         file_collector: A FileCollector instance.
+        show_locations: Print "path:line" sources that editors can jump to instead of file names.
+        show_files: Print the files overview and the WAL report.
+        app_sections: (title, AppSetting list) pairs of the other applications, printed last.
     """
     print("-" * 60)
     print("--- Start Report ---")
     print("-" * 60)
     print("Scanning settings for the following applications:")
-    print("  - Sway")
-    print("  - Waybar")
+    if sway_features is not None:
+        print("  - Sway")
+    if waybar_modules is not None:
+        print("  - Waybar")
+    for title, _ in app_sections:
+        print(f"  - {title}")
     print("-" * 40)
     print()
 
+    if sway_features is not None:
+        print_sway_features(sway_features, show_locations)
+    if show_files:
+        print_files_overview(file_collector)
+    if waybar_modules is not None:
+        print()
+        print_waybar_modules(waybar_modules, show_locations)
+    for title, settings in app_sections:
+        print()
+        print_app_settings(title, settings, show_locations)
+
+def print_app_settings(title, settings, show_locations=False):
+    """Prints the settings of an application read by a dotfile parser, with a swatch for colors."""
+    print(f"--- {title} ---")
+    for setting in settings:
+        color_box = _color_box("C", setting.hex)
+        print(f"  {setting}{color_box} (from {_source(setting.file_path, setting, show_locations)})")
+    print("-" * 40)
+
+def print_sway_features(sway_features, show_locations=False):
+    """Prints the Sway configuration section, one block per non-empty category."""
     print("--- Sway Configuration ---")
     for category, items in sway_features.items():
         if category == "Variables":
             if items:
                 print()
                 print(f"  [{category}]")
-                for var_name, (var_value, file_path) in items.items():
-                    # Colorize the variable definition line
-                    colored_line = colorize_sway_line(f"set {var_name} {var_value}")
-                    print(f"    {colored_line} (from {os.path.basename(file_path)})")
-        elif category == "Bar Configuration":
-            if items:
-                line, file_path = items
-                colored_line = colorize_sway_line(line)
-                print()
-                print(f"  [{category}]")
-                print(f"    {colored_line} (from {os.path.basename(file_path)})")
+                # Colorize the variable definition lines
+                colored_lines = colorize_sway_config_lines(f"set {var_name} {var_value}" for var_name, (var_value, _) in items.items())
+                for colored_line, (_, file_path) in zip(colored_lines, items.values()):
+                    print(f"    {colored_line} (from {_source(file_path, None, show_locations)})")
+        elif category == "Blocks" or category == "Keybinding Index":
+            continue # Indexes for queries; bars and overrides are listed in their own categories
         elif items:
             print()
             print(f"  [{category}]")
-            for item, file_path in items:
-                # Colorize each line item
-                colored_line = colorize_sway_line(item)
-                print(f"    {colored_line} (from {os.path.basename(file_path)})")
+            # Colorize all line items of the category in one pass
+            colored_lines = colorize_sway_config_lines(directive.text for directive in items)
+            for colored_line, directive in zip(colored_lines, items):
+                print(f"    {colored_line} (from {_source(directive.file_path, directive, show_locations)})")
     print("-" * 40)
     print()
 
-    # New file reporting section - moved to the end
+def print_files_overview(file_collector):
+    """Prints the files found during discovery by type, followed by the WAL report."""
     print()
     print("[Files Overview]")
     sway_active_configs = []
@@ -170,6 +153,7 @@ def generate_report(sway_features, waybar_modules, file_collector):
     waybar_active_configs = []
     waybar_inactive_configs = []
     waybar_styles = []
+    app_configs = []
     wal_generated_files = []
     scripts = []
     sourced_configs = []
@@ -188,6 +172,8 @@ def generate_report(sway_features, waybar_modules, file_collector):
                 waybar_inactive_configs.append(metadata)
         elif metadata.type == "waybar_style":
             waybar_styles.append(metadata)
+        elif metadata.type == "app_config":
+            app_configs.append(metadata)
         elif metadata.type == "wal_generated":
             wal_generated_files.append(metadata)
         elif metadata.type == "script":
@@ -212,10 +198,17 @@ def generate_report(sway_features, waybar_modules, file_collector):
     print_file_list("Waybar Active configurations", waybar_active_configs)
     print_file_list("Waybar Inactive configurations", waybar_inactive_configs)
     print_file_list("Waybar Styles", waybar_styles)
+    # Sorted, as the app parsers record their configs concurrently
+    print_file_list("Application configurations", sorted(app_configs, key=lambda f_meta: f_meta.path))
     print_file_list("Sourced configurations", sourced_configs)
     print_file_list("Scripts", scripts)
     print_file_list("Other files", other_files)
 
+    if file_collector.source_cycles:
+        print("  Source cycles (not followed):")
+        for cycle in file_collector.source_cycles:
+            print(f"  - {' -> '.join(os.path.basename(p) for p in cycle)}")
+
     # WAL Report Section - moved to the end
     if wal_generated_files:
         print()
@@ -229,6 +222,3 @@ def generate_report(sway_features, waybar_modules, file_collector):
                 print(f"    Sourced by: {', '.join(sourcing_files)}")
             else:
                 print("    Not explicitly sourced by other configs (might be implicitly used).")
-
-    print()
-    print_waybar_modules(waybar_modules)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import json
+import os
+import socket
+import struct
+
+# i3-ipc framing: the magic string, then the payload length and message type in
+# native byte order, then the JSON payload. Replies carry the type of their request.
+IPC_MAGIC = b"i3-ipc"
+_HEADER = struct.Struct("=6sII")
+
+# Message types used here (see sway-ipc(7))
+GET_OUTPUTS = 3
+GET_BAR_CONFIG = 6
+GET_VERSION = 7
+GET_BINDING_MODES = 8
+GET_CONFIG = 9
+
+
+def default_sway_socket():
+    """Returns the IPC socket of the running Sway ($SWAYSOCK, or $I3SOCK for i3), or None."""
+    return os.environ.get("SWAYSOCK") or os.environ.get("I3SOCK")
+
+
+def pack_message(message_type, payload=b""):
+    """Frames one i3-ipc message (used for requests and, by stand-in servers, for replies)."""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return _HEADER.pack(IPC_MAGIC, len(payload), message_type) + payload
+
+
+def read_message(sock):
+    """
+    Reads one framed i3-ipc message from a socket.
+
+    Returns:
+        A tuple of (message type, payload bytes).
+
+    Raises:
+        ConnectionError: If the peer closes the connection mid-message.
+        ValueError: If the message does not start with the i3-ipc magic string.
+    """
+    magic, length, message_type = _HEADER.unpack(_read_exactly(sock, _HEADER.size))
+    if magic != IPC_MAGIC:
+        raise ValueError(f"Not an i3-ipc message (magic {magic!r})")
+    return message_type, _read_exactly(sock, length)
+
+
+def _read_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Sway IPC connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class SwayIPC:
+    """
+    A client of the Sway IPC socket that sends every request over one connection.
+
+    The connection is opened on the first request and kept until close(), so a
+    report that asks for the config, the bars, the binding modes and the outputs
+    pays for one connect. Use it as a context manager to close it.
+    """
+
+    def __init__(self, socket_path=None, timeout=5.0):
+        """
+        Args:
+            socket_path: The IPC socket (default: $SWAYSOCK).
+            timeout: Seconds to wait for a reply.
+        """
+        self.socket_path = socket_path or default_sway_socket()
+        if not self.socket_path:
+            raise ValueError("No Sway IPC socket: $SWAYSOCK is not set")
+        self.timeout = timeout
+        self._sock = None
+        # Instrumentation
+        self.connections = 0
+        self.requests = 0
+
+    def _connection(self):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+            self.connections += 1
+        return self._sock
+
+    def request(self, message_type, payload=""):
+        """
+        Sends one request and returns its decoded JSON reply.
+
+        Raises:
+            OSError: If the socket cannot be reached or the connection breaks.
+            ValueError: If the reply is not a well-formed reply to the request.
+        """
+        sock = self._connection()
+        try:
+            sock.sendall(pack_message(message_type, payload))
+            reply_type, reply = read_message(sock)
+        except (OSError, ValueError):
+            # The stream position is unknown; the next request reconnects
+            self.close()
+            raise
+        self.requests += 1
+        if reply_type != message_type:
+            raise ValueError(f"Sway IPC replied with message type {reply_type} to type {message_type}")
+        return json.loads(reply)
+
+    def get_config(self):
+        """Returns the GET_CONFIG reply: {"config": text of the loaded config, ...}."""
+        return self.request(GET_CONFIG)
+
+    def get_bar_config(self, bar_id=None):
+        """Returns the ids of the bars, or the configuration of one bar."""
+        return self.request(GET_BAR_CONFIG, bar_id or "")
+
+    def get_binding_modes(self):
+        return self.request(GET_BINDING_MODES)
+
+    def get_outputs(self):
+        return self.request(GET_OUTPUTS)
+
+    def get_version(self):
+        return self.request(GET_VERSION)
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,164 +1,491 @@
+import glob
+import io
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import itertools
 import re
 import os
+from variable_resolver import VariableResolver
+from fs_probe import FileProbe
+from keybindings import KeybindingIndex, index_keybindings
+from profiling import PROFILER
+from records import FILES, SwayBlock, SwayBlockIndex, SwayDirective
 
-def parse_sway_config(config_path, file_collector):
+# Leading keywords that route a line; 'exec_always' is listed before 'exec' so the
+# longer keyword wins. Block headers such as 'bar {' are recognized by their brace.
+_KEYWORD_RE = re.compile(r'source|include|set|bindsym|exec_always|exec|gaps')
+_BINDSYM_EXEC_RE = re.compile(r'exec\s+(.*)')
+_DESIGN_RE = re.compile(r'background|client\.')
+_GLOB_CHARS_RE = re.compile(r'[*?\[]')
+# The feature categories config lines are classified into; the others are built from them
+_LINE_CATEGORIES = ("Design and Appearance", "Keybindings", "Workspace Management", "Application Autostart",
+                    "Bar Configuration", "Variables", "Other")
+
+# Look for paths starting with / or ~/ or ending with common script extensions
+_SCRIPT_PATTERNS = [
+    re.compile(r'((?:~|\/)[a-zA-Z0-9_\/\.-]+\.(?:sh|py|pl|rb|js|lua|fish|zsh|bash))'), # Paths with common extensions
+    re.compile(r'((?:~|\/)[a-zA-Z0-9_\/\.-]+)'), # General paths
+]
+
+def parse_sway_config(config_path, file_collector, cache=None, probe=None, jobs=1, use_processes=False,
+                      variables_only=False, preloaded=None, wal_colors=None):
     """
     Parses the Sway configuration file and extracts features.
 
     Args:
         config_path: The path to the Sway configuration file.
         file_collector: A FileCollector instance.
+        cache: An optional ParseCache used to skip re-scanning unchanged files.
+        probe: An optional FileProbe shared across parsers for memoized file checks.
+        jobs: Number of workers used to read and scan sourced files; 1 parses serially.
+        use_processes: Scan on a process pool instead of a thread pool (for very large trees).
+        variables_only: Skip the exec script lookup and the variable substitution in
+            "Design and Appearance", for callers that only need the variables.
+        preloaded: Records of files already read, by path (see scan_sway_text), such as
+            the config text the running compositor returns over IPC; they are used
+            instead of the files on disk, which are read only for the other includes.
+        wal_colors: The pywal palette (wal_colors.WalColors), if colors.json exists; its
+            variables override those of the pywal generated files (colors-sway) wherever
+            the variables are resolved. "Variables" keeps them as parsed.
 
     Returns:
-        A dictionary of categorized features.
+        A dictionary of categorized features: lists of SwayDirective records (one
+        summary per bar for "Bar Configuration"), a {name: (value, file_path)}
+        dictionary for "Variables", under "Blocks", a SwayBlockIndex of the top-level
+        blocks (bars, modes, inputs, outputs) and, under "Keybinding Index", a
+        KeybindingIndex of the bindings in effect. "Keybinding Conflicts" lists the
+        bindings a later one with the same chord and mode replaces.
     """
     features = {
         "Design and Appearance": [],
         "Keybindings": [],
+        "Keybinding Conflicts": [],
         "Workspace Management": [],
         "Application Autostart": [],
-        "Bar Configuration": None,
+        "Bar Configuration": [],
         "Variables": {},
         "Other": [],
+        "Blocks": SwayBlockIndex(),
+        "Keybinding Index": KeybindingIndex(),
     }
     if not config_path:
         return features
 
-    _parse_sway_file(config_path, features, file_collector)
+    exec_commands = []
+    prefetched = dict(preloaded) if preloaded else None
+    if jobs > 1 and not preloaded:
+        prefetched = _prefetch_source_graph(config_path, cache, jobs, use_processes)
+    _parse_source_graph(config_path, features, file_collector, cache, exec_commands, prefetched)
+
+    # Variables are flattened once and shared by every substitution below
+    variables = features["Variables"]
+    if wal_colors is not None:
+        variables = wal_colors.merge_sway_variables(variables)
+    resolver = VariableResolver(variables)
+    for cycle in resolver.cycles:
+        print(f"Warning: Variable definition cycle: {' -> '.join(cycle)}")
+    if variables_only:
+        return features
+
+    if probe is None:
+        probe = FileProbe()
+    for full_command, fallback in exec_commands:
+        _find_exec_script(full_command, resolver, file_collector, probe, fallback)
+
+    # Bindings are normalized once; the index replaces earlier bindings as Sway does
+    index = index_keybindings(features["Keybindings"], features["Blocks"], resolver)
+    features["Keybinding Index"] = index
+    features["Keybinding Conflicts"] = [_override_directive(old, new) for old, new in index.overrides]
 
     # Resolve variables in Design and Appearance
-    resolved_appearance = []
-    for item, file_path in features["Design and Appearance"]:
-        for var_name, (var_value, _) in features["Variables"].items():
-            if var_name in item:
-                item = item.replace(var_name, var_value)
-        resolved_appearance.append((item, file_path))
-    features["Design and Appearance"] = resolved_appearance
+    features["Design and Appearance"] = [
+        directive.with_text(resolver.resolve(directive.text)) for directive in features["Design and Appearance"]
+    ]
 
+    if PROFILER.enabled:
+        for category in _LINE_CATEGORIES:
+            if features[category]:
+                PROFILER.count(f"lines classified: {category}", len(features[category]))
 
     return features
 
-def _parse_sway_file(file_path, features, file_collector):
+def _override_directive(old, new):
+    """Describes a binding replaced by a later one, at the location of the replaced binding."""
+    how = "repeated" if old.command == new.command else "overridden"
+    return SwayDirective(f"{old.text} ({how} in mode {old.mode} by "
+                         f"{os.path.basename(new.file_path)}:{new.line_number}: {new.text})",
+                         old.file_id, old.line_number, old.offset)
+
+def _load_records(file_path, cache, prefetched=None):
+    """Returns the scan records of a file, or None (with a warning) if it cannot be read."""
+    try:
+        if prefetched is not None and file_path in prefetched:
+            result = prefetched.pop(file_path)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        if cache is not None:
+            return cache.get_records(file_path, _scan_sway_file)
+        return _scan_sway_file(file_path)
+    except FileNotFoundError:
+        print(f"Warning: Included file not found: {file_path}")
+    except OSError as e:
+        print(f"Warning: Could not read included file {file_path}: {e}")
+    return None
+
+def _expand_include(arg, including_file, variables, file_collector=None):
     """
-    Parses a single sway configuration file and adds features to the dictionary.
+    Expands the argument of a source/include line into the files it names.
+
+    Like Sway, the path may use variables, '~', environment variables and glob
+    patterns, and relative paths are taken from the including file's directory.
+    Glob patterns expand to the sorted list of matches (and are recorded in
+    file_collector, whose files they may gain); a plain path is returned even if
+    it does not exist so a warning can be reported.
     """
-    try:
-        with open(file_path, "r") as f:
-            in_bar_block = False
-            bar_block_lines = 0
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
+    if "$" in arg and variables:
+        arg = VariableResolver(variables).resolve(arg)
+    path = os.path.expandvars(os.path.expanduser(arg.strip().strip('"\'')))
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(including_file), path)
+    path = os.path.normpath(path)
+    if _GLOB_CHARS_RE.search(path):
+        if file_collector is not None:
+            file_collector.add_include_pattern(path)
+        return sorted(p for p in glob.glob(path) if os.path.isfile(p))
+    return [path]
+
+def _prefetch_source_graph(config_path, cache=None, jobs=4, use_processes=False):
+    """
+    Reads and scans the files of a source graph concurrently.
 
-                if line.startswith("source"): # Corrected from "include" to "source"
-                    parts = line.split(" ", 1)
-                    if len(parts) > 1:
-                        included_path = os.path.expanduser(parts[1])
-                        # Add relationship: current file sources the included file
-                        file_collector.add_sourced_relationship(file_path, included_path)
-                        _parse_sway_file(included_path, features, file_collector)
+    Files are submitted to the pool as soon as the include lines of the file that
+    names them have been scanned. Include arguments that use variables are expanded
+    with every variable scanned so far, which is only a best guess; the ordered walk
+    in _parse_source_graph stays authoritative and loads anything missed here.
+
+    Returns:
+        A dictionary mapping each path to its records, or to the exception raised
+        while reading it.
+    """
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    results = {}
+    known_variables = {}
+    submitted = set()
+    pending = {}
+
+    with executor_class(max_workers=jobs) as executor:
+        def submit(file_path):
+            file_realpath = os.path.realpath(file_path)
+            if file_realpath in submitted:
+                return
+            submitted.add(file_realpath)
+            if cache is not None:
+                try:
+                    key, records = cache.lookup(file_path)
+                except OSError as e:
+                    results[file_path] = e
+                    return
+                if records is not None:
+                    scanned(file_path, records)
+                    return
+            else:
+                key = None
+            pending[executor.submit(_scan_sway_file, file_path)] = (file_path, key)
+
+        def scanned(file_path, records):
+            results[file_path] = records
+            for category, line, arg, _line_number, _offset in records:
+                if category == "Variables":
+                    known_variables[line] = (arg, file_path)
+                elif category == "Source":
+                    for included_path in _expand_include(arg, file_path, known_variables):
+                        submit(included_path)
+
+        submit(config_path)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, key = pending.pop(future)
+                try:
+                    records = future.result()
+                except OSError as e:
+                    results[file_path] = e
                     continue
+                if cache is not None:
+                    cache.store(file_path, key, records)
+                scanned(file_path, records)
+    return results
 
-                if line.startswith("set"):
-                    parts = line.split()
-                    var_name = parts[1]
-                    var_value = " ".join(parts[2:])
-                    features["Variables"][var_name] = (var_value, file_path)
-                elif line.startswith("bindsym"):
-                    features["Keybindings"].append((line, file_path))
-                    # Check if an 'exec' command is part of the bindsym
-                    exec_match = re.search(r'exec\s+(.*)', line)
-                    if exec_match:
-                        full_command = exec_match.group(1).strip()
-                        # Resolve variables in the command
-                        resolved_command = full_command
-                        for var_name, (var_value, _) in features["Variables"].items():
-                            resolved_command = resolved_command.replace(var_name, var_value)
-                        
-                        # Attempt to find an executable script in the resolved command
-                        script_patterns = [
-                            r'((?:~|\/)[a-zA-Z0-9_\/\.-]+\.(?:sh|py|pl|rb|js|lua|fish|zsh|bash))', # Paths with common extensions
-                            r'((?:~|\/)[a-zA-Z0-9_\/\.-]+)', # General paths
-                        ]
-                        
-                        found_script = False
-                        for pattern in script_patterns:
-                            for match in re.finditer(pattern, resolved_command):
-                                potential_script_path = os.path.expanduser(match.group(1))
-                                if os.path.exists(potential_script_path) and \
-                                   os.path.isfile(potential_script_path) and \
-                                   os.access(potential_script_path, os.X_OK):
-                                    file_collector.add_script(potential_script_path)
-                                    found_script = True
-                                    break # Found an executable script, move to next line
-                            if found_script:
-                                break
-                elif "workspace" in line:
-                    features["Workspace Management"].append((line, file_path))
-                elif line.startswith("exec") or line.startswith("exec_always"):
-                    features["Application Autostart"].append((line, file_path))
-                    
-                    # Extract the command part after 'exec' or 'exec_always'
-                    command_start_index = line.find("exec")
-                    if command_start_index == -1: # Should not happen if line.startswith("exec_always")
-                        command_start_index = line.find("exec_always")
-                    
-                    full_command = line[command_start_index + len("exec_always") if line.startswith("exec_always") else command_start_index + len("exec"):].strip()
-
-                    # Resolve variables in the command
-                    resolved_command = full_command
-                    for var_name, (var_value, _) in features["Variables"].items():
-                        resolved_command = resolved_command.replace(var_name, var_value)
-                    
-                    
-                    # Attempt to find an executable script in the resolved command
-                    # This is a heuristic and might not catch all cases
-                    # Attempt to find an executable script in the resolved command
-                    # Look for paths starting with / or ~/ or ending with common script extensions
-                    script_patterns = [
-                        r'((?:~|\/)[a-zA-Z0-9_\/\.-]+\.(?:sh|py|pl|rb|js|lua|fish|zsh|bash))', # Paths with common extensions
-                        r'((?:~|\/)[a-zA-Z0-9_\/\.-]+)', # General paths
-                    ]
-                    
-                    found_script = False
-                    for pattern in script_patterns:
-                        for match in re.finditer(pattern, resolved_command):
-                            potential_script_path = os.path.expanduser(match.group(1))
-                            print(f"DEBUG: Checking script: {potential_script_path}")
-                            print(f"DEBUG:   exists: {os.path.exists(potential_script_path)}")
-                            print(f"DEBUG:   isfile: {os.path.isfile(potential_script_path)}")
-                            print(f"DEBUG:   is_executable: {os.access(potential_script_path, os.X_OK)}")
-                            if os.path.exists(potential_script_path) and \
-                               os.path.isfile(potential_script_path) and \
-                               os.access(potential_script_path, os.X_OK):
-                                file_collector.add_script(potential_script_path)
-                                found_script = True
-                                break # Found an executable script, move to next line
-                        if found_script:
-                            break
-                    
-                    if not found_script:
-                        # Fallback to previous logic if no specific script pattern matched
-                        command_parts = resolved_command.split()
-                        for part in command_parts:
-                            expanded_part = os.path.expanduser(part)
-                            if os.path.exists(expanded_part):
-                                if os.path.isfile(expanded_part) and os.access(expanded_part, os.X_OK):
-                                    file_collector.add_script(expanded_part)
-                                    break # Assume the first executable file found is the main script
-
-                elif line.startswith("gaps") or "background" in line or re.search(r'client\.', line):
-                    features["Design and Appearance"].append((line, file_path))
-                elif line.startswith("bar {"):
-                    in_bar_block = True
-                    bar_block_lines = 0
-                elif line == "}" and in_bar_block:
-                    in_bar_block = False
-                    features["Bar Configuration"] = (f"There is a bar section with {bar_block_lines} instruction statements.", file_path)
-                elif in_bar_block:
-                    bar_block_lines += 1
-                else:
-                    features["Other"].append((line, file_path))
-    except FileNotFoundError:
-        print(f"Warning: Included file not found: {file_path}")
\ No newline at end of file
+def _parse_source_graph(config_path, features, file_collector, cache=None, exec_commands=None, prefetched=None):
+    """
+    Walks the source/include graph rooted at config_path and adds features to the dictionary.
+
+    The walk is iterative and replays each file's records in the order Sway applies
+    them, descending into an included file at the point of its include line. Files
+    are deduplicated by realpath so each one is parsed exactly once, and an include
+    that points back to a file still being walked is reported as a cycle instead of
+    being followed.
+
+    Exec commands are appended to exec_commands as (command, fallback) pairs so
+    scripts can be looked up once all variables are known. Records already read
+    by _prefetch_source_graph can be passed in as prefetched.
+    """
+    records = _load_records(config_path, cache, prefetched)
+    if records is None:
+        return
+
+    root_realpath = os.path.realpath(config_path)
+    visited = {root_realpath}
+    # Each frame is (file path, file id, iterator over its remaining records)
+    stack = [(config_path, FILES.intern(config_path), iter(records))]
+    walking = [root_realpath]
+
+    while stack:
+        file_path, file_id, items = stack[-1]
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+            walking.pop()
+            continue
+
+        category, line, arg, line_number, offset = item
+        if category == "Source":
+            includes = [("Include", line, path, line_number, offset)
+                        for path in _expand_include(arg, file_path, features["Variables"], file_collector)]
+            stack[-1] = (file_path, file_id, itertools.chain(includes, items))
+        elif category == "Include":
+            # Add relationship: current file sources the included file
+            file_collector.add_sourced_relationship(file_path, arg)
+            included_realpath = os.path.realpath(arg)
+            if included_realpath in walking:
+                cycle = walking[walking.index(included_realpath):] + [included_realpath]
+                file_collector.add_source_cycle(cycle)
+                print(f"Warning: Source cycle detected: {' -> '.join(cycle)}")
+                continue
+            if included_realpath in visited:
+                continue # Already parsed once, as Sway does
+            visited.add(included_realpath)
+            included_records = _load_records(arg, cache, prefetched)
+            if included_records is not None:
+                stack.append((arg, FILES.intern(arg), iter(included_records)))
+                walking.append(included_realpath)
+        elif category == "Variables":
+            features["Variables"][line] = (arg, file_path)
+        elif category == "Block":
+            features["Blocks"].add(_build_block(arg, file_id))
+        else:
+            features[category].append(SwayDirective(line, file_id, line_number, offset))
+            if arg is not None and exec_commands is not None:
+                exec_commands.append((arg, category == "Application Autostart"))
+
+def _build_block(tree, file_id):
+    """Turns the block tree of a "Block" record into SwayBlock and SwayDirective records."""
+    kind, args, line_number, offset, children = tree
+    return SwayBlock(kind, tuple(args), [
+        _build_block(child, file_id) if len(child) == 5 else SwayDirective(child[0], file_id, child[1], child[2])
+        for child in children
+    ], file_id, line_number, offset)
+
+def _logical_lines(f):
+    """
+    Yields the (line, line_number, offset) of each non-blank line of a binary file,
+    stripped and decoded, with backslash continuations joined onto their first line.
+    A '{' on a line of its own is joined onto the line before, the header of its block.
+    """
+    pending = None
+    held = None # The last logical line, yielded once the next one is known not to be '{'
+    line_number = 0
+    line_offset = 0
+    for raw_line in f:
+        line_number += 1
+        offset = line_offset + len(raw_line) - len(raw_line.lstrip())
+        line_offset += len(raw_line)
+        line = raw_line.decode().strip()
+        if pending is not None:
+            text, first_line, first_offset = pending
+            line = f"{text} {line}" if line else text
+        elif not line or line[0] == "#":
+            continue
+        else:
+            first_line, first_offset = line_number, offset
+        if line.endswith("\\"):
+            pending = (line[:-1].rstrip(), first_line, first_offset)
+            continue
+        pending = None
+        if held is not None:
+            if line == "{" and held[0][-1] != "{":
+                line, first_line, first_offset = f"{held[0]} {{", held[1], held[2]
+            else:
+                yield held
+        held = line, first_line, first_offset
+    if pending is not None:
+        if held is not None:
+            yield held
+        held = pending
+    if held is not None:
+        yield held
+
+def _block_header(line):
+    """Splits the header of a block ('mode "resize" {') into its kind and unquoted arguments."""
+    words = line[:-1].split()
+    if not words:
+        # A '{' with no header to join, at the start of a file or after another '{'
+        return "", []
+    return words[0], [word.strip('"\'') for word in words[1:]]
+
+def _scan_sway_file(file_path):
+    """Reads and classifies one sway configuration file (see _scan_sway_stream)."""
+    with open(file_path, "rb") as f:
+        records = _scan_sway_stream(f)
+        PROFILER.count("files read")
+        PROFILER.count("bytes read", f.tell())
+    return records
+
+def scan_sway_text(text):
+    """
+    Classifies the lines of a sway configuration given as text, such as the config
+    the running compositor returns over IPC.
+
+    Returns:
+        The records of _scan_sway_stream, for the `preloaded` argument of parse_sway_config.
+    """
+    return _scan_sway_stream(io.BytesIO(text.encode()))
+
+def _scan_sway_stream(f):
+    """
+    Classifies the lines of a single sway configuration file, read from a binary stream.
+
+    The result only depends on the file contents, so it can be cached per file.
+
+    The file is streamed once. Open `{ }` blocks are kept on a stack, so blocks
+    nest to any depth, and lines ending with a backslash are joined with the next
+    line. Each top-level block is emitted as a "Block" record, and each `bar` block
+    also emits a "Bar Configuration" summary of the statements only the bar uses.
+
+    Returns:
+        A list of (category, line, arg, line_number, offset) records in file order.
+        "Source" records carry the included path, "Variables" records carry the
+        variable name and value, and exec-bearing records carry the command to search
+        for scripts. "Block" records carry the block tree [kind, args, line_number,
+        offset, children], where a child is a nested tree or a [line, line_number,
+        offset] statement. line_number is 1-based and offset is the byte offset of
+        the directive's first character.
+    """
+    records = []
+    append = records.append
+    match_keyword = _KEYWORD_RE.match
+    blocks = [] # Trees of the open blocks, outermost first
+    bar_block = None # The open bar block, whose unclassified statements it consumes
+    bar_block_lines = 0
+    keyword_matches = 0
+    for line, line_number, offset in _logical_lines(f):
+        if line[0] == "}":
+            if not blocks:
+                append(("Other", line, None, line_number, offset))
+                continue
+            block = blocks.pop()
+            if blocks:
+                blocks[-1][4].append(block)
+            else:
+                append(("Block", line, block, block[2], block[3]))
+            if block is bar_block:
+                bar_block = None
+                name = f" '{' '.join(block[1])}'" if block[1] else ""
+                append(("Bar Configuration",
+                        f"There is a bar section{name} with {bar_block_lines} instruction statements.", None,
+                        block[2], block[3]))
+            continue
+
+        opens_block = line[-1] == "{"
+        if opens_block:
+            kind, args = _block_header(line)
+            block = [kind, args, line_number, offset, []]
+            if kind == "bar" and bar_block is None:
+                blocks.append(block)
+                bar_block = block
+                bar_block_lines = 0
+                continue
+        elif blocks:
+            blocks[-1][4].append([line, line_number, offset])
+
+        # The leading keyword is matched once and routes the line; the substring
+        # checks below keep the precedence of the original if/elif chain.
+        keyword_match = match_keyword(line)
+        keyword_matches += 1
+        keyword = keyword_match.group() if keyword_match else None
+
+        if keyword == "source" or keyword == "include":
+            parts = line.split(" ", 1)
+            if len(parts) > 1:
+                append(("Source", line, parts[1], line_number, offset))
+        elif keyword == "set":
+            parts = line.split()
+            append(("Variables", parts[1], " ".join(parts[2:]), line_number, offset))
+        elif keyword == "bindsym":
+            # Check if an 'exec' command is part of the bindsym
+            exec_match = _BINDSYM_EXEC_RE.search(line)
+            append(("Keybindings", line, exec_match.group(1).strip() if exec_match else None, line_number, offset))
+        elif "workspace" in line:
+            append(("Workspace Management", line, None, line_number, offset))
+        elif keyword == "exec" or keyword == "exec_always":
+            # The command is whatever follows 'exec' or 'exec_always'
+            append(("Application Autostart", line, line[keyword_match.end():].strip(), line_number, offset))
+        elif keyword == "gaps" or _DESIGN_RE.search(line):
+            append(("Design and Appearance", line, None, line_number, offset))
+        elif bar_block is not None:
+            bar_block_lines += 1
+        else:
+            append(("Other", line, None, line_number, offset))
+        if opens_block:
+            blocks.append(block)
+
+    # Blocks left open at the end of the file are closed there
+    while blocks:
+        block = blocks.pop()
+        if blocks:
+            blocks[-1][4].append(block)
+        else:
+            append(("Block", None, block, block[2], block[3]))
+    PROFILER.count("regex evaluations", keyword_matches)
+    return records
+
+def _find_exec_script(full_command, resolver, file_collector, probe, fallback=False):
+    """
+    Registers the first executable script referenced by an exec command.
+
+    Args:
+        full_command: The command following 'exec' or 'exec_always'.
+        resolver: A VariableResolver for the parsed variables.
+        file_collector: A FileCollector instance.
+        probe: A FileProbe answering the filesystem checks.
+        fallback: Whether to fall back to checking the path-like words of the
+            arguments as well as the program name.
+    """
+    # Resolve variables in the command
+    resolved_command = resolver.resolve(full_command)
+
+    # Attempt to find an executable script in the resolved command
+    # This is a heuristic and might not catch all cases
+    for pattern in _SCRIPT_PATTERNS:
+        for match in pattern.finditer(resolved_command):
+            potential_script_path = os.path.expanduser(match.group(1))
+            if probe.is_executable_file(potential_script_path):
+                file_collector.add_script(potential_script_path)
+                return # Found an executable script, move to next line
+
+    # Fall back to the words of the command; only the program name, the first word
+    # after exec's flags (--no-startup-id), is looked up on $PATH when it is bare
+    command_parts = [part for part in resolved_command.split() if not part.startswith("-")]
+    if not fallback:
+        command_parts = command_parts[:1]
+    for index, part in enumerate(command_parts):
+        if "/" in part or part.startswith("~"):
+            expanded_part = os.path.expanduser(part)
+            executable = expanded_part if probe.is_executable_file(expanded_part) else None
+        elif index == 0:
+            executable = probe.which(part)
+        else:
+            continue
+        if executable:
+            file_collector.add_script(executable)
+            return # Assume the first executable file found is the main script
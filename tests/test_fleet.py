@@ -0,0 +1,7 @@
+from fleet import analyze_root
+
+
+def test_missing_root_is_an_error_entry(tmp_path):
+    summary, bindings = analyze_root(str(tmp_path / "missing"))
+    assert summary == {"root": str(tmp_path / "missing"), "error": "Not a directory"}
+    assert bindings == []
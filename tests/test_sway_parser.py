@@ -0,0 +1,52 @@
+from sway_parser import scan_sway_text
+
+
+def _blocks(text):
+    return [record[2] for record in scan_sway_text(text) if record[0] == "Block"]
+
+
+def test_brace_on_its_own_line_opens_the_block_of_the_line_before():
+    assert _blocks("bar\n{\n    position top\n}\n") == [["bar", [], 1, 0, [["position top", 3, 10]]]]
+    assert _blocks('mode "resize"\n# comment\n{\n    bindsym h resize shrink width 10px\n}\n')[0][:3] == \
+        ["mode", ["resize"], 1]
+
+
+def test_brace_without_a_header_does_not_abort_the_parse():
+    assert _blocks("{\n}\n") == [["", [], 1, 0, []]]
+
+
+def test_profiler_counts_only_the_line_categories(tmp_path, monkeypatch):
+    import sway_parser
+    from file_collector import FileCollector
+    from profiling import Profiler
+
+    config = tmp_path / "config"
+    config.write_text("set $mod Mod4\nbindsym $mod+Return exec foot\nbindsym $mod+Return exec kitty\nbar {\n}\n")
+    profiler = Profiler()
+    monkeypatch.setattr(sway_parser, "PROFILER", profiler)
+    profiler.start()
+    with profiler.phase("sway"):
+        sway_parser.parse_sway_config(str(config), FileCollector())
+    profiler.stop()
+    counters = profiler.phases["sway"].counters
+    assert counters["lines classified: Keybindings"] == 2
+    assert counters["lines classified: Variables"] == 1
+    for category in ("Blocks", "Keybinding Index", "Keybinding Conflicts"):
+        assert f"lines classified: {category}" not in counters
+
+
+def test_only_the_program_of_an_exec_is_looked_up_on_path(tmp_path):
+    from file_collector import FileCollector
+    from fs_probe import FileProbe
+    from sway_parser import parse_sway_config
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name in ("firefox", "foot"):
+        (bin_dir / name).write_text("#!/bin/sh\n")
+        (bin_dir / name).chmod(0o755)
+    config = tmp_path / "config"
+    config.write_text("exec foo firefox\nexec_always --no-startup-id foot --server\n")
+    collector = FileCollector()
+    parse_sway_config(str(config), collector, probe=FileProbe(path_env=str(bin_dir)))
+    assert collector.files_of_type("script") == [str(bin_dir / "foot")]
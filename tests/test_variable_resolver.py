@@ -0,0 +1,24 @@
+import itertools
+
+from variable_resolver import VariableResolver
+
+
+def _variables(**definitions):
+    return {"$" + name: (value, "config") for name, value in definitions.items()}
+
+
+def test_variable_referring_to_a_cycle_resolves_the_same_in_any_order():
+    definitions = _variables(a="$b", b="$a", c="$a x", d="$c y", e="plain $f", f="1")
+    tables = []
+    for order in itertools.permutations(definitions):
+        resolver = VariableResolver({name: definitions[name] for name in order})
+        tables.append(resolver.table)
+        assert resolver.cycles
+    assert all(table == tables[0] for table in tables)
+    assert tables[0] == {"$a": "$b", "$b": "$a", "$c": "$a x", "$d": "$c y", "$e": "plain 1", "$f": "1"}
+
+
+def test_self_reference_is_a_cycle():
+    resolver = VariableResolver(_variables(a="$a", b="$a"))
+    assert resolver.cycles == [["$a", "$a"]]
+    assert resolver.lookup("$b") == "$a"
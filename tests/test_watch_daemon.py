@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+from watch_daemon import InotifyWatcher, PollWatcher, ReportDaemon
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """A home directory whose Sway config includes config.d/*."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / ".config"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / ".cache"))
+    monkeypatch.chdir(tmp_path)
+    sway = tmp_path / ".config" / "sway"
+    (sway / "config.d").mkdir(parents=True)
+    (sway / "config").write_text("include config.d/*\n")
+    (sway / "config.d" / "10-gaps").write_text("gaps inner 4\n")
+    return sway
+
+
+@pytest.mark.parametrize("make_watcher", [InotifyWatcher, PollWatcher])
+def test_new_file_in_an_included_directory_triggers_a_rebuild(home, make_watcher):
+    daemon = ReportDaemon()
+    daemon.rebuild()
+    assert "inner 4" in daemon.report_text and "inner 8" not in daemon.report_text
+    watcher = make_watcher()
+    try:
+        watcher.watch(daemon.watched_paths(), daemon.watched_patterns())
+        new_file = home / "config.d" / "20-gaps"
+        new_file.write_text("gaps inner 8\n")
+        time.sleep(0.05)
+        changed = watcher.read_changes()
+        assert str(new_file) in changed
+        daemon.rebuild(changed)
+        assert "inner 8" in daemon.report_text
+    finally:
+        watcher.close()
@@ -0,0 +1,95 @@
+import re
+
+# A Sway variable reference: '$' followed by the longest run of name characters.
+_VARIABLE_RE = re.compile(r'\$[a-zA-Z0-9_]+')
+
+
+class VariableResolver:
+    """
+    Resolves Sway '$name' references against a flattened variable table.
+
+    Nested definitions (set $a $b) are resolved once up front, so each lookup or
+    substitution is a single pass over the text. Variables that take part in a
+    definition cycle, or refer to one directly or through other variables, are
+    left as written; the cycles are recorded in `cycles`.
+    """
+
+    def __init__(self, variables):
+        """
+        Args:
+            variables: A dictionary mapping '$name' to (value, file_path), as
+                found in the "Variables" feature of parse_sway_config.
+        """
+        self.variables = variables
+        self._raw = {name: value for name, (value, _) in variables.items()}
+        self.table = {}
+        self.cycles = []
+        self._unresolved = set()
+        for name in self._raw:
+            self._flatten(name, [])
+
+    @classmethod
+    def of(cls, sway_variables):
+        """Returns sway_variables itself if it is already a resolver, otherwise wraps it."""
+        if isinstance(sway_variables, cls):
+            return sway_variables
+        return cls(sway_variables or {})
+
+    def _flatten(self, name, stack):
+        # Whichever variable is flattened first, one that reaches a cycle is never
+        # taken for resolved when another definition refers to it later
+        if name in self._unresolved:
+            return None
+        if name in self.table:
+            return self.table[name]
+        if name in stack:
+            cycle = stack[stack.index(name):] + [name]
+            self.cycles.append(cycle)
+            return None
+
+        stack.append(name)
+        unresolved = False
+
+        def replace(match):
+            nonlocal unresolved
+            ref = match.group()
+            if ref not in self._raw:
+                return ref
+            value = self._flatten(ref, stack)
+            if value is None:
+                unresolved = True
+                return ref
+            return value
+
+        value = _VARIABLE_RE.sub(replace, self._raw[name])
+        stack.pop()
+        if unresolved:
+            # Part of or refers to a cycle: keep the definition as written.
+            self.table[name] = self._raw[name]
+            self._unresolved.add(name)
+            return None
+        self.table[name] = value
+        return value
+
+    def lookup(self, name):
+        """Returns the fully resolved value of '$name', or None if it is not defined."""
+        return self.table.get(name)
+
+    def _replace(self, match):
+        token = match.group()
+        value = self.table.get(token)
+        if value is not None:
+            return value
+        # Like Sway, fall back to the longest defined variable that prefixes the token;
+        # the token's own prefixes are tried, so the cost does not grow with the table.
+        for end in range(len(token) - 1, 1, -1):
+            value = self.table.get(token[:end])
+            if value is not None:
+                return value + token[end:]
+        return token
+
+    def resolve(self, text):
+        """Substitutes every variable reference in text in a single pass."""
+        if "$" not in text:
+            return text
+        return _VARIABLE_RE.sub(self._replace, text)
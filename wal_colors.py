@@ -0,0 +1,107 @@
+import json
+import os
+from profiling import PROFILER
+
+# Loaded palettes by path, validated against (mtime_ns, size) of the file
+_CACHE = {}
+
+
+def default_wal_dir():
+    """Returns the directory pywal writes its generated files to."""
+    return os.path.expanduser("~/.cache/wal")
+
+
+class WalColors:
+    """
+    The pywal palette: color0..color15 plus background, foreground and cursor.
+
+    `colors` maps the names used in the generated files ("color4", "background")
+    to hex codes; `source` is the file they were read from.
+    """
+
+    __slots__ = ("colors", "wallpaper", "source")
+
+    def __init__(self, colors, wallpaper, source):
+        self.colors = colors
+        self.wallpaper = wallpaper
+        self.source = source
+
+    def sway_variables(self):
+        """Returns the palette as Sway variables ({'$color4': (hex, source)})."""
+        return {"$" + name: (value, self.source) for name, value in self.colors.items()}
+
+    def merge_sway_variables(self, variables):
+        """
+        Returns the Sway variables ({name: (value, file_path)}) with the palette taken from
+        colors.json, the source of truth for it; only variables the user set outside the
+        pywal generated files are kept as given.
+        """
+        merged = dict(variables)
+        for name, definition in self.sway_variables().items():
+            parsed = merged.get(name)
+            if parsed is None or self.is_generated(parsed[1]):
+                merged[name] = definition
+        return merged
+
+    def is_generated(self, file_path):
+        """Returns True if file_path is one of the files pywal generated next to the source."""
+        return os.path.dirname(os.path.realpath(file_path)) == os.path.dirname(os.path.realpath(self.source))
+
+    def define_colors(self):
+        """Returns the palette as @define-color definitions ({'color4': (hex, source)})."""
+        return {name: (value, self.source) for name, value in self.colors.items()}
+
+
+def _read_colors_json(path):
+    with open(path, "r") as f:
+        text = f.read()
+    PROFILER.count("files read")
+    PROFILER.count("bytes read", len(text))
+    data = json.loads(text)
+    colors = {}
+    special = data.get("special", {})
+    for name in ("background", "foreground", "cursor"):
+        if isinstance(special.get(name), str):
+            colors[name] = special[name]
+    for name, value in data.get("colors", {}).items():
+        if isinstance(value, str):
+            colors[name] = value
+    if not colors:
+        raise ValueError("no colors")
+    return WalColors(colors, data.get("wallpaper"), path)
+
+
+def _load_cached(path, reader):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
+        wal_colors = reader(path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read pywal colors from {path}: {e}")
+        wal_colors = None
+    _CACHE[path] = (key, wal_colors)
+    return wal_colors
+
+
+def load_wal_colors(wal_dir=None):
+    """
+    Loads the pywal palette from colors.json.
+
+    The file is parsed once and then served from memory until its mtime or size
+    changes, so repeated calls (one per parser, or one per daemon rebuild) cost a stat.
+    When it is missing, callers fall back to the generated text files (colors-sway,
+    colors-waybar.css) through their own parsers.
+
+    Args:
+        wal_dir: The pywal cache directory; defaults to ~/.cache/wal.
+
+    Returns:
+        A WalColors, or None if colors.json is missing or unreadable.
+    """
+    return _load_cached(os.path.join(wal_dir or default_wal_dir(), "colors.json"), _read_colors_json)
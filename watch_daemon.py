@@ -0,0 +1,399 @@
+import contextlib
+import ctypes
+import ctypes.util
+import glob
+import io
+import os
+import selectors
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+from app_registry import APP_PARSERS, AppRun, all_sections, app_report_sections, run_apps
+from file_collector import FileCollector
+from parse_cache import ParseCache
+from variable_resolver import VariableResolver
+from reporter import generate_report
+from waybar_style_parser import record_style_sources
+from wal_colors import load_wal_colors
+from pipeline import collect_waybar_styles, collect_waybar_modules
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Editors usually write a file in several steps; wait this long for the burst to settle.
+DEBOUNCE_SECONDS = 0.05
+
+
+def default_socket_path():
+    """Returns the default Unix socket path of the report daemon."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"feature_ricing-{os.getuid()}.sock")
+
+
+def _pattern_directory(pattern):
+    """Returns the deepest directory of a glob pattern that has no glob characters in its path."""
+    parts = pattern.split(os.sep)
+    for i, part in enumerate(parts):
+        if glob.has_magic(part):
+            return os.sep.join(parts[:i]) or os.sep
+    return os.path.dirname(pattern)
+
+
+def _file_identity(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size, st.st_mode)
+
+
+class InotifyWatcher:
+    """
+    Watches the parent directories of a set of files with inotify.
+
+    The directories of include glob patterns are watched as well: a file created
+    in (or moved into) one of them counts as a change if it matches the pattern.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}  # watch descriptor -> directory
+        self._paths = set()
+        self._patterns = {}  # directory -> include glob patterns under it
+
+    def watch(self, paths, patterns=()):
+        """Replaces the watched file set and include patterns, adding directory watches as needed."""
+        self._paths = set(paths)
+        self._patterns = {}
+        for pattern in patterns:
+            self._patterns.setdefault(_pattern_directory(pattern), []).append(pattern)
+        watched_dirs = set(self._dirs.values())
+        for directory in {os.path.dirname(p) for p in self._paths} | set(self._patterns):
+            if directory in watched_dirs or not os.path.isdir(directory):
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = directory
+
+    def read_changes(self):
+        """Drains pending events and returns the watched paths they touched."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                directory = self._dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if path in self._paths:
+                    changed.add(path)
+                elif mask & (IN_CREATE | IN_MOVED_TO) and directory in self._patterns:
+                    # Deleted or renamed matches are known paths, reported above
+                    if any(path in glob.glob(pattern) for pattern in self._patterns[directory]):
+                        changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollWatcher:
+    """Fallback watcher that compares file identities on every poll."""
+
+    fd = None
+
+    def __init__(self):
+        self._identities = {}
+        self._matches = {}  # include glob pattern -> paths it matched
+
+    def watch(self, paths, patterns=()):
+        self._identities = {path: self._identities.get(path, _file_identity(path)) for path in paths}
+        self._matches = {pattern: self._matches[pattern] if pattern in self._matches else set(glob.glob(pattern))
+                         for pattern in patterns}
+
+    def read_changes(self):
+        changed = set()
+        for path, identity in self._identities.items():
+            current = _file_identity(path)
+            if current != identity:
+                self._identities[path] = current
+                changed.add(path)
+        for pattern, matches in self._matches.items():
+            current = set(glob.glob(pattern))
+            if current != matches:
+                self._matches[pattern] = current
+                changed |= current ^ matches
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher():
+    """Returns an inotify watcher where available, otherwise a polling watcher."""
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError):
+        return PollWatcher()
+
+
+class ReportDaemon:
+    """
+    Keeps the parsed configuration in memory and rebuilds only what a change affects.
+
+    Sway files are re-scanned through an in-memory ParseCache (saved to disk only
+    with persist), so only the changed file is tokenized again and the rest of the source graph is replayed from its
+    records. The Waybar phases are re-run only when their own files or their
+    inputs (Sway variables, style colors) changed. Sway and the other registered
+    applications are run through app_registry.run_apps, in the order of a
+    report, so every file they read is watched.
+    """
+
+    def __init__(self, use_hash=False, persist=False):
+        self.parse_cache = ParseCache(use_hash=use_hash)
+        self.persist = persist
+        if persist:
+            self.parse_cache.load()
+        self.report_text = ""
+        self.rebuilds = 0
+        self.last_rebuild_seconds = 0.0
+        self._style_inputs = set()
+        self._waybar_config_paths = []
+        self._sway_variables = None
+        self._style_colors = None
+        self._style_output = ""
+        self._modules = None
+        self._modules_output = ""
+        self.file_collector = None
+
+    def watched_paths(self):
+        """The files the report was built from, and the config locations that may still be created."""
+        if not self.file_collector:
+            return set()
+        return set(self.file_collector.files) | set(self.file_collector.discovery.candidate_paths())
+
+    def watched_patterns(self):
+        """The glob patterns of includes, whose new matches the report would gain."""
+        return set(self.file_collector.include_patterns) if self.file_collector else set()
+
+    def rebuild(self, changed=None):
+        """
+        Rebuilds the report.
+
+        Args:
+            changed: The set of paths that changed, or None to rebuild everything.
+        """
+        start = time.perf_counter()
+        full = changed is None
+        changed = changed or set()
+        file_collector = FileCollector()
+        sections = all_sections()
+        run = AppRun(file_collector, list(APP_PARSERS), sections, parse_cache=self.parse_cache)
+
+        sway_output = io.StringIO()
+        with contextlib.redirect_stdout(sway_output):
+            sway_features, sway_variables = run_apps(run, ["sway"])["sway"]
+        if self.persist:
+            self.parse_cache.save()
+        sway_resolver = VariableResolver(sway_variables)
+
+        waybar_config_paths = file_collector.find_waybar_configs()
+        waybar_style_paths = file_collector.find_waybar_styles()
+        colors_waybar_path = file_collector.find_colors_waybar_css()
+        style_inputs = set(waybar_style_paths)
+        if colors_waybar_path:
+            style_inputs.add(colors_waybar_path)
+        wal_colors = load_wal_colors()
+        if wal_colors is not None:
+            style_inputs.add(wal_colors.source)
+
+        style_dirty = (full or self._style_colors is None or
+                       sway_variables != self._sway_variables or
+                       style_inputs != self._style_inputs or bool(changed & style_inputs))
+        if style_dirty:
+            style_output = io.StringIO()
+            with contextlib.redirect_stdout(style_output):
+                style_colors = collect_waybar_styles(file_collector, sway_resolver)
+            style_dirty = style_colors != self._style_colors
+            self._style_colors = style_colors
+            self._style_output = style_output.getvalue()
+        else:
+            for style_path in waybar_style_paths:
+                record_style_sources(style_path, colors_waybar_path, file_collector)
+
+        modules_dirty = (full or style_dirty or self._modules is None or
+                         sway_variables != self._sway_variables or
+                         waybar_config_paths != self._waybar_config_paths or
+                         bool(changed & set(waybar_config_paths)))
+        if modules_dirty:
+            modules_output = io.StringIO()
+            with contextlib.redirect_stdout(modules_output):
+                self._modules = collect_waybar_modules(waybar_config_paths, sway_resolver, self._style_colors)
+            self._modules_output = modules_output.getvalue()
+
+        # The other applications are cheap to parse and are re-run on every change
+        apps_output = io.StringIO()
+        with contextlib.redirect_stdout(apps_output):
+            app_results = run_apps(run, [name for name in APP_PARSERS if name not in ("sway", "waybar")])
+
+        report_output = io.StringIO()
+        with contextlib.redirect_stdout(report_output):
+            generate_report(sway_features, self._modules, file_collector,
+                            app_sections=app_report_sections(app_results, sections))
+
+        self.report_text = (sway_output.getvalue() + self._style_output + self._modules_output +
+                            apps_output.getvalue() + report_output.getvalue())
+        self.file_collector = file_collector
+        self._style_inputs = style_inputs
+        self._waybar_config_paths = waybar_config_paths
+        self._sway_variables = sway_variables
+        self.rebuilds += 1
+        self.last_rebuild_seconds = time.perf_counter() - start
+
+    def stats(self):
+        return (f"rebuilds: {self.rebuilds}, last rebuild: {self.last_rebuild_seconds * 1000:.1f} ms, "
+                f"watched files: {len(self.watched_paths())}, {self.parse_cache.stats()}\n")
+
+
+def _handle_client(conn, daemon):
+    """Answers a single request. Returns False when the daemon should stop."""
+    conn.settimeout(1.0)
+    try:
+        request = b""
+        while not request.endswith(b"\n"):
+            chunk = conn.recv(1024)
+            if not chunk:
+                break
+            request += chunk
+        command = request.decode().strip() or "report"
+        if command == "report":
+            conn.sendall(daemon.report_text.encode())
+        elif command == "stats":
+            conn.sendall(daemon.stats().encode())
+        elif command == "reload":
+            daemon.rebuild()
+            conn.sendall(daemon.stats().encode())
+        elif command == "stop":
+            conn.sendall(b"stopping\n")
+            return False
+        else:
+            conn.sendall(f"Error: unknown command '{command}'\n".encode())
+    except OSError:
+        pass
+    finally:
+        conn.close()
+    return True
+
+
+def serve(socket_path=None, poll_interval=1.0, use_hash=False, persist=False):
+    """
+    Runs the report daemon until it receives a 'stop' request or is interrupted.
+
+    Args:
+        socket_path: The Unix socket to listen on.
+        poll_interval: Seconds between file checks when inotify is unavailable.
+        use_hash: Whether the parse cache validates files by content hash.
+        persist: Whether the parse cache is loaded from and saved to disk.
+    """
+    socket_path = socket_path or default_socket_path()
+    daemon = ReportDaemon(use_hash=use_hash, persist=persist)
+    daemon.rebuild()
+
+    watcher = make_watcher()
+    watcher.watch(daemon.watched_paths(), daemon.watched_patterns())
+
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    server.setblocking(False)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, "client")
+    if watcher.fd is not None:
+        selector.register(watcher.fd, selectors.EVENT_READ, "watch")
+    timeout = None if watcher.fd is not None else poll_interval
+
+    kind = "inotify" if watcher.fd is not None else f"polling every {poll_interval}s"
+    print(f"Serving reports on {socket_path} ({kind}, {len(daemon.watched_paths())} files watched)",
+          file=sys.stderr)
+    running = True
+    try:
+        while running:
+            events = selector.select(timeout)
+            if not events or any(key.data == "watch" for key, _ in events):
+                if watcher.fd is not None:
+                    time.sleep(DEBOUNCE_SECONDS)
+                changed = watcher.read_changes()
+                if changed:
+                    daemon.rebuild(changed)
+                    watcher.watch(daemon.watched_paths(), daemon.watched_patterns())
+            for key, _ in events:
+                if key.data == "client":
+                    try:
+                        conn, _ = server.accept()
+                    except BlockingIOError:
+                        continue
+                    running = _handle_client(conn, daemon) and running
+    except KeyboardInterrupt:
+        pass
+    finally:
+        selector.close()
+        server.close()
+        watcher.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(socket_path)
+
+
+def query_report(socket_path=None, command="report"):
+    """
+    Prints the response of a running daemon.
+
+    Returns:
+        A process exit code.
+    """
+    socket_path = socket_path or default_socket_path()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall(command.encode() + b"\n")
+            chunks = []
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError as e:
+        print(f"Error: Could not reach the report daemon at {socket_path}: {e}", file=sys.stderr)
+        return 1
+    sys.stdout.write(b"".join(chunks).decode())
+    sys.stdout.flush()
+    return 0
@@ -1,17 +1,54 @@
 import json
 import re
+from jsonc import strip_jsonc
+from profiling import PROFILER
+from records import FILES, ColorRef, WaybarModule
+from variable_resolver import VariableResolver
+from waybar_style_parser import module_style_key
 
-def parse_waybar_config(config_path, sway_variables, waybar_style_colors):
+MODULE_POSITIONS = ("modules-left", "modules-center", "modules-right")
+
+# A JSON string literal, and whether it is used as an object key
+_STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"(\s*:)?')
+
+def load_waybar_config(config_path, text=None):
+    """
+    Reads and tokenizes a Waybar configuration file; nothing here needs the Sway variables.
+
+    Args:
+        config_path: The path to the Waybar configuration file.
+        text: The file contents, if already read.
+
+    Returns:
+        A tuple of (parsed document, source locator), or None (with an error) if the
+        document is not valid JSONC.
+    """
+    if text is None:
+        with open(config_path, "r") as f:
+            text = f.read()
+        PROFILER.count("files read")
+        PROFILER.count("bytes read", len(text))
+    try:
+        # Stripped once for both the parse and the source locator
+        stripped = strip_jsonc(text)
+        config = json.loads(stripped)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing Waybar config: {e}")
+        return None
+    return config, _SourceLocator(config_path, text, stripped)
+
+def parse_waybar_config(config_path, sway_variables, waybar_style_colors, loaded=None):
     """
     Parses the Waybar configuration file and extracts features.
 
     Args:
         config_path: The path to the Waybar configuration file.
-        sway_variables: A dictionary of variables from the Sway config.
+        sway_variables: A VariableResolver (or variables dictionary) from the Sway config.
         waybar_style_colors: A dictionary of colors extracted from waybar_style.css.
+        loaded: The result of load_waybar_config for the file, if it was loaded ahead.
 
     Returns:
-        A dictionary of categorized modules.
+        A dictionary mapping each bar position to a list of WaybarModule records.
     """
     modules = {
         "modules-left": [],
@@ -21,84 +58,152 @@ def parse_waybar_config(config_path, sway_variables, waybar_style_colors):
     if not config_path:
         return modules
 
-    processed_modules = []
-    with open(config_path, "r") as f:
-        # Simple JSONC parser: remove comments and trailing commas
-        lines = f.readlines()
-        json_content = "".join(lines)
-        json_content = re.sub(r'//.*', '', json_content)
-        json_content = re.sub(r'/\*.*?\*/', '', json_content, flags=re.DOTALL)
-        json_content = re.sub(r',\s*([\}\]])', r'\1', json_content)
-
-        try:
-            config = json.loads(json_content)
-            
-            # Collect all potential module configuration keys
-            module_config_keys = {k for k in config.keys() if k not in ["modules-left", "modules-center", "modules-right"]}
-
-            for position in ["modules-left", "modules-center", "modules-right"]:
-                if position in config:
-                    for module_name in config[position]:
-                        # Check if the module (or its non-asterisk version) has already been processed
-                        if module_name in processed_modules:
-                            continue
-                        if "*" in module_name and module_name.replace("*", "") in processed_modules:
-                            continue
-                        
-                        display_name = module_name
-                        
-                        # Check for custom configuration in config.jsonc
-                        has_custom_config_in_jsonc = False
-                        module_config = None
-                        
-                        # Try exact match
-                        if module_name in module_config_keys and isinstance(config[module_name], dict):
-                            has_custom_config_in_jsonc = True
-                            module_config = config[module_name]
-                        else:
-                            # Try matching with instance identifiers (e.g., "cpu" matches "cpu#0")
-                            for key in module_config_keys:
-                                if key.startswith(module_name + "#") and isinstance(config[key], dict):
-                                    has_custom_config_in_jsonc = True
-                                    module_config = config[key]
-                                    break
-                        
-                        colors_info = []
-                        if has_custom_config_in_jsonc:
-                            display_name += "*"
-                            for color_type in ["foreground", "background"]:
-                                if color_type in module_config:
-                                    color_value = module_config[color_type]
-                                    if color_value.startswith("$"):
-                                        if color_value in sway_variables:
-                                            hex_color, _ = sway_variables[color_value]
-                                            colors_info.append(f"{color_type[0].upper()}:{hex_color}")
-                                    else:
-                                        colors_info.append(f"{color_type[0].upper()}:{color_value}")
-                        
-                        # Check for custom configuration in style.css
-                        if module_name in waybar_style_colors:
-                            style_colors = waybar_style_colors[module_name]
-                            if "foreground" in style_colors and style_colors["foreground"]:
-                                colors_info.append(f"F:{style_colors['foreground']}")
-                            if "background" in style_colors and style_colors["background"]:
-                                colors_info.append(f"B:{style_colors['background']}")
-                            
-                            if not has_custom_config_in_jsonc: # Only add asterisk if not already added from jsonc
-                                display_name += "*"
-
-                        if colors_info:
-                            display_name += f" ({', '.join(colors_info)})"
-                        elif has_custom_config_in_jsonc:
-                            display_name += " (no style detected)"
-                        elif module_name in waybar_style_colors:
-                            display_name += " (style detected)"
-                        else:
-                            display_name += " (no style detected)"
-
-                        modules[position].append(display_name)
-                        processed_modules.append(module_name)
-        except json.JSONDecodeError as e:
-            print(f"Error parsing Waybar config: {e}")
+    sway_variables = VariableResolver.of(sway_variables)
+    processed_modules = set()
+    if loaded is None:
+        loaded = load_waybar_config(config_path)
+        if loaded is None:
+            return modules
+    config, locator = loaded
+
+    # Waybar accepts a single bar object or a top-level array of bars
+    bars = config if isinstance(config, list) else [config]
+    for config in bars:
+        if not isinstance(config, dict):
+            continue
+
+        module_instances = _index_module_instances(config)
+
+        for position in MODULE_POSITIONS:
+            if position in config:
+                for module_name in config[position]:
+                    # Check if the module (or its non-asterisk version) has already been processed
+                    if module_name in processed_modules:
+                        continue
+                    if "*" in module_name and module_name.replace("*", "") in processed_modules:
+                        continue
+
+                    # Check for custom configuration in config.jsonc: an exact key, or
+                    # every instance of the module (e.g., "cpu" matches "cpu#0" and "cpu#1")
+                    if isinstance(config.get(module_name), dict):
+                        configured = [(module_name, config[module_name])]
+                    else:
+                        configured = [(key, config[key]) for key in module_instances.get(module_name, ())]
+
+                    if configured:
+                        for key, module_config in configured:
+                            modules[position].append(_build_module(key, module_config, sway_variables, waybar_style_colors,
+                                                                   locator.find(key, is_key=True)))
+                            processed_modules.add(key)
+                    else:
+                        modules[position].append(_build_module(module_name, None, sway_variables, waybar_style_colors,
+                                                               locator.find(module_name)))
+                    processed_modules.add(module_name)
 
     return modules
+
+def configured_module_ids(loaded_configs):
+    """
+    Collects the style ids (see module_style_key) of the modules the Waybar configs
+    place on their bars, so the style sheets only resolve rules for those.
+
+    Args:
+        loaded_configs: load_waybar_config results; None for a config that failed to load.
+
+    Returns:
+        A set of module ids.
+    """
+    module_ids = set()
+    for loaded in loaded_configs:
+        if loaded is None:
+            continue
+        config = loaded[0]
+        for bar in config if isinstance(config, list) else [config]:
+            if not isinstance(bar, dict):
+                continue
+            for position in MODULE_POSITIONS:
+                for module_name in bar.get(position) or ():
+                    if isinstance(module_name, str):
+                        module_ids.add(module_style_key(module_name)[0])
+    return module_ids
+
+def _index_module_instances(config):
+    """
+    Maps each base module name to the "name#instance" keys configured for it.
+
+    Built once per bar so every module lookup is a dictionary access.
+    """
+    module_instances = {}
+    for key, value in config.items():
+        if "#" in key and key not in MODULE_POSITIONS and isinstance(value, dict):
+            module_instances.setdefault(key.split("#", 1)[0], []).append(key)
+    return module_instances
+
+class _SourceLocator:
+    """
+    Finds where a module is written in the configuration text.
+
+    The string literals of the document are indexed in one pass over the
+    comment-stripped text (strip_jsonc), which keeps the original positions.
+    """
+
+    def __init__(self, config_path, text, stripped):
+        self.text = text
+        self.file_id = FILES.intern(config_path)
+        self._keys = {}
+        self._values = {}
+        for match in _STRING_RE.finditer(stripped):
+            index = self._keys if match.group(2) else self._values
+            index.setdefault(match.group(1), match.start())
+
+    def find(self, name, is_key=False):
+        """
+        Returns the (file id, line number, byte offset) of a module's configuration
+        key, or of its entry in the modules list.
+        """
+        offset = self._keys.get(name) if is_key else None
+        if offset is None:
+            offset = self._values.get(name)
+        if offset is None:
+            return self.file_id, None, None
+        line_number = self.text.count("\n", 0, offset) + 1
+        return self.file_id, line_number, len(self.text[:offset].encode())
+
+def _build_module(display_name, module_config, sway_variables, waybar_style_colors, location):
+    """
+    Builds the record of a module, with its colors from config.jsonc and style.css.
+
+    Args:
+        display_name: The configuration key shown for the module, also used for style lookups.
+        module_config: The module's configuration object, or None if it has none.
+        sway_variables: A VariableResolver from the Sway config.
+        waybar_style_colors: A dictionary of colors extracted from waybar_style.css.
+        location: The (file id, line number, byte offset) of the module.
+
+    Returns:
+        A WaybarModule.
+    """
+    colors = []
+    if module_config is not None:
+        for color_type in ["foreground", "background"]:
+            color_value = module_config.get(color_type)
+            if isinstance(color_value, str):
+                if color_value.startswith("$"):
+                    hex_color = sway_variables.lookup(color_value)
+                    if hex_color is not None:
+                        colors.append(ColorRef(color_type[0].upper(), hex_color, "config"))
+                else:
+                    colors.append(ColorRef(color_type[0].upper(), color_value, "config"))
+
+    # Check for custom configuration in style.css; instances ("battery#bat2") use
+    # their class state when the style sheet declares one
+    module_id, state = module_style_key(display_name)
+    style_colors = waybar_style_colors.get(module_id)
+    if style_colors is not None:
+        style_colors = style_colors.get("states", {}).get(state, style_colors)
+        if style_colors.get("foreground"):
+            colors.append(ColorRef("F", style_colors["foreground"], "style"))
+        if style_colors.get("background"):
+            colors.append(ColorRef("B", style_colors["background"], "style"))
+
+    return WaybarModule(display_name, module_config is not None, style_colors is not None, colors, *location)
@@ -1,6 +1,28 @@
+import functools
 import re
 import os
 import json
+from variable_resolver import VariableResolver
+from gtk_css import parse_css, parse_selector, selector_specificity
+from palette import load_palette
+from profiling import PROFILER
+
+# The color-bearing declarations of a rule body, matched without building the
+# full declaration list
+_COLOR_DECLARATION_RE = re.compile(r'(?:^|;)\s*(color|background-color|background)\s*:([^;]*)')
+# Marks a declaration not seen yet (its entry may be None)
+_UNSET = object()
+# The ids a selector names, to skip rules for modules nobody asked about
+_ID_RE = re.compile(r'#([\w-]+)')
+# What a selector needs gtk_css.parse_selector for: combinators other than a space,
+# functional pseudo-classes, attributes, escapes, "*" and pseudo-elements
+_COMPLEX_SELECTOR_RE = re.compile(r'[>+~(\[\\*]|::')
+# A class or pseudo-class of a state string such as ".critical:not(.charging)"
+_STATE_PART_RE = re.compile(r'\.[\w-]+|::?[\w-]+(?:\([^)]*\))?')
+# A plain hex color, which resolves to itself
+_HEX_COLOR_RE = re.compile(r'#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})')
+# A color inside a 'background' shorthand value
+_COLOR_TOKEN_RE = re.compile(r'#[0-9a-fA-F]{3,8}\b|@[\w-]+|\b(?:rgba?|alpha|shade|mix|lighter|darker)\((?:[^()]|\([^()]*\))*\)|\btransparent\b')
 
 def parse_colors_waybar(colors_waybar_path):
     """
@@ -10,34 +32,35 @@ def parse_colors_waybar(colors_waybar_path):
         colors_waybar_path: The path to the colors-waybar.css file.
 
     Returns:
-        A dictionary mapping @define-color names to their hex codes.
+        A dictionary mapping @define-color names to their resolved hex codes.
     """
-    colors_waybar_variables = {}
     if not colors_waybar_path or not os.path.exists(colors_waybar_path):
-        return colors_waybar_variables
-
-    with open(colors_waybar_path, "r") as f:
-        content = f.read()
-        # Regex to find @define-color variables
-        define_color_pattern = re.compile(r'@define-color\s+([a-zA-Z0-9_-]+)\s+(#[a-fA-F0-9]{6});')
-        for match in define_color_pattern.finditer(content):
-            var_name = match.group(1)
-            hex_code = match.group(2)
-            colors_waybar_variables[var_name] = hex_code
-    return colors_waybar_variables
-
-def resolve_color_value(color_value, colors_waybar_vars, sway_variables):
-    """Resolves a color value (hex, @colorX, or @define-color) to a hex code."""
+        return {}
+    return load_palette([colors_waybar_path]).table
+
+def resolve_color_value(color_value, colors_waybar_vars, sway_variables, palette=None):
+    """
+    Resolves a color value (hex, @colorX, @define-color or a GTK color expression) to a hex code.
+
+    Args:
+        palette: An optional Palette; when given, @references and expressions such as
+            alpha(@color1, 0.5) are evaluated against it.
+    """
+    sway_variables = VariableResolver.of(sway_variables)
     if color_value is None:
         return None
+    if palette is not None:
+        resolved = palette.resolve(color_value)
+        if resolved is not None:
+            return resolved
     if color_value.startswith("@color"):
         var_name = color_value[1:]
         if var_name in colors_waybar_vars:
             return colors_waybar_vars[var_name]
         else:
-            sway_var_name = "$" + var_name
-            if sway_var_name in sway_variables:
-                return sway_variables[sway_var_name][0] # Assuming [0] is the hex
+            resolved = sway_variables.lookup("$" + var_name)
+            if resolved is not None:
+                return resolved
             else:
                 return color_value # Keep @colorX if not resolved
     elif color_value.startswith("@"):
@@ -49,77 +72,327 @@ def resolve_color_value(color_value, colors_waybar_vars, sway_variables):
     else:
         return color_value # Already a hex code
 
-def parse_waybar_style(style_path, sway_variables, colors_waybar_path, file_collector, debug_mode=False):
+def record_style_sources(style_path, colors_waybar_path, file_collector):
+    """Records that the style sheet pulls in the wal generated colors-waybar.css."""
+    if colors_waybar_path and os.path.exists(colors_waybar_path):
+        file_collector.add_sourced_relationship(style_path, colors_waybar_path)
+
+def module_style_key(module_name):
+    """
+    Maps a Waybar module name to the CSS id and state its widget is styled with.
+
+    "custom/media" is styled as #custom-media and the instance "battery#bat2" as
+    #battery.bat2, following Waybar's widget naming.
+
+    Returns:
+        A (module_id, state) tuple.
+    """
+    name, _, instance = module_name.replace("*", "").partition("#")
+    return name.replace("/", "-"), "." + instance if instance else ""
+
+def _parse_state(state):
+    """Normalizes a state string such as ".warning:hover" to a frozenset of its parts."""
+    return frozenset(_STATE_PART_RE.findall(state)) if state else frozenset()
+
+class StyleIndex:
+    """
+    Selector index over a Waybar style sheet with the cascade resolved once.
+
+    Every selector is filed under the id of its subject compound (window#waybar
+    under "waybar", ".modules-left #cpu" and "#cpu.warning" under "cpu"); universal
+    selectors ("*") apply to every module. For each module and each state declared
+    for it, the winning color declarations are picked by !important, specificity
+    and source order, so colors() answers with a dictionary lookup.
+
+    A module without its own foreground or background falls back to the bar's
+    (#waybar), whose background shows through and whose color is inherited.
+    """
+
+    def __init__(self, stylesheet, palette, sway_variables, module_ids=None):
+        """
+        Args:
+            stylesheet: The parsed style sheet (gtk_css.Stylesheet).
+            palette: The Palette the sheet's @references are resolved against.
+            sway_variables: A VariableResolver (or variables dictionary) from the Sway config.
+            module_ids: The ids of the modules colors are wanted for (see module_style_key), or
+                None for every module. Rules that name none of them, the bar or "*" are
+                skipped on their selector text, before it and their declarations are parsed.
+        """
+        sway_variables = VariableResolver.of(sway_variables)
+        if module_ids is not None:
+            module_ids = set(module_ids) | {"waybar"}
+        # module_id -> [(important, specificity, order, state parts, property, color)], winners first
+        rules = self._rules = {}
+        universal = []
+        memo = {}  # color declaration -> its entry, and raw color value -> resolved color, shared by all rules
+        order = 0
+        for rule in stylesheet.rules:
+            if module_ids is not None and "*" not in rule.prelude and module_ids.isdisjoint(_ID_RE.findall(rule.prelude)):
+                continue
+            declarations = None
+            for selector in rule.selectors:
+                if module_ids is not None and "*" not in selector and module_ids.isdisjoint(_ID_RE.findall(selector)):
+                    continue
+                subject = _selector_subject(selector)
+                if subject is None:
+                    continue
+                if declarations is None:
+                    declarations = _rule_color_declarations(rule, palette, sway_variables, memo)
+                module_id, parts, specificity = subject
+                entries = universal if module_id is None else rules.get(module_id)
+                if entries is None:
+                    # Rules without colors still mark the module as styled
+                    entries = rules[module_id] = []
+                for prop, color, important in declarations:
+                    order += 1
+                    entries.append((important, specificity, order, parts, prop, color))
+        self._states = {}  # module_id -> {state string: state parts} declared for it
+        for module_id, entries in rules.items():
+            entries.extend(universal)
+            declared = self._states[module_id] = {"": frozenset()}
+            for entry in entries:
+                if entry[3]:
+                    declared.setdefault(_format_state(entry[3]), entry[3])
+            # By precedence (!important, specificity, source order), winners first, so a
+            # cascade stops at the first match of each property
+            entries.sort(reverse=True)
+        self._universal = sorted(universal, reverse=True)
+
+        self._effective = {}
+        self._defaults = self._cascade(self._rules.get("waybar", self._universal), frozenset(), {})
+        for module_id, declared in self._states.items():
+            for state, parts in declared.items():
+                self._effective[module_id, state] = self._resolve(module_id, parts)
+
+    @staticmethod
+    def _cascade(entries, parts, inherited):
+        winners = {}
+        for _important, _specificity, _order, entry_parts, prop, color in entries:
+            if prop not in winners and entry_parts <= parts:
+                winners[prop] = color
+                if len(winners) == 2:  # Both the foreground and the background are decided
+                    break
+        colors = dict(inherited)
+        colors.update(winners)
+        return colors
+
+    def _resolve(self, module_id, parts):
+        inherited = {} if module_id == "waybar" else self._defaults
+        return self._cascade(self._rules.get(module_id, self._universal), parts, inherited)
+
+    def __contains__(self, module_id):
+        return module_id in self._rules
+
+    def module_ids(self):
+        """Returns the ids of the modules the style sheet has rules for."""
+        return list(self._rules)
+
+    def states(self, module_id):
+        """Returns the non-default states declared for a module, e.g. [".warning", ":hover"]."""
+        return [state for state in self._states.get(module_id, ()) if state]
+
+    def colors(self, module_id, state=""):
+        """
+        Returns the effective colors of a module in a state.
+
+        Args:
+            module_id: The CSS id of the module (see module_style_key).
+            state: Classes and pseudo-classes of the widget, e.g. ".warning" or ".critical:hover".
+
+        Returns:
+            A dictionary with "foreground" and "background" hex codes or @colorX names (None when unset).
+        """
+        state = _format_state(_parse_state(state)) if state else ""
+        colors = self._effective.get((module_id, state))
+        if colors is None:
+            colors = self._effective[module_id, state] = self._resolve(module_id, _parse_state(state))
+        return {"foreground": colors.get("foreground"), "background": colors.get("background")}
+
+    def as_dict(self):
+        """
+        Returns the module colors in the dictionary form used by the report.
+
+        Returns:
+            A dictionary mapping module ids to their foreground and background, with the
+            colors of each declared state under "states". Modules whose rules set no
+            color at all, directly or through the bar defaults, are left out.
+        """
+        module_colors = {}
+        for module_id, declared in self._states.items():
+            colors = {}
+            for state in declared:
+                effective = self._effective[module_id, state]
+                colors[state] = {"foreground": effective.get("foreground"), "background": effective.get("background")}
+            base = colors.pop("")
+            if base["foreground"] or base["background"] or colors:
+                module_colors[module_id] = dict(base, states=colors)
+        return module_colors
+
+def build_style_index(style_path, sway_variables, colors_waybar_path, file_collector, palette=None, stylesheet=None,
+                      module_ids=None):
+    """
+    Parses a Waybar style sheet into a StyleIndex.
+
+    Args:
+        style_path: The path to the Waybar style.css file.
+        sway_variables: A VariableResolver (or variables dictionary) from the Sway config.
+        colors_waybar_path: The path to the colors-waybar.css file.
+        file_collector: The FileCollector instance to record file relationships.
+        palette: A Palette shared across style sheets; loaded from colors_waybar_path
+            and the style sheet (with its imports) when omitted.
+        stylesheet: The style sheet already tokenized by load_stylesheet, if it was loaded ahead.
+        module_ids: The ids of the modules colors are wanted for (see StyleIndex), or None for all.
+
+    Returns:
+        A StyleIndex, or None if the style sheet does not exist.
+    """
+    record_style_sources(style_path, colors_waybar_path, file_collector)
+
+    if stylesheet is None:
+        stylesheet = load_stylesheet(style_path)
+        if stylesheet is None:
+            return None
+    if palette is None:
+        palette = load_palette([colors_waybar_path, style_path])
+    index = StyleIndex(stylesheet, palette, sway_variables, module_ids)
+    # One color declaration scan per rule
+    PROFILER.count("css rules", len(stylesheet.rules))
+    PROFILER.count("regex evaluations", len(stylesheet.rules))
+    if PROFILER.listening("waybar_style"):
+        PROFILER.emit("waybar_style", style_path, index, palette)
+    return index
+
+def load_stylesheet(style_path, text=None):
+    """
+    Reads and tokenizes a style sheet; nothing here needs the Sway variables.
+
+    Returns:
+        The gtk_css StyleSheet, or None if the style sheet does not exist.
+    """
+    if text is None:
+        if not style_path or not os.path.exists(style_path):
+            return None
+        with open(style_path, "r") as f:
+            text = f.read()
+        PROFILER.count("files read")
+        PROFILER.count("bytes read", len(text))
+    return parse_css(text)
+
+def parse_waybar_style(style_path, sway_variables, colors_waybar_path, file_collector, debug_mode=False, palette=None,
+                       stylesheet=None, module_ids=None):
     """
     Parses the Waybar style.css file and extracts module-specific colors,
     considering global Waybar defaults.
 
     Args:
         style_path: The path to the Waybar style.css file.
-        sway_variables: A dictionary of variables from the Sway config.
+        sway_variables: A VariableResolver (or variables dictionary) from the Sway config.
         colors_waybar_path: The path to the colors-waybar.css file.
         file_collector: The FileCollector instance to record file relationships.
-        debug_mode: A boolean to enable debug output.
+        debug_mode: Print the style debug report (print_style_debug) for this style sheet,
+            as subscribing it to the profiler's "waybar_style" channel does.
+        palette: A Palette shared across style sheets (see build_style_index).
+        stylesheet: The tokenized style sheet, if it was loaded ahead (see build_style_index).
+        module_ids: The ids of the modules colors are wanted for, or None for every module the
+            style sheet styles (see build_style_index).
 
     Returns:
-        A dictionary mapping module names to their foreground and background hex codes or @colorX names.
+        A dictionary mapping module ids to their foreground and background hex codes or @colorX names,
+        with the colors of stateful selectors (#battery.warning, #clock:hover) under "states".
     """
-    module_colors = {}
-    
-    colors_waybar_vars = parse_colors_waybar(colors_waybar_path)
+    if debug_mode:
+        PROFILER.subscribe("waybar_style", print_style_debug)
+    try:
+        index = build_style_index(style_path, sway_variables, colors_waybar_path, file_collector, palette, stylesheet,
+                                  module_ids)
+    finally:
+        if debug_mode:
+            PROFILER.unsubscribe("waybar_style", print_style_debug)
+    return index.as_dict() if index is not None else {}
 
-    if colors_waybar_path and os.path.exists(colors_waybar_path):
-        file_collector.add_sourced_relationship(style_path, colors_waybar_path)
+def print_style_debug(style_path, index, palette):
+    """
+    Prints what the style parser resolved for a style sheet: the palette and the
+    effective colors of every module and state it styles.
 
-    if not style_path or not os.path.exists(style_path):
-        return module_colors
+    Subscribed to the profiler's "waybar_style" channel by --waybar-styles-debug.
+    """
+    print(f"--- Waybar Style Debug: {style_path} ---")
+    print(f"  Palette: {len(palette.table)} colors resolved, {len(palette.definitions) - len(palette.table)} unresolved")
+    for module_id in index.module_ids():
+        for state in [""] + index.states(module_id):
+            colors = index.colors(module_id, state)
+            print(f"  #{module_id}{state}: foreground {colors['foreground'] or '-'}, background {colors['background'] or '-'}")
+
+@functools.lru_cache(maxsize=4096)
+def _selector_subject(selector):
+    """
+    Reduces a selector to the id of its subject compound and the state it styles.
+
+    Returns:
+        A (module_id, state parts, specificity) tuple, where the state parts are the
+        subject's classes and pseudo-classes (".warning", ":hover") and module_id is
+        None for the universal selector, or None if the selector targets neither a
+        module nor everything.
+    """
+    if not _COMPLEX_SELECTOR_RE.search(selector):
+        # Compounds of ids, classes, pseudo-classes and type names only, counted without parsing
+        compounds = selector.split()
+        subject = compounds[-1]
+        if "#" not in subject:
+            return None
+        specificity = (selector.count("#"), selector.count(".") + selector.count(":"),
+                       sum(1 for compound in compounds if compound[0] not in "#.:"))
+        return _ID_RE.findall(subject)[-1], frozenset(_STATE_PART_RE.findall(subject)), specificity
+    element, ids, classes, pseudo_classes = parse_selector(selector)[-1]
+    parts = frozenset(["." + c for c in classes] + [":" + p for p in pseudo_classes])
+    if ids:
+        return ids[-1], parts, selector_specificity(selector)
+    if element in (None, "*") and not parts:
+        return None, parts, selector_specificity(selector)
+    return None
+
+@functools.lru_cache(maxsize=4096)
+def _format_state(parts):
+    """Joins state parts back into a canonical state string (classes first, then pseudo-classes)."""
+    return "".join(sorted(parts, key=lambda part: (part[0] != ".", part)))
+
+def _rule_color_declarations(rule, palette, sway_variables, memo):
+    """
+    Extracts the resolved color declarations of a rule.
+
+    The 'background' shorthand counts as a background color when it contains one.
+
+    Args:
+        memo: A dictionary memoizing the entry of each declaration, and resolved
+            colors by their raw value, across the rules of a style sheet.
+
+    Returns:
+        A list of ("foreground" or "background", color, important) tuples in source order.
+    """
+    declarations = []
+    for declaration in _COLOR_DECLARATION_RE.findall(rule.body):
+        entry = memo.get(declaration, _UNSET)
+        if entry is _UNSET:
+            entry = memo[declaration] = _color_declaration(*declaration, palette, sway_variables, memo)
+        if entry is not None:
+            declarations.append(entry)
+    return declarations
 
-    with open(style_path, "r") as f:
-        content = f.read()
-
-        # 1. Extract global Waybar defaults
-        fg_color_default = None
-        bg_color_default = None
-        waybar_global_match = re.search(r'#waybar\s*\{([^}]+)\}', content)
-        if waybar_global_match:
-            global_styles = waybar_global_match.group(1)
-            
-            # Use negative lookbehind for color:
-            fg_matches = re.findall(r'(?<!background-)color:\s*(#[a-fA-F0-9]{6}|@color[0-9]+|@([a-zA-Z0-9_-]+));', global_styles)
-            if fg_matches:
-                fg_color_default = resolve_color_value(fg_matches[-1][0], colors_waybar_vars, sway_variables)
-            
-            bg_matches = re.findall(r'background-color:\s*(#[a-fA-F0-9]{6}|@color[0-9]+|@([a-zA-Z0-9_-]+));', global_styles)
-            if bg_matches:
-                bg_color_default = resolve_color_value(bg_matches[-1][0], colors_waybar_vars, sway_variables)
-        
-        # 2. Iterate through module-specific rules
-        module_rule_pattern = re.compile(r'#([a-zA-Z0-9_/-]+)\s*\{([^}]+)\}')
-        
-        for module_match in module_rule_pattern.finditer(content):
-            module_id = module_match.group(1)
-            styles = module_match.group(2)
-            
-            # Initialize with global defaults
-            fg_color = fg_color_default
-            bg_color = bg_color_default
-
-            # Extract foreground color - find all and take the last one (overrides default)
-            # Use negative lookbehind for color:
-            fg_matches = re.findall(r'((?<!background-)color:\s*(#[a-fA-F0-9]{6}|@color[0-9]+|@([a-zA-Z0-9_-]+));)', styles)
-            if fg_matches:
-                full_directive, color_value, _ = fg_matches[-1] # Corrected unpacking
-                resolved_fg_color = resolve_color_value(color_value, colors_waybar_vars, sway_variables)
-                fg_color = resolved_fg_color
-            
-            # Extract background color - find all and take the last one (overrides default)
-            bg_matches = re.findall(r'(background-color:\s*(#[a-fA-F0-9]{6}|@color[0-9]+|@([a-zA-Z0-9_-]+));)', styles)
-            if bg_matches:
-                full_directive, color_value, _ = bg_matches[-1] # Corrected unpacking
-                resolved_bg_color = resolve_color_value(color_value, colors_waybar_vars, sway_variables)
-                bg_color = resolved_bg_color
-            
-            if fg_color or bg_color:
-                module_colors[module_id] = {"foreground": fg_color, "background": bg_color}
-
-    return module_colors
+def _color_declaration(prop, value, palette, sway_variables, memo):
+    """Returns the ("foreground" or "background", color, important) entry of a declaration, or None."""
+    value = value.strip()
+    important = value.endswith("!important")
+    if important:
+        value = value[:-len("!important")].rstrip()
+    if prop == "background":
+        color_match = _COLOR_TOKEN_RE.search(value)
+        if not color_match:
+            return None
+        value = color_match.group()
+    color = memo.get(value)
+    if color is None and _HEX_COLOR_RE.fullmatch(value):
+        color = value
+    elif color is None:
+        color = memo[value] = resolve_color_value(value, palette.table, sway_variables, palette=palette)
+    return "background" if prop != "color" else "foreground", color, important